@@ -0,0 +1,108 @@
+"""
+Amenity catalogue for hotels and rooms
+
+``Hotel.amenities`` and ``Room.amenities`` keep their comma-separated text
+(and therefore their ``to_dict()`` output). The same data is normalized into
+the ``amenities`` catalogue and the ``hotel_amenities`` / ``room_amenities``
+association tables so amenity filters resolve through indexed joins.
+"""
+from sqlalchemy import func, select
+
+from models import db, Hotel, Room, Amenity, hotel_amenities, room_amenities
+
+# Association rows inserted per statement during a backfill
+BACKFILL_BATCH_SIZE = 1000
+
+
+def slugify(name):
+    """Lookup key for an amenity name: trimmed, lower-cased, single-spaced"""
+    return ' '.join(name.split()).lower()
+
+
+def parse_amenities(value):
+    """Split a comma-separated amenity string into unique {slug: name} in order"""
+    parsed = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())
+        if name and slugify(name) not in parsed:
+            parsed[slugify(name)] = name
+    return parsed
+
+
+def parse_filter(args):
+    """Amenity slugs requested via ?amenities=pool,spa and/or repeated ?amenity="""
+    values = args.getlist('amenity') + args.getlist('amenities')
+    slugs = []
+    for value in values:
+        for slug in parse_amenities(value):
+            if slug not in slugs:
+                slugs.append(slug)
+    return slugs
+
+
+def get_or_create_amenities(parsed):
+    """Catalogue rows for {slug: name}, inserting any that are missing"""
+    if not parsed:
+        return {}
+    existing = {amenity.slug: amenity for amenity in Amenity.query.filter(Amenity.slug.in_(list(parsed))).all()}
+    for slug, name in parsed.items():
+        if slug not in existing:
+            existing[slug] = Amenity(name=name, slug=slug)
+            db.session.add(existing[slug])
+    return existing
+
+
+def sync_amenities(item):
+    """Point a hotel's or room's amenity_tags at its amenities text and commit"""
+    parsed = parse_amenities(item.amenities)
+    catalogue = get_or_create_amenities(parsed)
+    item.amenity_tags = [catalogue[slug] for slug in parsed]
+    db.session.commit()
+
+
+def amenity_filter(model, slugs):
+    """Filter clause for rows of ``model`` (Hotel or Room) having ALL of ``slugs``"""
+    table = hotel_amenities if model is Hotel else room_amenities
+    owner = table.c.hotel_id if model is Hotel else table.c.room_id
+    matching = (
+        select(owner)
+        .join(Amenity, Amenity.id == table.c.amenity_id)
+        .where(Amenity.slug.in_(slugs))
+        .group_by(owner)
+        .having(func.count(table.c.amenity_id) == len(slugs))
+    )
+    return model.id.in_(matching)
+
+
+def _backfill(model, table, owner_column):
+    rows = db.session.query(model.id, model.amenities).all()
+
+    parsed_rows = [(row_id, parse_amenities(value)) for row_id, value in rows]
+    wanted = {}
+    for _, parsed in parsed_rows:
+        for slug, name in parsed.items():
+            wanted.setdefault(slug, name)
+
+    catalogue = get_or_create_amenities(wanted)
+    db.session.flush()
+
+    db.session.execute(table.delete())
+    links = [
+        {owner_column: row_id, 'amenity_id': catalogue[slug].id}
+        for row_id, parsed in parsed_rows
+        for slug in parsed
+    ]
+    for start in range(0, len(links), BACKFILL_BATCH_SIZE):
+        db.session.execute(table.insert(), links[start:start + BACKFILL_BATCH_SIZE])
+    db.session.commit()
+    return len(links)
+
+
+def backfill_amenities():
+    """Rebuild the association tables from the amenities text columns
+
+    Returns ``(hotel_links, room_links)`` inserted; safe to run repeatedly.
+    """
+    hotel_links = _backfill(Hotel, hotel_amenities, 'hotel_id')
+    room_links = _backfill(Room, room_amenities, 'room_id')
+    return hotel_links, room_links
@@ -3,30 +3,101 @@ Flask Backend for Hotel Booking System
 Complete application with authentication, CRUD operations, and booking management
 """
 import os
+import sys
+import time
 from datetime import datetime, date, timedelta
 from functools import wraps
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
-from flask_session import Session
+import click
+
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Hotel, Room, Booking
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload
+from models import db, User, Hotel, Room, Booking, RatePlan, StayDiscount
+from db_engine import engine_options, init_engine
+import availability
+from reservations import reserve
+from session_store import init_sessions, sweep_sessions
+from cache import cache
+from http_cache import response_cache
+from passwords import HasherBusy, hasher
+from instrumentation import instrumentation
+from lifecycle import sweeper, transition
+from archive import archive_bookings, booking_history, find_archived
+from migrations import upgrade_schema
+from pagination import keyset_response
+from serializers import booking_query, hotel_query, init_json
+import stats
+import inventory
+import seeding
+from pricing import Pricer, from_cents, quote_many, quote_stay, to_cents
+from amenities import amenity_filter, backfill_amenities, parse_filter, sync_amenities
+from catalogue_io import detect_format, export_rows, import_rows, read_rows
+from search import index_hotel, index_room, rank_hotels, rebuild_search_index, search_hotel_ids, search_room_ids
 
 # Initialize Flask application
 app = Flask(__name__)
 
 # Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///hotel_booking.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'cookie')
+app.config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/1')
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(seconds=int(os.environ.get('SESSION_LIFETIME', 7 * 24 * 3600)))
+app.config['SESSION_COOKIE_HTTPONLY'] = True
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+# Flask-Session settings, used when SESSION_BACKEND=filesystem
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['SESSION_PERMANENT'] = False
-app.config['SESSION_USE_SIGNER'] = True
+# Flask-Session 0.5 signed ids are bytes, which Werkzeug 3 cookies reject; the ids are random tokens
+app.config['SESSION_USE_SIGNER'] = False
+app.config['AVAILABILITY_BATCH_LIMIT'] = int(os.environ.get('AVAILABILITY_BATCH_LIMIT', 5000))
+app.config['SERIALIZATION_DEPTH'] = int(os.environ.get('SERIALIZATION_DEPTH', 1))
+app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER', 'orjson')
+app.config['API_PAGE_SIZE'] = int(os.environ.get('API_PAGE_SIZE', 50))
+app.config['API_MAX_PAGE_SIZE'] = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+app.config['ASGI_WSGI_THREADS'] = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'lru')
+app.config['CACHE_DEFAULT_TTL'] = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+app.config['HTTP_CACHE_MAX_AGE'] = int(os.environ.get('HTTP_CACHE_MAX_AGE', 60))
+app.config['HTTP_CACHE_SHARED_MAX_AGE'] = int(os.environ.get('HTTP_CACHE_SHARED_MAX_AGE', 300))
+app.config['HTTP_CACHE_MAX_BODIES'] = int(os.environ.get('HTTP_CACHE_MAX_BODIES', 256))
+app.config['HTTP_COMPRESS_MIN_SIZE'] = int(os.environ.get('HTTP_COMPRESS_MIN_SIZE', 1024))
+app.config['STATS_CACHE_TTL'] = int(os.environ.get('STATS_CACHE_TTL', stats.DEFAULT_TOTALS_TTL))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+app.config['PASSWORD_HASH_NICE'] = int(os.environ.get('PASSWORD_HASH_NICE', 10))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 30))
+app.config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION', '1').lower() not in ('0', 'false', 'no', 'off')
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 100))
+app.config['SLOW_QUERY_LOG'] = os.environ.get('SLOW_QUERY_LOG')
+app.config['PROFILE_BUDGET_MS'] = float(os.environ.get('PROFILE_BUDGET_MS', 0))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+app.config['BOOKING_HOLD_TTL'] = int(os.environ.get('BOOKING_HOLD_TTL', 3600))
+app.config['BOOKING_SWEEP_INTERVAL'] = int(os.environ.get('BOOKING_SWEEP_INTERVAL', 60))
+app.config['BOOKING_SWEEP_BATCH'] = int(os.environ.get('BOOKING_SWEEP_BATCH', 500))
+app.config['BOOKING_ARCHIVE_AFTER_DAYS'] = int(os.environ.get('BOOKING_ARCHIVE_AFTER_DAYS', 0))
 
 # Initialize extensions
+init_json(app)
 db.init_app(app)
-Session(app)
+init_engine(app, db)
+instrumentation.init_app(app, db)
+init_sessions(app)
 CORS(app)
+cache.init_app(app)
+response_cache.init_app(app, cache)
+hasher.init_app(app)
+sweeper.init_app(app)
+instrumentation.add_collector(sweeper.metrics)
 
 # =============================================================================
 # DECORATORS
@@ -55,6 +126,75 @@ def admin_required(f):
     return decorated_function
 
 
+# =============================================================================
+# QUERY HELPERS
+# =============================================================================
+
+def with_booking_details(query, entity=Booking):
+    """Eager-load the hotel and room of each booking in a single query"""
+    return query.options(joinedload(entity.hotel), joinedload(entity.room))
+
+
+def user_bookings_entity():
+    """Booking, or live and archived bookings together when the request asks for ?archived=1"""
+    return booking_history() if request.args.get('archived', type=int) else Booking
+
+
+# =============================================================================
+# CATALOGUE CACHE
+# =============================================================================
+# Catalogue reads are cached as to_dict() payloads; templates read them with
+# the same attribute syntax as model instances. Admin writes invalidate the
+# affected keys.
+
+def cached_active_hotels():
+    """All active hotels"""
+    return cache.get_or_set('hotels:active', lambda: [
+        hotel.to_dict() for hotel in Hotel.query.filter_by(is_active=True).all()
+    ])
+
+
+def cached_featured_hotels():
+    """Featured hotels for the home page (top 6)"""
+    return cache.get_or_set('hotels:featured', lambda: [
+        hotel.to_dict() for hotel in Hotel.query.filter_by(is_active=True).limit(6).all()
+    ])
+
+
+def cached_cities():
+    """Distinct cities of active hotels"""
+    def load():
+        cities = db.session.query(Hotel.city).filter_by(is_active=True).distinct().all()
+        return [c[0] for c in cities if c[0]]
+    return cache.get_or_set('hotels:cities', load)
+
+
+def cached_available_rooms():
+    """All available rooms"""
+    return cache.get_or_set('rooms:available', lambda: [
+        room.to_dict() for room in Room.query.filter_by(is_available=True).all()
+    ])
+
+
+def cached_room_types():
+    """Distinct room types"""
+    def load():
+        room_types = db.session.query(Room.room_type).distinct().all()
+        return [r[0] for r in room_types if r[0]]
+    return cache.get_or_set('rooms:types', load)
+
+
+def cached_hotel(hotel_id):
+    """A hotel and its available rooms, or None if the hotel does not exist"""
+    def load():
+        hotel = db.session.get(Hotel, hotel_id)
+        if hotel is None:
+            return None
+        rooms = Room.query.filter_by(hotel_id=hotel_id, is_available=True).all()
+        return {'hotel': hotel.to_dict(), 'rooms': [room.to_dict() for room in rooms]}
+    return cache.get_or_set(f'hotel:{hotel_id}', load)
+
+
 # =============================================================================
 # ROUTES - AUTHENTICATION
 # =============================================================================
@@ -63,7 +203,7 @@ def admin_required(f):
 def home():
     """Home page route"""
     # Get featured hotels (top 6)
-    featured_hotels = Hotel.query.filter_by(is_active=True).limit(6).all()
+    featured_hotels = cached_featured_hotels()
     return render_template('index.html', hotels=featured_hotels)
 
 
@@ -95,11 +235,14 @@ def register():
         if password != confirm_password:
             errors.append('Passwords do not match.')
         
-        # Check if user exists
-        if User.query.filter_by(username=username).first():
+        # Check if user exists (username and email in one query)
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username == username, User.email == email)
+        ).all()
+        if any(row.username == username for row in existing):
             errors.append('Username already exists.')
         
-        if User.query.filter_by(email=email).first():
+        if any(row.email == email for row in existing):
             errors.append('Email already registered.')
         
         if errors:
@@ -107,18 +250,32 @@ def register():
                 flash(error, 'error')
             return render_template('register.html')
         
+        # Return the connection to the pool while the hash runs
+        db.session.close()
+        try:
+            password_hash = hasher.hash(password)
+        except HasherBusy:
+            flash('The server is busy, please try again in a moment.', 'error')
+            return render_template('register.html'), 503
+        
         # Create new user
         new_user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             first_name=first_name,
             last_name=last_name,
             phone=phone
         )
         
         db.session.add(new_user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Registered concurrently between the check and the insert
+            db.session.rollback()
+            flash('Username or email already registered.', 'error')
+            return render_template('register.html')
         
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('login'))
@@ -135,8 +292,25 @@ def login():
         
         # Find user
         user = User.query.filter_by(username=username).first()
+        # Return the connection to the pool while the hash runs; user stays loaded
+        db.session.close()
+        
+        try:
+            valid = user is not None and hasher.verify(user.password_hash, password)
+        except HasherBusy:
+            flash('The server is busy, please try again in a moment.', 'error')
+            return render_template('login.html'), 503
+        
+        if valid and hasher.needs_rehash(user.password_hash):
+            # Hashing parameters changed since this password was set; the
+            # upgrade is opportunistic and retried on a later login if busy
+            try:
+                User.query.filter_by(id=user.id).update({'password_hash': hasher.hash(password)})
+                db.session.commit()
+            except HasherBusy:
+                pass
         
-        if user and check_password_hash(user.password_hash, password):
+        if valid:
             if not user.is_active:
                 flash('Your account has been deactivated.', 'error')
                 return render_template('login.html')
@@ -172,21 +346,22 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    """User dashboard route - shows bookings and profile"""
+    """User dashboard route - shows bookings and profile (?archived=1 adds archived bookings)"""
     user = User.query.get(session['user_id'])
-    bookings = Booking.query.filter_by(user_id=user.id).order_by(Booking.created_at.desc()).all()
+    entity = user_bookings_entity()
+    bookings = with_booking_details(db.session.query(entity), entity).filter(
+        entity.user_id == user.id
+    ).order_by(entity.created_at.desc()).all()
     
     # Calculate statistics
-    total_bookings = len(bookings)
-    confirmed_bookings = len([b for b in bookings if b.status == 'confirmed'])
-    pending_bookings = len([b for b in bookings if b.status == 'pending'])
+    counts = stats.booking_status_counts(user_id=user.id, include_archived=entity is not Booking)
     
     return render_template('dashboard.html', 
                          user=user, 
                          bookings=bookings,
-                         total_bookings=total_bookings,
-                         confirmed_bookings=confirmed_bookings,
-                         pending_bookings=pending_bookings)
+                         total_bookings=counts['total'],
+                         confirmed_bookings=counts['confirmed'],
+                         pending_bookings=counts['pending'])
 
 
 @app.route('/profile', methods=['GET', 'POST'])
@@ -214,7 +389,12 @@ def profile():
                 flash('Passwords do not match.', 'error')
                 return render_template('profile.html', user=user)
             
-            user.password_hash = generate_password_hash(new_password)
+            try:
+                user.password_hash = hasher.hash(new_password)
+            except HasherBusy:
+                db.session.rollback()
+                flash('The server is busy, please try again in a moment.', 'error')
+                return render_template('profile.html', user=user), 503
         
         db.session.commit()
         flash('Profile updated successfully!', 'success')
@@ -235,23 +415,34 @@ def hotels():
     star_rating = request.args.get('star_rating', type=int)
     search = request.args.get('search', '')
     
+    # Get unique cities for filter
+    cities = cached_cities()
+    
     # Build query
     query = Hotel.query.filter_by(is_active=True)
     
     if city:
-        query = query.filter(Hotel.city.ilike(f'%{city}%'))
+        # A city from the filter list is an equality on ix_hotels_active_city_rating;
+        # free text falls back to a substring match, which no B-tree index can serve
+        known = next((name for name in cities if name.lower() == city.lower()), None)
+        query = query.filter(Hotel.city == known if known else Hotel.city.ilike(f'%{city}%'))
     
     if star_rating:
         query = query.filter(Hotel.star_rating >= star_rating)
     
-    if search:
-        query = query.filter(Hotel.name.ilike(f'%{search}%'))
+    amenity_slugs = parse_filter(request.args)
+    if amenity_slugs:
+        query = query.filter(amenity_filter(Hotel, amenity_slugs))
     
-    hotels = query.all()
+    if search:
+        # Full-text match over name, city, country, description and amenities,
+        # ranked in the same statement as the filters above and not capped
+        query = rank_hotels(query, search)
     
-    # Get unique cities for filter
-    cities = db.session.query(Hotel.city).filter_by(is_active=True).distinct().all()
-    cities = [c[0] for c in cities if c[0]]
+    if city or star_rating or amenity_slugs or search:
+        hotels = query.all()
+    else:
+        hotels = cached_active_hotels()
     
     return render_template('hotels.html', hotels=hotels, cities=cities)
 
@@ -259,10 +450,13 @@ def hotels():
 @app.route('/hotel/<int:hotel_id>')
 def hotel_details(hotel_id):
     """Hotel details page route"""
-    hotel = Hotel.query.get_or_404(hotel_id)
+    details = cached_hotel(hotel_id)
+    if details is None:
+        abort(404)
     
     # Get available rooms
-    rooms = Room.query.filter_by(hotel_id=hotel_id, is_available=True).all()
+    hotel = details['hotel']
+    rooms = details['rooms']
     
     # Get hotel reviews (if you have a review model)
     # reviews = Review.query.filter_by(hotel_id=hotel_id).all()
@@ -280,8 +474,9 @@ def rooms():
     # Get query parameters
     hotel_id = request.args.get('hotel_id', type=int)
     room_type = request.args.get('room_type')
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
+    # Amounts that are not finite prices are ignored, like unparseable ones
+    min_price = request.args.get('min_price', type=to_cents)
+    max_price = request.args.get('max_price', type=to_cents)
     capacity = request.args.get('capacity', type=int)
     
     # Build query
@@ -294,19 +489,25 @@ def rooms():
         query = query.filter_by(room_type=room_type)
     
     if min_price:
-        query = query.filter(Room.price_per_night >= min_price)
+        query = query.filter(Room.price_per_night_cents >= min_price)
     
     if max_price:
-        query = query.filter(Room.price_per_night <= max_price)
+        query = query.filter(Room.price_per_night_cents <= max_price)
     
     if capacity:
         query = query.filter(Room.capacity >= capacity)
     
-    rooms = query.all()
+    amenity_slugs = parse_filter(request.args)
+    if amenity_slugs:
+        query = query.filter(amenity_filter(Room, amenity_slugs))
+    
+    if hotel_id or room_type or min_price or max_price or capacity or amenity_slugs:
+        rooms = query.all()
+    else:
+        rooms = cached_available_rooms()
     
     # Get room types for filter
-    room_types = db.session.query(Room.room_type).distinct().all()
-    room_types = [r[0] for r in room_types if r[0]]
+    room_types = cached_room_types()
     
     return render_template('rooms.html', rooms=rooms, room_types=room_types)
 
@@ -328,14 +529,7 @@ def room_details(room_id):
             check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
             
             # Check for overlapping bookings
-            existing_booking = Booking.query.filter(
-                Booking.room_id == room_id,
-                Booking.status.in_(['pending', 'confirmed']),
-                Booking.check_in_date < check_out_date,
-                Booking.check_out_date > check_in_date
-            ).first()
-            
-            is_available = not existing_booking
+            is_available = availability.is_available(room_id, check_in_date, check_out_date)
         except ValueError:
             pass
     
@@ -395,20 +589,8 @@ def create_booking():
             flash('Room not found.', 'error')
             return redirect(url_for('hotels'))
         
-        nights = (check_out_date - check_in_date).days
-        total_price = room.price_per_night * nights
-        
-        # Check availability
-        existing_booking = Booking.query.filter(
-            Booking.room_id == room_id,
-            Booking.status.in_(['pending', 'confirmed']),
-            Booking.check_in_date < check_out_date,
-            Booking.check_out_date > check_in_date
-        ).first()
-        
-        if existing_booking:
-            flash('Room is not available for the selected dates.', 'error')
-            return redirect(url_for('room_details', room_id=room_id))
+        # Seasonal rates and length-of-stay discounts, computed in exact cents
+        total_price_cents = quote_stay(room, check_in_date, check_out_date).total_cents
         
         # Create booking
         booking = Booking(
@@ -421,13 +603,15 @@ def create_booking():
             guest_email=guest_email,
             guest_phone=guest_phone,
             number_of_guests=number_of_guests,
-            total_price=total_price,
+            total_price_cents=total_price_cents,
             special_requests=special_requests,
             status='pending'
         )
         
-        db.session.add(booking)
-        db.session.commit()
+        # Checked and inserted under a per-room lock to prevent double-booking
+        if not reserve(booking):
+            flash('Room is not available for the selected dates.', 'error')
+            return redirect(url_for('room_details', room_id=room_id))
         
         flash('Booking created successfully!', 'success')
         return redirect(url_for('booking_confirmation', booking_id=booking.id))
@@ -439,29 +623,41 @@ def create_booking():
     
     room = None
     hotel = None
+    is_available = True
     
     if room_id:
         room = Room.query.get(room_id)
         if room:
             hotel = Hotel.query.get(room.hotel_id)
     
+    if room and check_in and check_out:
+        try:
+            check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
+            is_available = availability.is_available(room.id, check_in_date, check_out_date)
+        except ValueError:
+            pass
+    
     return render_template('booking_form.html', room=room, hotel=hotel, 
-                         check_in=check_in, check_out=check_out)
+                         check_in=check_in, check_out=check_out,
+                         is_available=is_available)
 
 
 @app.route('/booking/<int:booking_id>')
 @login_required
 def booking_details(booking_id):
-    """View booking details"""
-    booking = Booking.query.get_or_404(booking_id)
+    """View booking details, including archived bookings"""
+    booking = with_booking_details(Booking.query).filter_by(id=booking_id).first() or find_archived(booking_id)
+    if booking is None:
+        abort(404)
     
     # Verify ownership
     if booking.user_id != session['user_id']:
         flash('You do not have permission to view this booking.', 'error')
         return redirect(url_for('dashboard'))
     
-    hotel = Hotel.query.get(booking.hotel_id)
-    room = Room.query.get(booking.room_id)
+    hotel = booking.hotel
+    room = booking.room
     
     return render_template('booking_details.html', booking=booking, hotel=hotel, room=room)
 
@@ -481,7 +677,15 @@ def confirm_booking(booking_id):
         flash('Booking cannot be confirmed.', 'error')
         return redirect(url_for('booking_details', booking_id=booking_id))
     
-    booking.status = 'confirmed'
+    # Conditional on the booking still being pending: the sweeper may have just expired it
+    try:
+        if not transition(booking, ['pending'], 'confirmed'):
+            flash('Booking cannot be confirmed.', 'error')
+            return redirect(url_for('booking_details', booking_id=booking_id))
+    except inventory.NightsTaken:
+        db.session.rollback()
+        flash('Room is no longer available for the selected dates.', 'error')
+        return redirect(url_for('booking_details', booking_id=booking_id))
     db.session.commit()
     
     flash('Booking confirmed successfully!', 'success')
@@ -503,7 +707,9 @@ def cancel_booking(booking_id):
         flash('Booking cannot be cancelled.', 'error')
         return redirect(url_for('booking_details', booking_id=booking_id))
     
-    booking.status = 'cancelled'
+    if not transition(booking, ['pending', 'confirmed'], 'cancelled'):
+        flash('Booking cannot be cancelled.', 'error')
+        return redirect(url_for('booking_details', booking_id=booking_id))
     db.session.commit()
     
     flash('Booking cancelled successfully!', 'success')
@@ -514,15 +720,15 @@ def cancel_booking(booking_id):
 @login_required
 def booking_confirmation(booking_id):
     """Booking confirmation page"""
-    booking = Booking.query.get_or_404(booking_id)
+    booking = with_booking_details(Booking.query).filter_by(id=booking_id).first_or_404()
     
     # Verify ownership
     if booking.user_id != session['user_id']:
         flash('You do not have permission to view this booking.', 'error')
         return redirect(url_for('dashboard'))
     
-    hotel = Hotel.query.get(booking.hotel_id)
-    room = Room.query.get(booking.room_id)
+    hotel = booking.hotel
+    room = booking.room
     
     return render_template('booking_confirmation.html', booking=booking, hotel=hotel, room=room)
 
@@ -532,30 +738,169 @@ def booking_confirmation(booking_id):
 # =============================================================================
 
 @app.route('/api/hotels')
+@response_cache.cached(lambda: ('hotels',))
 def api_hotels():
-    """API endpoint to get hotels as JSON"""
-    hotels = Hotel.query.filter_by(is_active=True).all()
-    return jsonify([hotel.to_dict() for hotel in hotels])
+    """API endpoint to get hotels as JSON (supports ?city=, ?amenities=, ?limit=, ?cursor= and ?format=ndjson)"""
+    query, serialize = hotel_query()
+    query = query.filter(Hotel.is_active == True)
+    
+    city = request.args.get('city')
+    if city:
+        query = query.filter(Hotel.city == city)
+    
+    amenity_slugs = parse_filter(request.args)
+    if amenity_slugs:
+        query = query.filter(amenity_filter(Hotel, amenity_slugs))
+    
+    return keyset_response(query, [Hotel.id], serialize)
 
 
 @app.route('/api/hotel/<int:hotel_id>')
+@response_cache.cached(lambda hotel_id: (f'hotel:{hotel_id}',))
 def api_hotel(hotel_id):
     """API endpoint to get hotel details as JSON"""
-    hotel = Hotel.query.get_or_404(hotel_id)
-    rooms = Room.query.filter_by(hotel_id=hotel_id, is_available=True).all()
+    details = cached_hotel(hotel_id)
+    if details is None:
+        abort(404)
     
-    return jsonify({
-        'hotel': hotel.to_dict(),
-        'rooms': [room.to_dict() for room in rooms]
-    })
+    return jsonify(details)
+
+
+@app.route('/api/search')
+def api_search():
+    """API endpoint for ranked full-text search (?q=, ?type=hotels|rooms, ?limit=)"""
+    query_text = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'hotels')
+    limit = min(request.args.get('limit', type=int, default=20), app.config['API_MAX_PAGE_SIZE'])
+    
+    if search_type == 'rooms':
+        ranked = search_room_ids(query_text, limit=limit)
+        rows = Room.query.filter(Room.id.in_([row_id for row_id, _ in ranked])).all()
+    elif search_type == 'hotels':
+        # Inactive hotels are excluded before the limit, not after
+        ranked = search_hotel_ids(query_text, limit=limit, filters=[Hotel.is_active == True])
+        rows = Hotel.query.filter(Hotel.id.in_([row_id for row_id, _ in ranked])).all()
+    else:
+        return jsonify({'message': 'type must be hotels or rooms'}), 400
+    
+    by_id = {row.id: row for row in rows}
+    return jsonify([
+        dict(by_id[row_id].to_dict(), score=score)
+        for row_id, score in ranked if row_id in by_id
+    ])
+
+
+# Hotels without a rating sort (and page) as 0 stars; a NULL cannot go in a cursor
+HOTEL_RATING = func.coalesce(Hotel.star_rating, 0)
+
+# Sort orders for /api/rooms/search: (columns forming a unique key, descending)
+ROOM_SEARCH_SORTS = {
+    'price': ([Room.price_per_night_cents, Room.id], False),
+    'price_desc': ([Room.price_per_night_cents, Room.id], True),
+    'rating': ([HOTEL_RATING, Room.id], True),
+}
+
+
+@app.route('/api/rooms/search')
+def api_room_search():
+    """API endpoint to find bookable rooms by location, guests, price, amenities and dates
+    
+    Hotel, room and availability filters run as one SQL statement: rooms are
+    joined to their hotel and rooms with a held night in the stay are
+    excluded with a NOT EXISTS probe on room_nights. Supports ?sort=price|price_desc|rating and the
+    usual ?limit=/?cursor= keyset pagination.
+    """
+    city = request.args.get('city', '').strip()
+    hotel_id = request.args.get('hotel_id', type=int)
+    guests = request.args.get('guests', type=int)
+    min_price = request.args.get('min_price', type=to_cents)
+    max_price = request.args.get('max_price', type=to_cents)
+    star_rating = request.args.get('star_rating', type=int)
+    room_type = request.args.get('room_type')
+    sort = request.args.get('sort', 'price')
+    check_in = request.args.get('check_in')
+    check_out = request.args.get('check_out')
+    
+    if sort not in ROOM_SEARCH_SORTS:
+        return jsonify({'message': f"sort must be one of {', '.join(ROOM_SEARCH_SORTS)}"}), 400
+    if (request.args.get('min_price') and min_price is None) or (request.args.get('max_price') and max_price is None):
+        return jsonify({'message': 'min_price and max_price must be valid amounts'}), 400
+    
+    nights = None
+    if check_in or check_out:
+        try:
+            check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return jsonify({'message': 'Invalid date format'}), 400
+        if check_out_date <= check_in_date:
+            return jsonify({'message': 'Check-out date must be after check-in date'}), 400
+        nights = (check_out_date - check_in_date).days
+    
+    query = Room.query.join(Hotel).options(contains_eager(Room.hotel)).filter(
+        Room.is_available == True,
+        Hotel.is_active == True
+    )
+    
+    if city:
+        query = query.filter(Hotel.city == city)
+    if hotel_id:
+        query = query.filter(Room.hotel_id == hotel_id)
+    if guests:
+        query = query.filter(Room.capacity >= guests)
+    if min_price:
+        query = query.filter(Room.price_per_night_cents >= min_price)
+    if max_price:
+        query = query.filter(Room.price_per_night_cents <= max_price)
+    if star_rating:
+        query = query.filter(Hotel.star_rating >= star_rating)
+    if room_type:
+        query = query.filter(Room.room_type == room_type)
+    
+    amenity_slugs = parse_filter(request.args)
+    if amenity_slugs:
+        query = query.filter(amenity_filter(Room, amenity_slugs))
+    
+    if nights:
+        query = query.filter(~availability.conflict_query(Room.id, check_in_date, check_out_date).exists())
+    
+    pricer = None
+    
+    def prepare(rooms):
+        # One rate plan/discount lookup per page, for the hotels of its rooms only
+        nonlocal pricer
+        pricer = Pricer([(check_in_date, check_out_date)], hotel_ids={room.hotel_id for room in rooms})
+    
+    def serialize(room):
+        data = room.to_dict()
+        data['hotel'] = room.hotel.to_dict()
+        if nights:
+            quote = pricer.quote(room, check_in_date, check_out_date)
+            data['nights'] = nights
+            data['total_price'] = float(from_cents(quote.total_cents))
+            data['quote'] = quote.to_dict()
+        return data
+    
+    columns, descending = ROOM_SEARCH_SORTS[sort]
+    return keyset_response(query, columns, serialize, descending=descending,
+                           sort_key=lambda room: [
+                               room.hotel.star_rating or 0 if column is HOTEL_RATING else getattr(room, column.key)
+                               for column in columns
+                           ],
+                           prepare=prepare if nights else None)
 
 
 @app.route('/api/bookings')
 @login_required
 def api_bookings():
-    """API endpoint to get user bookings as JSON"""
-    bookings = Booking.query.filter_by(user_id=session['user_id']).order_by(Booking.created_at.desc()).all()
-    return jsonify([booking.to_dict() for booking in bookings])
+    """API endpoint to get user bookings as JSON (supports ?limit=, ?cursor=, ?format=ndjson and ?archived=1)"""
+    depth = request.args.get('depth', type=int, default=app.config['SERIALIZATION_DEPTH'])
+    entity = user_bookings_entity()
+    
+    # Column rows straight into dicts: no ORM objects are built
+    query, serialize = booking_query(entity, depth)
+    query = query.filter(entity.user_id == session['user_id'])
+    return keyset_response(query, [entity.created_at, entity.id], serialize, descending=True)
 
 
 @app.route('/api/check-availability', methods=['POST'])
@@ -571,21 +916,118 @@ def api_check_availability():
         check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
         check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
         
-        existing_booking = Booking.query.filter(
-            Booking.room_id == room_id,
-            Booking.status.in_(['pending', 'confirmed']),
-            Booking.check_in_date < check_out_date,
-            Booking.check_out_date > check_in_date
-        ).first()
+        is_available = availability.is_available(int(room_id), check_in_date, check_out_date)
         
         return jsonify({
-            'available': not existing_booking,
-            'message': 'Room is available' if not existing_booking else 'Room is not available'
+            'available': is_available,
+            'message': 'Room is available' if is_available else 'Room is not available'
         })
-    except ValueError:
+    except (ValueError, TypeError):
         return jsonify({'available': False, 'message': 'Invalid date format'}), 400
 
 
+def parse_date_ranges(data):
+    """Parse ``date_ranges`` from a batch request body; returns (ranges, error message)"""
+    date_ranges = []
+    try:
+        for date_range in data.get('date_ranges') or []:
+            check_in_date = datetime.strptime(date_range['check_in'], '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(date_range['check_out'], '%Y-%m-%d').date()
+            if check_out_date <= check_in_date:
+                return None, 'Check-out date must be after check-in date'
+            date_ranges.append((check_in_date, check_out_date))
+    except (KeyError, TypeError, ValueError):
+        return None, 'Invalid date format'
+
+    if not date_ranges:
+        return None, 'Please provide at least one date range'
+    return date_ranges, None
+
+
+def batch_room_query(data, query):
+    """Restrict ``query`` to the rooms named by ``room_ids``, ``hotel_id`` or ``city``; returns (query, error message)"""
+    room_ids = data.get('room_ids')
+    hotel_id = data.get('hotel_id')
+    city = data.get('city')
+
+    if room_ids:
+        try:
+            return query.filter(Room.id.in_([int(room_id) for room_id in room_ids])), None
+        except (TypeError, ValueError):
+            return None, 'Invalid room ids'
+    if hotel_id:
+        return query.filter(Room.hotel_id == hotel_id), None
+    if city:
+        return query.join(Hotel).filter(Hotel.is_active == True, Hotel.city.ilike(city)), None
+    return None, 'Please provide room_ids, hotel_id or city'
+
+
+def date_ranges_json(date_ranges):
+    return [
+        {'check_in': check_in.isoformat(), 'check_out': check_out.isoformat()}
+        for check_in, check_out in date_ranges
+    ]
+
+
+@app.route('/api/check-availability/batch', methods=['POST'])
+def api_check_availability_batch():
+    """API endpoint to check many rooms against many date ranges at once"""
+    data = request.get_json(silent=True) or {}
+
+    date_ranges, error = parse_date_ranges(data)
+    if error:
+        return jsonify({'message': error}), 400
+
+    # Resolve the rooms to check with a single query
+    query, error = batch_room_query(data, Room.query.with_entities(Room.id))
+    if error:
+        return jsonify({'message': error}), 400
+
+    rooms = [row[0] for row in query.order_by(Room.id).all()]
+
+    if len(rooms) * len(date_ranges) > app.config['AVAILABILITY_BATCH_LIMIT']:
+        return jsonify({'message': 'Too many room/date combinations requested'}), 400
+
+    matrix = availability.check_many(rooms, date_ranges)
+
+    return jsonify({
+        'rooms': rooms,
+        'date_ranges': date_ranges_json(date_ranges),
+        'availability': {str(room_id): matrix[room_id] for room_id in rooms}
+    })
+
+
+@app.route('/api/quotes', methods=['POST'])
+def api_quotes():
+    """API endpoint to price many rooms for many stays at once
+    
+    Takes the same body as /api/check-availability/batch. Amounts are exact
+    decimal strings after seasonal rates and length-of-stay discounts.
+    """
+    data = request.get_json(silent=True) or {}
+
+    date_ranges, error = parse_date_ranges(data)
+    if error:
+        return jsonify({'message': error}), 400
+
+    query, error = batch_room_query(data, Room.query)
+    if error:
+        return jsonify({'message': error}), 400
+
+    rooms = query.order_by(Room.id).all()
+
+    if len(rooms) * len(date_ranges) > app.config['AVAILABILITY_BATCH_LIMIT']:
+        return jsonify({'message': 'Too many room/date combinations requested'}), 400
+
+    quotes = quote_many(rooms, date_ranges)
+
+    return jsonify({
+        'rooms': [room.id for room in rooms],
+        'date_ranges': date_ranges_json(date_ranges),
+        'quotes': {str(room_id): [quote.to_dict() for quote in room_quotes] for room_id, room_quotes in quotes.items()}
+    })
+
+
 # =============================================================================
 # ERROR HANDLERS
 # =============================================================================
@@ -611,19 +1053,156 @@ def internal_error(error):
 @admin_required
 def admin_dashboard():
     """Admin dashboard"""
-    total_users = User.query.count()
-    total_hotels = Hotel.query.count()
-    total_rooms = Room.query.count()
-    total_bookings = Booking.query.count()
+    totals = stats.admin_totals(ttl=app.config['STATS_CACHE_TTL'])
     
-    recent_bookings = Booking.query.order_by(Booking.created_at.desc()).limit(10).all()
+    recent_bookings = with_booking_details(Booking.query).order_by(Booking.created_at.desc()).limit(10).all()
     
     return render_template('admin/dashboard.html',
-                         total_users=total_users,
-                         total_hotels=total_hotels,
-                         total_rooms=total_rooms,
-                         total_bookings=total_bookings,
-                         recent_bookings=recent_bookings)
+                         recent_bookings=recent_bookings,
+                         status_counts=stats.booking_status_counts(),
+                         revenue=stats.revenue_by_hotel(),
+                         occupancy=stats.occupancy_by_hotel(),
+                         **totals)
+
+
+@app.route('/admin/stats')
+@admin_required
+def admin_stats():
+    """Admin statistics as JSON (optional ?start=YYYY-MM-DD&end=YYYY-MM-DD)"""
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
+    
+    return jsonify({
+        'totals': stats.admin_totals(ttl=app.config['STATS_CACHE_TTL']),
+        'status_counts': stats.booking_status_counts(),
+        'revenue': stats.revenue_by_hotel(start, end),
+        'nights_booked': stats.nights_booked_by_hotel(start, end),
+        'occupancy': stats.occupancy_by_hotel(start, end)
+    })
+
+
+@app.route('/admin/reports/occupancy')
+@admin_required
+def admin_occupancy_report():
+    """Occupancy, ADR and RevPAR per hotel from the nightly inventory as JSON
+    
+    Takes ?start=&end= (YYYY-MM-DD, default the last 30 days) and an optional
+    ?hotel_id= which adds that hotel's figures night by night.
+    """
+    try:
+        end = request.args.get('end')
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else date.today()
+        start = request.args.get('start')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
+    if end <= start:
+        return jsonify({'message': 'end must be after start'}), 400
+    
+    hotel_id = request.args.get('hotel_id', type=int)
+    report = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'hotels': stats.inventory_report(start, end, hotel_id)
+    }
+    if hotel_id:
+        report['nights'] = stats.nightly_report(hotel_id, start, end)
+    return jsonify(report)
+
+
+@app.route('/admin/rate-plans', methods=['GET', 'POST'])
+@admin_required
+def admin_rate_plans():
+    """List rate plans (optional ?hotel_id=) or create one from a JSON body"""
+    if request.method == 'GET':
+        query = RatePlan.query
+        hotel_id = request.args.get('hotel_id', type=int)
+        if hotel_id:
+            query = query.filter(RatePlan.hotel_id == hotel_id)
+        return jsonify([plan.to_dict() for plan in query.order_by(RatePlan.hotel_id, RatePlan.id).all()])
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        weekdays = data.get('weekdays')
+        if isinstance(weekdays, list):
+            weekdays = ','.join(str(int(day)) for day in weekdays)
+        plan = RatePlan(
+            hotel_id=int(data['hotel_id']),
+            room_type=data.get('room_type') or None,
+            name=data['name'],
+            start_date=datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else None,
+            end_date=datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None,
+            weekdays=weekdays or None,
+            nightly_rate_cents=to_cents(data['nightly_rate']) if data.get('nightly_rate') is not None else None,
+            adjustment_percent=int(data['adjustment_percent']) if data.get('adjustment_percent') is not None else None,
+            priority=int(data.get('priority', 0))
+        )
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        return jsonify({'message': 'Invalid rate plan'}), 400
+    
+    if (plan.nightly_rate_cents is None) == (plan.adjustment_percent is None):
+        return jsonify({'message': 'Provide either nightly_rate or adjustment_percent'}), 400
+    if plan.start_date and plan.end_date and plan.end_date <= plan.start_date:
+        return jsonify({'message': 'end_date must be after start_date'}), 400
+    if plan.weekdays and not all(day.isdigit() and int(day) < 7 for day in plan.weekdays.split(',')):
+        return jsonify({'message': 'weekdays must be numbers 0 (Monday) to 6 (Sunday)'}), 400
+    if not db.session.get(Hotel, plan.hotel_id):
+        return jsonify({'message': 'Hotel not found'}), 400
+    
+    db.session.add(plan)
+    db.session.commit()
+    return jsonify(plan.to_dict()), 201
+
+
+@app.route('/admin/stay-discounts', methods=['GET', 'POST'])
+@admin_required
+def admin_stay_discounts():
+    """List length-of-stay discounts (optional ?hotel_id=) or create one from a JSON body"""
+    if request.method == 'GET':
+        query = StayDiscount.query
+        hotel_id = request.args.get('hotel_id', type=int)
+        if hotel_id:
+            query = query.filter(StayDiscount.hotel_id == hotel_id)
+        return jsonify([discount.to_dict() for discount in query.order_by(StayDiscount.hotel_id, StayDiscount.min_nights).all()])
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        discount = StayDiscount(
+            hotel_id=int(data['hotel_id']),
+            room_type=data.get('room_type') or None,
+            min_nights=int(data['min_nights']),
+            percent_off=int(data['percent_off'])
+        )
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'message': 'Invalid stay discount'}), 400
+    
+    if discount.min_nights < 1 or not 0 < discount.percent_off < 100:
+        return jsonify({'message': 'min_nights must be at least 1 and percent_off between 1 and 99'}), 400
+    if not db.session.get(Hotel, discount.hotel_id):
+        return jsonify({'message': 'Hotel not found'}), 400
+    
+    db.session.add(discount)
+    db.session.commit()
+    return jsonify(discount.to_dict()), 201
+
+
+@app.route('/admin/cache')
+@admin_required
+def admin_cache_stats():
+    """Catalogue cache hit/miss counters and API response cache counters as JSON"""
+    return jsonify(dict(cache.stats(), responses=response_cache.stats()))
+
+
+@app.route('/admin/lifecycle')
+@admin_required
+def admin_lifecycle_stats():
+    """Booking lifecycle sweep counters as JSON"""
+    return jsonify(sweeper.stats())
 
 
 @app.route('/admin/hotel/create', methods=['GET', 'POST'])
@@ -646,6 +1225,11 @@ def admin_create_hotel():
         
         db.session.add(hotel)
         db.session.commit()
+        sync_amenities(hotel)
+        stats.invalidate_totals()
+        cache.delete('hotels:active', 'hotels:featured', 'hotels:cities')
+        response_cache.bump('hotels')
+        index_hotel(hotel)
         
         flash('Hotel created successfully!', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -665,7 +1249,7 @@ def admin_create_room():
             room_number=request.form.get('room_number'),
             room_type=request.form.get('room_type'),
             description=request.form.get('description'),
-            price_per_night=request.form.get('price_per_night', type=float),
+            price_per_night_cents=request.form.get('price_per_night', type=to_cents),
             capacity=request.form.get('capacity', type=int, default=2),
             image_url=request.form.get('image_url'),
             amenities=request.form.get('amenities')
@@ -673,6 +1257,11 @@ def admin_create_room():
         
         db.session.add(room)
         db.session.commit()
+        sync_amenities(room)
+        stats.invalidate_totals()
+        cache.delete(f'hotel:{room.hotel_id}', 'rooms:available', 'rooms:types')
+        response_cache.bump(f'hotel:{room.hotel_id}')
+        index_room(room)
         
         flash('Room created successfully!', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -686,7 +1275,7 @@ def admin_create_room():
 
 def init_db():
     """Initialize database with sample data"""
-    db.create_all()
+    upgrade_schema()
     
     # Check if data exists
     if Hotel.query.first():
@@ -768,10 +1357,8 @@ def init_db():
         )
     ]
     
-    for hotel in hotels:
-        db.session.add(hotel)
-    
-    db.session.commit()
+    db.session.add_all(hotels)
+    db.session.flush()
     
     # Create sample rooms for each hotel
     room_types = [
@@ -782,25 +1369,190 @@ def init_db():
         ('Presidential Suite', 599, 6)
     ]
     
-    for hotel in Hotel.query.all():
-        for room_type, price, capacity in room_types:
-            room = Room(
-                hotel_id=hotel.id,
-                room_number=f'{hotel.id}{room_types.index((room_type, price, capacity)) + 1}01',
-                room_type=room_type,
-                description=f'Comfortable {room_type.lower()} with modern amenities.',
-                price_per_night=price,
-                capacity=capacity,
-                image_url='https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800',
-                amenities='WiFi,TV,Air Conditioning,Private Bathroom',
-                is_available=True
-            )
-            db.session.add(room)
+    db.session.add_all([
+        Room(
+            hotel_id=hotel.id,
+            room_number=f'{hotel.id}{number}01',
+            room_type=room_type,
+            description=f'Comfortable {room_type.lower()} with modern amenities.',
+            price_per_night_cents=price * 100,
+            capacity=capacity,
+            image_url='https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800',
+            amenities='WiFi,TV,Air Conditioning,Private Bathroom',
+            is_available=True
+        )
+        for hotel in hotels
+        for number, (room_type, price, capacity) in enumerate(room_types, start=1)
+    ])
     
     db.session.commit()
+    backfill_amenities()
+    rebuild_search_index()
     print("Database initialized with sample data!")
 
 
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Create missing tables and indexes on an existing database"""
+    created = upgrade_schema()
+    if created:
+        print(f"Applied: {', '.join(created)}")
+    else:
+        print("Database schema is up to date.")
+
+
+def _print_progress(rows, elapsed):
+    rate = rows / elapsed if elapsed else 0
+    click.echo(f"  {rows} rows ({rate:,.0f} rows/sec)", err=True)
+
+
+@app.cli.command('import-catalogue')
+@click.argument('entity', type=click.Choice(['hotels', 'rooms']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows per bulk upsert')
+def import_catalogue_command(entity, path, file_format, chunk_size):
+    """Bulk import hotels or rooms from a CSV or NDJSON file"""
+    file_format = detect_format(path, file_format)
+    with open(path, newline='', encoding='utf-8') as handle:
+        imported, errors = import_rows(entity, read_rows(handle, file_format),
+                                       chunk_size=chunk_size, progress=_print_progress)
+    
+    for number, message in errors[:50]:
+        click.echo(f"  line {number}: {message}", err=True)
+    if len(errors) > 50:
+        click.echo(f"  ... and {len(errors) - 50} more errors", err=True)
+    
+    # Refresh derived catalogue data once for the whole import
+    backfill_amenities()
+    rebuild_search_index()
+    response_cache.bump_all()
+    cache.clear()
+    stats.invalidate_totals()
+    
+    click.echo(f"Imported {imported} {entity}, {len(errors)} rows rejected.")
+
+
+@app.cli.command('export-catalogue')
+@click.argument('entity', type=click.Choice(['hotels', 'rooms', 'bookings']))
+@click.argument('path', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension')
+@click.option('--since', type=click.DateTime(), help='Only bookings created on or after this date')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows fetched per round trip')
+def export_catalogue_command(entity, path, file_format, since, chunk_size):
+    """Stream hotels, rooms or bookings to a CSV or NDJSON file ('-' for stdout)"""
+    file_format = detect_format(path, file_format)
+    if path == '-':
+        exported = export_rows(entity, sys.stdout, file_format, since=since, chunk_size=chunk_size)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            exported = export_rows(entity, handle, file_format, since=since,
+                                   chunk_size=chunk_size, progress=_print_progress)
+    click.echo(f"Exported {exported} {entity}.", err=True)
+
+
+@app.cli.command('seed-synthetic')
+@click.option('--hotels', default=100, show_default=True)
+@click.option('--rooms-per-hotel', default='10-40', show_default=True, help='MIN-MAX rooms per hotel')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--bookings', default=10000, show_default=True)
+@click.option('--seed', default=42, show_default=True, help='Same seed and options give the same data')
+@click.option('--stars', default='5,15,35,30,15', show_default=True, help='Relative weights of 1..5 star hotels')
+@click.option('--stay-nights', default=3.0, show_default=True, help='Mean nights per stay')
+@click.option('--gap-nights', default=2.0, show_default=True, help='Mean free nights between stays of a room')
+@click.option('--user-skew', default=1.0, show_default=True, help='Above 1 gives some users many more bookings')
+@click.option('--cancel-rate', default=0.1, show_default=True)
+@click.option('--pending-rate', default=0.15, show_default=True, help='Share of future bookings still pending')
+@click.option('--history-days', type=int, help='How far back the first stays start [default: half the timeline]')
+@click.option('--password', default=seeding.DEFAULT_PASSWORD, show_default=True, help='Password of every user')
+@click.option('--chunk-size', default=20000, show_default=True, help='Rows per multi-row insert')
+def seed_synthetic_command(hotels, rooms_per_hotel, users, bookings, seed, stars, stay_nights, gap_nights,
+                           user_skew, cancel_rate, pending_rate, history_days, password, chunk_size):
+    """Generate a large synthetic dataset of hotels, rooms, users and bookings"""
+    try:
+        low, _, high = rooms_per_hotel.partition('-')
+        rooms_range = (int(low), int(high or low))
+        star_weights = [float(weight) for weight in stars.split(',')]
+    except ValueError:
+        raise click.BadParameter('expected MIN-MAX rooms and five comma-separated star weights')
+    if len(star_weights) != 5:
+        raise click.BadParameter('--stars needs five weights')
+    
+    upgrade_schema()
+    started = time.perf_counter()
+    counts = seeding.generate(
+        hotels=hotels, rooms_per_hotel=rooms_range, users=users, bookings=bookings, seed=seed,
+        star_weights=star_weights, stay_nights=stay_nights, gap_nights=gap_nights, user_skew=user_skew,
+        cancel_rate=cancel_rate, pending_rate=pending_rate, history_days=history_days, password=password,
+        chunk_size=chunk_size, progress=_print_progress
+    )
+    
+    # Refresh derived catalogue data once for the whole load
+    backfill_amenities()
+    rebuild_search_index()
+    response_cache.bump_all()
+    cache.clear()
+    stats.invalidate_totals()
+    
+    click.echo(f"Generated {counts['hotels']} hotels, {counts['rooms']} rooms, {counts['users']} users, "
+               f"{counts['bookings']} bookings ({counts['room_nights']} room-nights) "
+               f"in {time.perf_counter() - started:.1f}s.")
+
+
+@app.cli.command('sweep-sessions')
+def sweep_sessions_command():
+    """Delete expired server-side sessions"""
+    removed = sweep_sessions(app)
+    print(f"Removed {removed} expired sessions.")
+
+
+@app.cli.command('sweep-bookings')
+@click.option('--loop', type=int, help='Keep sweeping every N seconds (standalone worker)')
+def sweep_bookings_command(loop):
+    """Expire stale pending holds and complete past stays"""
+    while True:
+        result = sweeper.sweep()
+        click.echo(f"Expired {result['expired']} holds, completed {result['completed']} stays, "
+                   f"archived {result['archived']} bookings in {result['seconds']:.2f}s.")
+        if not loop:
+            break
+        time.sleep(loop)
+
+
+@app.cli.command('archive-bookings')
+@click.option('--older-than', default=365, show_default=True, help='Archive stays that checked out more than N days ago')
+@click.option('--batch-size', default=1000, show_default=True, help='Bookings moved per transaction')
+def archive_bookings_command(older_than, batch_size):
+    """Move finished bookings out of the live tables into bookings_archive"""
+    before = date.today() - timedelta(days=older_than)
+    start = time.perf_counter()
+    moved = archive_bookings(before, batch_size, progress=_print_progress)
+    click.echo(f"Archived {moved} bookings that checked out before {before} in {time.perf_counter() - start:.1f}s.")
+
+
+@app.cli.command('backfill-amenities')
+def backfill_amenities_command():
+    """Rebuild the amenity catalogue links from the hotel and room amenities text"""
+    hotel_links, room_links = backfill_amenities()
+    print(f"Linked {hotel_links} hotel amenities and {room_links} room amenities.")
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Repopulate the full-text search index from the hotels and rooms tables"""
+    rebuild_search_index()
+    print("Search index rebuilt.")
+
+
+@app.cli.command('rebuild-inventory')
+def rebuild_inventory_command():
+    """Regenerate the nightly room inventory from the bookings table"""
+    nights, conflicts = inventory.rebuild()
+    print(f"Inventory rebuilt: {nights} room-nights.")
+    if conflicts:
+        print(f"Warning: {conflicts} nights are claimed by more than one booking (kept the earliest).")
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
@@ -0,0 +1,161 @@
+"""
+Archival of finished bookings for the Hotel Booking System
+
+Without archival every booking ever made stays in ``bookings``, and the
+availability anti-join, the dashboard and ``/api/bookings`` all read a table
+that grows forever. ``archive_bookings()`` moves completed, cancelled and
+expired bookings that checked out before a cutoff into ``bookings_archive``
+and their ``room_nights`` into ``room_nights_archive``. The live tables then
+hold current and future stays plus the retention window, however long the
+history gets.
+Rows move in batches, one transaction per batch, so a run never holds
+long write locks.
+
+History views read both tables through ``booking_history()`` when asked
+(``?archived=1``). Occupancy and ADR reports always read both nightly
+tables through ``night_history()``, so archiving never changes a past
+report. Admin totals cover the live tables only.
+
+On Postgres ``bookings_archive`` is partitioned by check-out year. The
+partitions a batch needs are created before the batch is copied.
+"""
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, func, insert, literal, select, text, union_all
+from sqlalchemy.orm import aliased, joinedload
+
+from inventory import HELD_STATUSES, insert_ignoring_conflicts, night_rows
+from models import db, Booking, ArchivedBooking, RoomNight, ArchivedRoomNight
+
+# Statuses a booking never leaves
+ARCHIVED_STATUSES = ('completed', 'cancelled', 'expired')
+
+_partitions = set()
+_partitions_lock = threading.Lock()
+
+
+def _ensure_partitions(first_day, last_day):
+    """Create the yearly Postgres partitions covering check-out dates first_day..last_day"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for year in range(first_day.year, last_day.year + 1):
+        with _partitions_lock:
+            if year in _partitions:
+                continue
+        db.session.execute(text(
+            f'CREATE TABLE IF NOT EXISTS bookings_archive_{year} PARTITION OF bookings_archive '
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+        with _partitions_lock:
+            _partitions.add(year)
+
+
+def archive_bookings(before, batch_size=1000, now=None, progress=None):
+    """Move finished bookings that checked out before ``before`` to the archive; returns how many
+
+    ``progress(moved, elapsed)`` is called after each batch.
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    # SQLite gives new rows max(id) + 1, so the newest booking always stays
+    # live: archiving it would let its id be handed out again
+    newest = db.session.query(func.max(Booking.id)).scalar()
+    if newest is None:
+        return 0
+    query = db.session.query(Booking.id, Booking.check_out_date).filter(
+        Booking.status.in_(ARCHIVED_STATUSES),
+        Booking.check_out_date < before,
+        Booking.id < newest
+    )
+
+    bookings = Booking.__table__
+    keys = [column.key for column in bookings.columns]
+    moved = 0
+    while True:
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+        ids = [booking_id for booking_id, _ in rows]
+        check_outs = [check_out for _, check_out in rows]
+        _ensure_partitions(min(check_outs), max(check_outs))
+        db.session.execute(insert(ArchivedBooking.__table__).from_select(
+            keys + ['archived_at'],
+            select(*bookings.columns, literal(now, DateTime)).where(bookings.c.id.in_(ids))
+        ))
+        nights = RoomNight.__table__
+        db.session.execute(insert(ArchivedRoomNight.__table__).from_select(
+            [column.key for column in nights.columns],
+            select(nights).where(nights.c.booking_id.in_(ids))
+        ))
+        db.session.query(RoomNight).filter(RoomNight.booking_id.in_(ids)).delete(synchronize_session=False)
+        db.session.query(Booking).filter(Booking.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        moved += len(ids)
+        if progress:
+            progress(moved, time.perf_counter() - started)
+        if len(ids) < batch_size:
+            break
+    return moved
+
+
+def booking_history():
+    """Booking entity over live and archived bookings, for read-only history queries
+
+    Rows come back as Booking instances whichever table they are read from.
+    Filters on the entity are pushed into both halves of the UNION ALL, so
+    a user's history still uses the (user_id, created_at) indexes.
+    """
+    archive = ArchivedBooking.__table__
+    union = union_all(
+        select(Booking.__table__),
+        select(*[archive.c[column.key] for column in Booking.__table__.columns])
+    ).subquery('booking_history')
+    return aliased(Booking, union)
+
+
+def night_history():
+    """RoomNight entity over live and archived nights, for reports
+
+    Filters on the entity are pushed into both halves of the UNION ALL, so
+    each half is read through its (hotel_id, night) index.
+    """
+    archive = ArchivedRoomNight.__table__
+    union = union_all(
+        select(RoomNight.__table__),
+        select(*[archive.c[column.key] for column in RoomNight.__table__.columns])
+    ).subquery('night_history')
+    return aliased(RoomNight, union)
+
+
+def rebuild_archived_nights(chunk_size=5000):
+    """Regenerate room_nights_archive from bookings_archive; returns the rows written
+
+    Fills the table for databases that archived bookings before their nights
+    were kept.
+    """
+    db.session.query(ArchivedRoomNight).delete(synchronize_session=False)
+
+    columns = (ArchivedBooking.id, ArchivedBooking.room_id, ArchivedBooking.hotel_id, ArchivedBooking.check_in_date,
+               ArchivedBooking.check_out_date, ArchivedBooking.status, ArchivedBooking.total_price_cents)
+    query = db.session.query(*columns).filter(ArchivedBooking.status.in_(HELD_STATUSES)).order_by(ArchivedBooking.id)
+
+    chunk = []
+    for booking in query.yield_per(chunk_size):
+        chunk.extend(night_rows(booking))
+        if len(chunk) >= chunk_size:
+            insert_ignoring_conflicts(ArchivedRoomNight.__table__, chunk)
+            chunk = []
+    if chunk:
+        insert_ignoring_conflicts(ArchivedRoomNight.__table__, chunk)
+
+    db.session.commit()
+    return db.session.query(func.count()).select_from(ArchivedRoomNight).scalar()
+
+
+def find_archived(booking_id):
+    """The archived booking with ``booking_id`` and its hotel and room, or None"""
+    return ArchivedBooking.query.options(
+        joinedload(ArchivedBooking.hotel), joinedload(ArchivedBooking.room)
+    ).filter_by(id=booking_id).first()
@@ -0,0 +1,382 @@
+"""
+ASGI entry point: async JSON API routes in front of the Flask application
+
+    uvicorn asgi:app --workers 4
+
+The I/O-bound JSON API routes are served by async handlers on an
+AsyncEngine (``db_engine.async_database_url()``: aiosqlite, asyncpg or
+aiomysql), so a request waiting on the database or the shared cache holds
+no thread and one process can keep hundreds of them in flight:
+
+    GET  /api/hotels               ?city=, ?amenities=, ?limit=/?cursor=, ?format=ndjson
+    GET  /api/hotel/<id>
+    GET  /api/bookings             ?depth=, ?archived=1, ?limit=/?cursor=, ?format=ndjson
+    POST /api/check-availability
+
+They build the same statements (serializers.py and availability.py),
+share the catalogue cache and HTTP response cache with the Flask views,
+and return the same documents and headers. Every other route, and any
+request these handlers leave alone (a logged-out /api/bookings, a missing
+hotel, a body that is not a JSON object), goes to the Flask app through
+a WSGI adapter running ``ASGI_WSGI_THREADS`` threads, so pages, forms,
+sessions and admin routes behave exactly as under gunicorn.
+
+The Flask session cookie is read but never rewritten by the async routes.
+"""
+import asyncio
+import io
+import re
+import sys
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import app as flask_app
+from models import Hotel, Room, Booking
+from db_engine import async_database_url, async_engine_options, install_pragmas
+from availability import conflict_query
+from archive import booking_history
+from cache import cache
+from http_cache import response_cache
+from instrumentation import instrumentation
+from amenities import amenity_filter, parse_filter
+from pagination import STREAM_BATCH_SIZE, add_next_page, decode_cursor, keyset_filter, page_size
+from serializers import HOTEL, ROOM, booking_select, hotel_select
+
+# (method, path, handler) served asynchronously; the handler name is the Flask endpoint
+ROUTES = (
+    ('GET', r'/api/hotels', 'api_hotels'),
+    ('GET', r'/api/hotel/(?P<hotel_id>\d+)', 'api_hotel'),
+    ('GET', r'/api/bookings', 'api_bookings'),
+    ('POST', r'/api/check-availability', 'api_check_availability'),
+)
+
+
+def route_path(scope):
+    """Path of the request below the application's mount point"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP ``scope``, so the async routes can use Flask's request class"""
+    root_path = scope.get('root_path', '')
+    path = route_path(scope)
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        # The body is read in full, so it can be parsed without a Content-Length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if key in environ:
+            value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+        environ[key] = value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+def replay(body, receive):
+    """``receive`` that hands an already read ``body`` to the next application first"""
+    pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def replayed():
+        return pending.pop() if pending else await receive()
+    return replayed
+
+
+class AsyncAPI:
+    """ASGI application: async handlers for ROUTES, the Flask app for everything else"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_WSGI_THREADS', 10))
+        self.routes = [(method, re.compile(path), name) for method, path, name in ROUTES]
+        self.engine = None
+        self.session = None
+        self._starting = asyncio.Lock()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def startup(self):
+        """Create the async engine before serving"""
+        async with self._starting:
+            if self.engine is not None:
+                return
+            url = self.flask_app.config['SQLALCHEMY_DATABASE_URI']
+            engine = create_async_engine(async_database_url(url), **async_engine_options(url))
+            install_pragmas(engine.sync_engine)
+            if instrumentation.enabled:
+                instrumentation.watch_engine(engine.sync_engine)
+            self.session = async_sessionmaker(engine, expire_on_commit=False)
+            self.engine = engine
+
+    async def shutdown(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as exc:
+                    await send({'type': 'lifespan.startup.failed', 'message': repr(exc)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # -------------------------------------------------------------------------
+    # Dispatch
+    # -------------------------------------------------------------------------
+
+    def match(self, scope):
+        """(handler name, path parameters) of the async route for ``scope``, or None"""
+        path = route_path(scope)
+        for method, pattern, name in self.routes:
+            if scope['method'] == method:
+                match = pattern.fullmatch(path)
+                if match:
+                    return name, {key: int(value) for key, value in match.groupdict().items()}
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        route = self.match(scope) if scope['type'] == 'http' else None
+        if route is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        if self.engine is None:
+            # Servers without lifespan events
+            await self.startup()
+
+        name, params = route
+        body = await read_body(receive) if scope['method'] == 'POST' else b''
+        request = self.flask_app.request_class(build_environ(scope, body))
+        timings = instrumentation.start()
+        try:
+            response = await getattr(self, name)(request, **params)
+        except Exception:
+            self.flask_app.logger.exception('Exception on %s [%s]', request.path, request.method)
+            response = self.json({'message': 'Internal server error'}, 500)
+
+        if response is None:
+            # Not ours to answer: Flask gives its own response (redirect, error page, ...)
+            await self.wsgi(scope, replay(body, receive), send)
+            return
+
+        # As CORS(app) does: any origin is allowed
+        origin = request.headers.get('Origin')
+        response.headers['Access-Control-Allow-Origin'] = origin or '*'
+        if origin:
+            response.vary.add('Origin')
+        instrumentation.finish(timings, name, request.method, response)
+        await self.send(response, send)
+
+    async def send(self, response, send):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()],
+        })
+        if response.is_streamed:
+            async for chunk in response.response:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        else:
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def json(self, data, status=200):
+        """The response ``jsonify(data)`` would give, built without an app context"""
+        response = self.flask_app.json.response(data)
+        response.status_code = status
+        return response
+
+    def stream(self, statement, serialize):
+        """NDJSON of ``statement``'s rows read from a server-side cursor in batches"""
+        dumps = self.flask_app.json.dumps
+
+        async def generate():
+            async with self.session() as session:
+                result = await session.stream(statement)
+                async for rows in result.partitions(STREAM_BATCH_SIZE):
+                    yield ''.join(dumps(serialize(row)) + '\n' for row in rows).encode()
+
+        # Response bodies that are async iterators are sent chunk by chunk
+        return self.flask_app.response_class(generate(), mimetype='application/x-ndjson')
+
+    async def keyset_response(self, request, statement, columns, serialize, descending=False):
+        """``pagination.keyset_response`` for a Core SELECT run on an async session"""
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        paginated = limit is not None or cursor is not None
+
+        if cursor:
+            try:
+                statement = statement.where(keyset_filter(columns, decode_cursor(cursor, columns), descending))
+            except (ValueError, TypeError):
+                return self.json({'message': 'Invalid cursor'}, 400)
+
+        statement = statement.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+        if paginated:
+            limit = page_size(limit, self.flask_app.config)
+
+        ndjson = request.args.get('format') == 'ndjson'
+        if ndjson and not paginated:
+            return self.stream(statement, serialize)
+
+        async with self.session() as session:
+            if not paginated:
+                return self.json([serialize(row) for row in await session.execute(statement)])
+            rows = (await session.execute(statement.limit(limit + 1))).all()
+
+        if ndjson:
+            dumps = self.flask_app.json.dumps
+            response = self.flask_app.response_class(
+                ''.join(dumps(serialize(row)) + '\n' for row in rows[:limit]), mimetype='application/x-ndjson')
+        else:
+            response = self.json([serialize(row) for row in rows[:limit]])
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            add_next_page(response, request, [getattr(last, column.key) for column in columns], limit)
+        return response
+
+    async def session_user(self, request):
+        """``user_id`` of the Flask session the request's cookie refers to, or None"""
+        interface = self.flask_app.session_interface
+        if isinstance(interface, SecureCookieSessionInterface):
+            # Signed cookie: decoding it needs no I/O
+            session = interface.open_session(self.flask_app, request)
+        else:
+            session = await asyncio.to_thread(self._open_stored_session, request)
+        return session.get('user_id') if session is not None else None
+
+    def _open_stored_session(self, request):
+        with self.flask_app.app_context():
+            return self.flask_app.session_interface.open_session(self.flask_app, request)
+
+    # -------------------------------------------------------------------------
+    # Routes
+    # -------------------------------------------------------------------------
+
+    async def api_hotels(self, request):
+        async def view():
+            statement, serialize = hotel_select()
+            statement = statement.where(Hotel.is_active == True)
+
+            city = request.args.get('city')
+            if city:
+                statement = statement.where(Hotel.city == city)
+
+            amenity_slugs = parse_filter(request.args)
+            if amenity_slugs:
+                statement = statement.where(amenity_filter(Hotel, amenity_slugs))
+
+            return await self.keyset_response(request, statement, [Hotel.id], serialize)
+
+        return await response_cache.serve(request, ('hotels',), view)
+
+    async def api_hotel(self, request, hotel_id):
+        async def load():
+            async with self.session() as session:
+                hotel = (await session.execute(select(*HOTEL.columns).where(Hotel.id == hotel_id))).first()
+                if hotel is None:
+                    return None
+                rooms = await session.execute(
+                    select(*ROOM.columns).where(Room.hotel_id == hotel_id, Room.is_available == True))
+                return {'hotel': HOTEL.serialize(hotel), 'rooms': [ROOM.serialize(room) for room in rooms]}
+
+        async def view():
+            # Same payload and key as app.cached_hotel()
+            details = await cache.get_or_set_async(f'hotel:{hotel_id}', load)
+            return None if details is None else self.json(details)
+
+        return await response_cache.serve(request, (f'hotel:{hotel_id}',), view)
+
+    async def api_bookings(self, request):
+        user_id = await self.session_user(request)
+        if user_id is None:
+            return None
+
+        depth = request.args.get('depth', type=int, default=self.flask_app.config['SERIALIZATION_DEPTH'])
+        entity = booking_history() if request.args.get('archived', type=int) else Booking
+        statement, serialize = booking_select(entity, depth)
+        statement = statement.where(entity.user_id == user_id)
+        response = await self.keyset_response(request, statement, [entity.created_at, entity.id], serialize,
+                                              descending=True)
+        # Flask adds this whenever a view reads the session
+        response.vary.add('Cookie')
+        return response
+
+    async def api_check_availability(self, request):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return None
+
+        try:
+            check_in_date = datetime.strptime(data.get('check_in'), '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(data.get('check_out'), '%Y-%m-%d').date()
+
+            statement = conflict_query(int(data.get('room_id')), check_in_date, check_out_date)
+            async with self.session() as session:
+                is_available = (await session.execute(statement)).first() is None
+
+            return self.json({
+                'available': is_available,
+                'message': 'Room is available' if is_available else 'Room is not available'
+            })
+        except (ValueError, TypeError):
+            return self.json({'available': False, 'message': 'Invalid date format'}, 400)
+
+
+app = AsyncAPI(flask_app)
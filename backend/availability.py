@@ -0,0 +1,62 @@
+"""
+Availability checks for the Hotel Booking System
+
+Answers come from the ``room_nights`` inventory (see ``inventory.py``),
+the same table ``reserve()`` checks and writes under its per-room lock, so
+every worker sees bookings, cancellations and expired holds committed by
+the others immediately. A single stay is a range probe on the table's
+(room_id, night) primary key; a batch of rooms x date ranges is one query
+joining the table against the list of ranges.
+"""
+from sqlalchemy import Date, Integer, and_, literal, select, union_all
+
+from models import db, RoomNight
+
+# Booking statuses that block a room for their date range
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+def conflict_query(room_id, check_in, check_out):
+    """SELECT of one held night of ``room_id`` in [check_in, check_out), if any
+
+    Shared by the sync helpers below and the async routes in ``asgi.py``.
+    """
+    return select(RoomNight.night).where(
+        RoomNight.room_id == room_id,
+        RoomNight.night >= check_in,
+        RoomNight.night < check_out
+    ).limit(1)
+
+
+def is_available(room_id, check_in, check_out):
+    """Check whether a room is free for [check_in, check_out)"""
+    return db.session.execute(conflict_query(room_id, check_in, check_out)).first() is None
+
+
+def check_many(room_ids, date_ranges):
+    """Availability matrix for many rooms x many (check_in, check_out) ranges
+
+    Returns ``{room_id: [bool, ...]}`` with one flag per date range, in
+    the order the ranges were given.
+    """
+    room_ids = list(room_ids)
+    matrix = {room_id: [True] * len(date_ranges) for room_id in room_ids}
+    if not room_ids or not date_ranges:
+        return matrix
+
+    # The ranges as a derived table; VALUES lists cannot name their columns on SQLite
+    ranges = union_all(*[
+        select(literal(position, Integer).label('position'),
+               literal(check_in, Date).label('check_in'),
+               literal(check_out, Date).label('check_out'))
+        for position, (check_in, check_out) in enumerate(date_ranges)
+    ]).subquery('ranges')
+    taken = db.session.execute(
+        select(RoomNight.room_id, ranges.c.position).join(ranges, and_(
+            RoomNight.night >= ranges.c.check_in,
+            RoomNight.night < ranges.c.check_out
+        )).where(RoomNight.room_id.in_(room_ids)).distinct()
+    )
+    for room_id, position in taken:
+        matrix[room_id][position] = False
+    return matrix
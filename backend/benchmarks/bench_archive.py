@@ -0,0 +1,136 @@
+"""
+Benchmark: availability latency as booking history grows, with and without archival
+
+For each history multiplier, seeds a throwaway SQLite database (see
+seeding.py) and trims every room's stays at --future-days ahead, so all
+sizes have the same current and upcoming stays and only the past grows: at
+100x the rooms have 100 times as many finished stays behind them.
+Availability is then timed twice, on the live tables holding the full
+history and after archive.archive_bookings() has moved stays older than
+--retention-days to bookings_archive:
+
+    room search     /api/rooms/search with dates (NOT EXISTS against bookings)
+    batch check     availability.check_many() for every room (room_nights)
+    nights lookup   inventory.is_free() for --lookups random rooms (room_nights)
+    status counts   stats.booking_status_counts(), the admin dashboard GROUP BY
+
+With archival the live tables stay the same size whatever the history, so
+the timings should stay flat.
+
+Usage:
+    python benchmarks/bench_archive.py --bookings 5000 --multipliers 1,10,100
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mean nights per stay and free nights between stays (seeding defaults)
+STAY_NIGHTS = 3.0
+GAP_NIGHTS = 2.0
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=20)
+    parser.add_argument('--rooms-per-hotel', type=int, default=25)
+    parser.add_argument('--bookings', type=int, default=5000, help='Bookings at multiplier 1')
+    parser.add_argument('--multipliers', default='1,10,100', help='Comma-separated history sizes')
+    parser.add_argument('--future-days', type=int, default=30, help='Days of stays ahead of today in every room')
+    parser.add_argument('--retention-days', type=int, default=30, help='Archive stays that checked out before this')
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    multipliers = [int(value) for value in args.multipliers.split(',')]
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench_archive.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ.setdefault('BOOKING_SWEEP_INTERVAL', '0')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+
+    from app import app
+    from models import db, Booking, ArchivedBooking, Room, RoomNight
+    from migrations import upgrade_schema
+    from availability import ACTIVE_STATUSES
+    import availability
+    from archive import archive_bookings
+    import inventory
+    import seeding
+    import stats
+
+    client = app.test_client()
+    today = date.today()
+    horizon = today + timedelta(days=args.future_days)
+    check_in = today + timedelta(days=args.future_days // 2)
+    check_out = check_in + timedelta(days=3)
+    search_url = f'/api/rooms/search?check_in={check_in}&check_out={check_out}&limit=20'
+    rooms = args.hotels * args.rooms_per_hotel
+
+    def measure(room_ids):
+        rng = random.Random(args.seed)
+        sample = [rng.choice(room_ids) for _ in range(args.lookups)]
+        return [
+            timed(lambda: client.get(search_url), args.repeat),
+            timed(lambda: availability.check_many(room_ids, [(check_in, check_out)]), args.repeat),
+            timed(lambda: [inventory.is_free(room_id, check_in, check_out) for room_id in sample], args.repeat),
+            timed(stats.booking_status_counts, args.repeat),
+        ]
+
+    labels = ['room search', 'batch check', 'nights lookup', 'status counts']
+    print(f"{'history':>8}{'bookings':>10}{'active':>8}{'live rows':>11}{'archived':>10}  "
+          + ''.join(f'{label + " ms":>22}' for label in labels))
+    print(' ' * 49 + '  ' + ''.join(f"{'full':>11}{'archived':>11}" for _ in labels))
+
+    for multiplier in multipliers:
+        per_room = args.bookings * multiplier / rooms
+        # A room's timeline is a random walk: aim its end three standard
+        # deviations past the horizon, then cut everything beyond it
+        margin = int(3 * (STAY_NIGHTS + GAP_NIGHTS) * per_room ** 0.5)
+        history_days = max(0, int(per_room * (STAY_NIGHTS + GAP_NIGHTS)) - args.future_days - margin)
+        with app.app_context():
+            db.drop_all()
+            upgrade_schema()
+            seeding.generate(hotels=args.hotels, rooms_per_hotel=(args.rooms_per_hotel, args.rooms_per_hotel),
+                             users=1000, bookings=args.bookings * multiplier, seed=args.seed,
+                             stay_nights=STAY_NIGHTS, gap_nights=GAP_NIGHTS, history_days=history_days)
+            beyond = db.session.query(Booking.id).filter(Booking.check_in_date >= horizon)
+            db.session.query(RoomNight).filter(RoomNight.booking_id.in_(beyond.scalar_subquery())).delete(
+                synchronize_session=False)
+            db.session.query(Booking).filter(Booking.check_in_date >= horizon).delete(synchronize_session=False)
+            db.session.commit()
+            bookings = db.session.query(Booking).count()
+            active = db.session.query(Booking).filter(Booking.status.in_(ACTIVE_STATUSES)).count()
+            room_ids = [room_id for room_id, in db.session.query(Room.id)]
+
+            full = measure(room_ids)
+            start = time.perf_counter()
+            moved = archive_bookings(today - timedelta(days=args.retention_days), batch_size=5000)
+            archive_seconds = time.perf_counter() - start
+            archived = measure(room_ids)
+            live = db.session.query(Booking).count()
+            assert db.session.query(ArchivedBooking).count() == moved
+
+        print(f'{str(multiplier) + "x":>8}{bookings:>10}{active:>8}{live:>11}{moved:>10}  '
+              + ''.join(f'{before:>11.2f}{after:>11.2f}' for before, after in zip(full, archived))
+              + f'   (archived in {archive_seconds:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
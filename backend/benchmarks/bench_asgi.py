@@ -0,0 +1,242 @@
+"""
+Benchmark: JSON API throughput and tail latency, gunicorn (WSGI) vs uvicorn (ASGI)
+
+Seeds a throwaway SQLite database (see seeding.py), starts the app under
+each server on a local port and drives the I/O-bound API routes with many
+concurrent keep-alive connections from an asyncio load generator:
+
+    wsgi    gunicorn app:app, gthread workers (--workers x --threads)
+    asgi    uvicorn asgi:app (--workers), async routes on the AsyncEngine
+
+Endpoints:
+
+    hotels          GET  /api/hotels?limit=20&cursor=<random>
+    hotel           GET  /api/hotel/<random id>
+    bookings        GET  /api/bookings?limit=20 as a logged-in user
+    availability    POST /api/check-availability for a random room and stay
+
+The servers run with CACHE_TYPE=null so every request reaches the
+database. For each concurrency level it reports requests/sec, p50 and p99
+latency and failed requests (non-2xx or connection errors). Pass
+--database-url to run against a server database (e.g. Postgres) already
+seeded with ``flask seed-data``; the async driver for it must be installed.
+
+Usage:
+    python benchmarks/bench_asgi.py --concurrency 50,200,500 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not listen on port {port} within {timeout}s')
+
+
+def start_server(mode, port, args, env):
+    if mode == 'wsgi':
+        command = ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+                   '--worker-class', 'gthread', '--threads', str(args.threads), '--log-level', 'warning']
+    else:
+        command = ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log']
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, start_new_session=True)
+    wait_for(port, process)
+    return process
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+async def read_response(reader):
+    """Status of one HTTP/1.1 response, with its body read and discarded"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def connection(port, make_request, deadline, latencies, failures):
+    """One keep-alive client connection sending requests back to back until ``deadline``"""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            start = time.perf_counter()
+            writer.write(make_request())
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if not 200 <= status < 300:
+                failures.append(status)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            failures.append(None)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, make_request, concurrency, duration):
+    latencies = []
+    failures = []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*[
+        connection(port, make_request, deadline, latencies, failures) for _ in range(concurrency)
+    ])
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    if not latencies:
+        return 0.0, 0.0, 0.0, len(failures)
+    return (len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, len(failures))
+
+
+def request_factories(cookie, hotel_ids, room_ids, cursors, rng):
+    def get(path, headers=''):
+        return f'GET {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n'.encode()
+
+    def availability():
+        check_in = date.today() + timedelta(days=rng.randrange(1, 120))
+        body = (f'{{"room_id": {rng.choice(room_ids)}, "check_in": "{check_in}", '
+                f'"check_out": "{check_in + timedelta(days=rng.randrange(1, 7))}"}}').encode()
+        return (f'POST /api/check-availability HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+
+    return {
+        'hotels': lambda: get(f'/api/hotels?limit=20&cursor={rng.choice(cursors)}'),
+        'hotel': lambda: get(f'/api/hotel/{rng.choice(hotel_ids)}'),
+        'bookings': lambda: get('/api/bookings?limit=20', f'Cookie: session={cookie}\r\n'),
+        'availability': availability,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=50000)
+    parser.add_argument('--concurrency', default='50,200,500', help='Comma-separated concurrent connections')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per endpoint and concurrency level')
+    parser.add_argument('--workers', type=int, default=2, help='Server processes for both servers')
+    parser.add_argument('--threads', type=int, default=16, help='Threads per gunicorn worker')
+    parser.add_argument('--endpoints', default='hotels,hotel,bookings,availability')
+    parser.add_argument('--database-url', help='Use this (already seeded) database instead of a fresh SQLite file')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    levels = [int(value) for value in args.concurrency.split(',')]
+    endpoints = args.endpoints.split(',')
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(workdir, 'bench_asgi.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ.setdefault('BOOKING_SWEEP_INTERVAL', '0')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+    os.environ['CACHE_TYPE'] = 'null'
+    os.environ['SESSION_BACKEND'] = 'cookie'
+
+    from sqlalchemy import func
+
+    from app import app
+    from models import db, Hotel, Room, Booking
+    from migrations import upgrade_schema
+    from pagination import encode_cursor
+    import seeding
+
+    with app.app_context():
+        if not args.database_url:
+            upgrade_schema()
+            seeding.generate(hotels=args.hotels, users=1000, bookings=args.bookings, seed=args.seed)
+        hotel_ids = [hotel_id for hotel_id, in db.session.query(Hotel.id)]
+        room_ids = [room_id for room_id, in db.session.query(Room.id)]
+        # The user with the most bookings, so every bookings page is full
+        user_id = db.session.query(Booking.user_id).group_by(Booking.user_id).order_by(
+            func.count().desc()).limit(1).scalar()
+    cookie = app.session_interface.get_signing_serializer(app).dumps({'user_id': user_id})
+    cursors = [encode_cursor([hotel_id]) for hotel_id in hotel_ids[:-20]]
+    requests = request_factories(cookie, hotel_ids, room_ids, cursors, random.Random(args.seed))
+
+    results = {}
+    for mode in ('wsgi', 'asgi'):
+        port = free_port()
+        server = start_server(mode, port, args, dict(os.environ))
+        try:
+            for endpoint in endpoints:
+                # One second at 10 connections first, so each worker has opened its database
+                # connections and the tables are in SQLite's page cache before measuring
+                asyncio.run(load(port, requests[endpoint], 10, 1))
+                for concurrency in levels:
+                    results[mode, endpoint, concurrency] = asyncio.run(
+                        load(port, requests[endpoint], concurrency, args.duration))
+        finally:
+            stop_server(server)
+
+    print(f'{args.workers} workers; gunicorn gthread x {args.threads} threads vs uvicorn; '
+          f'{args.duration:g}s per run')
+    print(f"{'endpoint':<14}{'conns':>6}" + ''.join(
+        f"{mode + ' ' + column:>14}" for mode in ('wsgi', 'asgi') for column in ('req/s', 'p50 ms', 'p99 ms', 'errors')))
+    for endpoint in endpoints:
+        for concurrency in levels:
+            row = ''.join(
+                f'{rate:>14.0f}{p50:>14.1f}{p99:>14.1f}{errors:>14}'
+                for rate, p50, p99, errors in (results[mode, endpoint, concurrency] for mode in ('wsgi', 'asgi'))
+            )
+            print(f'{endpoint:<14}{concurrency:>6}{row}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Stress test: concurrent conflicting bookings through reservations.reserve()
+
+Several processes, each with several threads, try to book a handful of
+rooms for random overlapping date ranges at the same time. Afterwards the
+bookings table is checked for overlapping active bookings and throughput
+is reported. ``--naive`` runs the old check-then-insert path instead, to
+show the oversell it allows.
+
+Usage:
+    python benchmarks/bench_booking_concurrency.py --processes 4 --threads 8 --attempts 400
+    DATABASE_URL=postgresql://... python benchmarks/bench_booking_concurrency.py
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(args, worker_id, attempts, results):
+    from app import app
+    from models import db, Room, Booking
+    from reservations import reserve
+    from availability import ACTIVE_STATUSES
+
+    rng = random.Random(args.seed + worker_id)
+    start_day = date.today() + timedelta(days=30)
+    successes = errors = 0
+
+    def attempt():
+        room_id = rng.randint(1, args.rooms)
+        check_in = start_day + timedelta(days=rng.randint(0, args.days))
+        booking = Booking(
+            user_id=1, hotel_id=db.session.get(Room, room_id).hotel_id, room_id=room_id,
+            check_in_date=check_in, check_out_date=check_in + timedelta(days=rng.randint(1, 4)),
+            guest_name='Load Test', guest_email='load@example.com', total_price_cents=0, status='pending'
+        )
+        if not args.naive:
+            return reserve(booking)
+        overlap = db.session.query(Booking.id).filter(
+            Booking.room_id == booking.room_id,
+            Booking.status.in_(ACTIVE_STATUSES),
+            Booking.check_in_date < booking.check_out_date,
+            Booking.check_out_date > booking.check_in_date
+        ).first()
+        if overlap is not None:
+            return False
+        db.session.add(booking)
+        db.session.commit()
+        return True
+
+    with app.app_context():
+        for _ in range(attempts):
+            try:
+                successes += attempt()
+            except Exception:
+                db.session.rollback()
+                errors += 1
+    results.append((successes, errors))
+
+
+def process_main(args, process_id, attempts, queue):
+    results = []
+    threads = [
+        threading.Thread(target=worker, args=(args, process_id * args.threads + i, attempts, results))
+        for i in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put((sum(r[0] for r in results), sum(r[1] for r in results)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=400, help='total booking attempts')
+    parser.add_argument('--rooms', type=int, default=3, help='rooms competed for')
+    parser.add_argument('--days', type=int, default=30, help='spread of check-in dates')
+    parser.add_argument('--naive', action='store_true', help='use unlocked check-then-insert')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_booking.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+
+    from app import app, init_db
+    from models import db, User
+    from sqlalchemy import text
+
+    with app.app_context():
+        init_db()
+        if not db.session.get(User, 1):
+            db.session.add(User(id=1, username='loadtest', email='load@example.com', password_hash='-'))
+            db.session.commit()
+
+    workers = args.processes * args.threads
+    per_worker = max(1, args.attempts // workers)
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=process_main, args=(args, i, per_worker, queue))
+        for i in range(args.processes)
+    ]
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [queue.get() for _ in processes]
+    successes = sum(outcome[0] for outcome in outcomes)
+    errors = sum(outcome[1] for outcome in outcomes)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        overlaps = db.session.execute(text(
+            "SELECT count(*) FROM bookings a JOIN bookings b ON a.room_id = b.room_id AND a.id < b.id "
+            "WHERE a.status IN ('pending', 'confirmed') AND b.status IN ('pending', 'confirmed') "
+            "AND a.check_in_date < b.check_out_date AND a.check_out_date > b.check_in_date"
+        )).scalar()
+
+    total = per_worker * workers
+    print(f"mode: {'naive check-then-insert' if args.naive else 'reserve()'}, "
+          f"{args.processes} processes x {args.threads} threads, {args.rooms} rooms")
+    print(f"attempts: {total}  booked: {successes}  rejected: {total - successes - errors}  errors: {errors}")
+    print(f"elapsed: {elapsed:.2f}s  throughput: {total / elapsed:.0f} attempts/s")
+    print(f"overlapping active bookings: {overlaps}")
+    return 1 if overlaps and not args.naive else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
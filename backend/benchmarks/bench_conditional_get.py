@@ -0,0 +1,83 @@
+"""
+Benchmark: catalogue API responses with and without the HTTP response cache
+
+Seeds a throwaway SQLite database with a synthetic catalogue (see
+seeding.py) and requests /api/hotels and /api/hotel/<id> through the test
+client in four ways:
+
+    uncached      response cache off: query, serialize and send the full body
+    cached        body served from the response cache (identity)
+    cached gzip   body served from the response cache, gzip-compressed
+    revalidate    If-None-Match with the current ETag, answered 304
+
+For each it reports requests/sec, p50 latency, SQL statements per request
+and bytes sent.
+
+Usage:
+    python benchmarks/bench_conditional_get.py --hotels 1000 --requests 500
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def run(client, url, headers, requests):
+    samples = []
+    queries = 0
+    size = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        match = QUERIES.search(response.headers.get('Server-Timing', ''))
+        queries += int(match.group(1)) if match else 0
+        size = len(response.data)
+    samples.sort()
+    return requests / sum(samples), samples[len(samples) // 2] * 1000, queries / requests, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench_conditional_get.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ.setdefault('BOOKING_SWEEP_INTERVAL', '0')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+
+    from app import app
+    from migrations import upgrade_schema
+    from http_cache import response_cache
+    import seeding
+
+    with app.app_context():
+        upgrade_schema()
+        seeding.generate(hotels=args.hotels, users=10, bookings=0, seed=args.seed)
+
+    client = app.test_client()
+    print(f"{'url':<16}{'mode':<14}{'req/s':>10}{'p50 ms':>9}{'queries':>9}{'bytes':>10}")
+    for url in ('/api/hotels', '/api/hotel/1'):
+        response_cache.enabled = False
+        results = [('uncached', run(client, url, {}, args.requests))]
+        response_cache.enabled = True
+        results.append(('cached', run(client, url, {}, args.requests)))
+        results.append(('cached gzip', run(client, url, {'Accept-Encoding': 'gzip'}, args.requests)))
+        etag = client.get(url).headers['ETag']
+        results.append(('revalidate', run(client, url, {'If-None-Match': etag}, args.requests)))
+        for mode, (rate, p50, queries, size) in results:
+            print(f'{url:<16}{mode:<14}{rate:>10.0f}{p50:>9.2f}{queries:>9.1f}{size:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: mixed reads and bookings with and without engine tuning
+
+Runs the same workload twice in fresh processes, once with DB_TUNING=0
+(SQLAlchemy/SQLite defaults, rollback journal) and once with the tuned
+engine (WAL, synchronous=NORMAL, mmap, busy timeout). Worker threads mix
+availability-style reads of the bookings table with booking inserts
+through reservations.reserve(), and the run reports throughput, read
+latency percentiles and failed operations.
+
+Usage:
+    python benchmarks/bench_db_tuning.py --threads 16 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_workload(args):
+    from app import app, init_db
+    from models import db, User, Room, Booking
+    from reservations import reserve
+
+    with app.app_context():
+        init_db()
+        if not db.session.get(User, 1):
+            db.session.add(User(id=1, username='bench', email='bench@example.com', password_hash='-'))
+            db.session.commit()
+        room_hotels = dict(db.session.query(Room.id, Room.hotel_id).all())
+
+    deadline = time.perf_counter() + args.seconds
+    lock = threading.Lock()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0, 'read_latencies': []}
+
+    def worker(seed):
+        rng = random.Random(seed)
+        reads = writes = errors = 0
+        latencies = []
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                room_id = rng.choice(list(room_hotels))
+                check_in = date.today() + timedelta(days=rng.randint(1, 365))
+                check_out = check_in + timedelta(days=rng.randint(1, 5))
+                try:
+                    if rng.random() < args.write_ratio:
+                        reserve(Booking(
+                            user_id=1, hotel_id=room_hotels[room_id], room_id=room_id,
+                            check_in_date=check_in, check_out_date=check_out,
+                            guest_name='Bench', guest_email='bench@example.com',
+                            total_price_cents=0, status='pending'
+                        ))
+                        writes += 1
+                    else:
+                        started = time.perf_counter()
+                        db.session.query(Booking.id).filter(
+                            Booking.room_id == room_id,
+                            Booking.status.in_(('pending', 'confirmed')),
+                            Booking.check_in_date < check_out,
+                            Booking.check_out_date > check_in
+                        ).first()
+                        db.session.rollback()
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        reads += 1
+                except Exception:
+                    db.session.rollback()
+                    errors += 1
+        with lock:
+            totals['reads'] += reads
+            totals['writes'] += writes
+            totals['errors'] += errors
+            totals['read_latencies'].extend(latencies)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = totals.pop('read_latencies')
+    totals.update(
+        ops_per_sec=(totals['reads'] + totals['writes']) / elapsed,
+        read_p50_ms=percentile(latencies, 0.50),
+        read_p99_ms=percentile(latencies, 0.99),
+    )
+    print(json.dumps(totals))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_workload(args)
+        return
+
+    print(f"{'mode':<10}{'ops/s':>10}{'reads':>9}{'writes':>9}{'errors':>8}{'read p50 ms':>13}{'read p99 ms':>13}")
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    for mode, tuning in (('default', '0'), ('tuned', '1')):
+        env = dict(os.environ, DB_TUNING=tuning,
+                   DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_tuning.db'))
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', '--threads', str(args.threads),
+             '--seconds', str(args.seconds), '--write-ratio', str(args.write_ratio)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<10}{result['ops_per_sec']:>10.0f}{result['reads']:>9}{result['writes']:>9}"
+              f"{result['errors']:>8}{result['read_p50_ms']:>13.2f}{result['read_p99_ms']:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
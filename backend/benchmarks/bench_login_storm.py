@@ -0,0 +1,138 @@
+"""
+Load test: catalogue latency during a login storm
+
+Starts the app in a threaded WSGI server (a separate process) and measures
+GET /api/hotels latency from a few probe threads, first with no other
+load and then while many threads hammer POST /login with a valid password.
+The storm is run once with hashing inline on the request threads
+(PASSWORD_HASH_WORKERS=0) and once with the bounded, low-priority hashing
+pool, in a fresh server each time.
+
+Usage:
+    python benchmarks/bench_login_storm.py --storm-threads 32 --seconds 5
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def serve(port):
+    from werkzeug.serving import make_server
+    from app import app, init_db
+
+    with app.app_context():
+        init_db()
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status
+
+
+def start_server(port, workers, database):
+    env = dict(os.environ, DATABASE_URL=database, PASSWORD_HASH_WORKERS=str(workers))
+    env.setdefault('SECRET_KEY', 'bench')
+    process = subprocess.Popen([sys.executable, __file__, '--serve', str(port)], env=env, cwd=BACKEND,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            request(port, 'GET', '/api/hotels')
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('server did not start')
+
+
+def measure(port, args, storm):
+    stop = threading.Event()
+    latencies = []
+    logins = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    credentials = urlencode({'username': 'storm', 'password': 'storm-password'})
+
+    def probe():
+        while not stop.is_set():
+            started = time.perf_counter()
+            request(port, 'GET', '/api/hotels')
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    def login():
+        while not stop.is_set():
+            status = request(port, 'POST', '/login', credentials)
+            with lock:
+                logins['ok' if status == 302 else 'busy'] += 1
+
+    threads = [threading.Thread(target=probe) for _ in range(args.probe_threads)]
+    if storm:
+        threads += [threading.Thread(target=login) for _ in range(args.storm_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, logins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--storm-threads', type=int, default=32)
+    parser.add_argument('--probe-threads', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='hashing pool size for the pooled run')
+    parser.add_argument('--port', type=int, default=5057)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    database = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+    runs = [('baseline (no storm)', args.workers, False),
+            ('storm, inline hashing', 0, True),
+            (f'storm, pool of {args.workers}', args.workers, True)]
+
+    print(f"{'run':<24}{'p50 ms':>9}{'p99 ms':>9}{'probes':>8}{'logins':>8}{'busy':>6}")
+    for label, workers, storm in runs:
+        server = start_server(args.port, workers, database)
+        try:
+            request(args.port, 'POST', '/register', urlencode({
+                'username': 'storm', 'email': 'storm@example.com',
+                'password': 'storm-password', 'confirm_password': 'storm-password'
+            }))
+            latencies, logins = measure(args.port, args, storm)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f'{label:<24}{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.99):>9.1f}'
+              f"{len(latencies):>8}{logins['ok']:>8}{logins['busy']:>6}")
+
+
+if __name__ == '__main__':
+    main()
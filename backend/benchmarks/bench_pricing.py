@@ -0,0 +1,154 @@
+"""
+Benchmark: batch pricing engine quotes/sec
+
+Seeds a throwaway SQLite database with hotels, rooms, seasonal and weekend
+rate plans and length-of-stay discounts, then prices every room for a set
+of stays two ways:
+
+- per quote: walk each night of each stay and pick the winning rate plan,
+  as a straightforward per-room implementation would (plans preloaded, so
+  only the computation is compared)
+- ``pricing.quote_many()``: one calendar per rate group, prefix sums,
+  O(1) per quote
+
+Both produce integer cents and the totals are checked to be identical.
+
+Usage:
+    python benchmarks/bench_pricing.py --hotels 200 --rooms-per-hotel 50 --stays 40
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOM_TYPES = [('Standard Room', 99, 2), ('Deluxe Room', 149, 2), ('Suite', 249, 4), ('Executive Suite', 399, 4)]
+
+
+def seed(db, models, hotels, rooms_per_hotel, start, rng):
+    Hotel, Room, RatePlan, StayDiscount = models
+    db.session.execute(Hotel.__table__.insert(), [
+        {'id': i, 'name': f'Hotel {i}', 'city': 'Bench', 'star_rating': 3, 'is_active': True}
+        for i in range(1, hotels + 1)
+    ])
+    rooms = []
+    plans = []
+    discounts = []
+    for hotel_id in range(1, hotels + 1):
+        for number in range(rooms_per_hotel):
+            room_type, price, capacity = rng.choice(ROOM_TYPES)
+            rooms.append({'hotel_id': hotel_id, 'room_number': str(number), 'room_type': room_type,
+                          'price_per_night_cents': (price + rng.randint(0, 20)) * 100, 'capacity': capacity,
+                          'is_available': True})
+            rooms[-1]['price_per_night'] = rooms[-1]['price_per_night_cents'] / 100
+        plans.append({'hotel_id': hotel_id, 'name': 'Weekend', 'weekdays': '4,5', 'adjustment_percent': 15, 'priority': 0})
+        season = start + timedelta(days=rng.randint(0, 60))
+        plans.append({'hotel_id': hotel_id, 'name': 'High season', 'start_date': season,
+                      'end_date': season + timedelta(days=21), 'adjustment_percent': 30, 'priority': 1})
+        plans.append({'hotel_id': hotel_id, 'room_type': 'Suite', 'name': 'Event',
+                      'start_date': season + timedelta(days=5), 'end_date': season + timedelta(days=8),
+                      'nightly_rate_cents': 45000, 'priority': 2})
+        discounts.append({'hotel_id': hotel_id, 'min_nights': 7, 'percent_off': 10})
+        discounts.append({'hotel_id': hotel_id, 'min_nights': 14, 'percent_off': 15})
+    db.session.execute(Room.__table__.insert(), rooms)
+    # executemany needs the same keys in every row
+    plan_defaults = {'room_type': None, 'start_date': None, 'end_date': None, 'weekdays': None,
+                     'nightly_rate_cents': None, 'adjustment_percent': None}
+    db.session.execute(RatePlan.__table__.insert(), [{**plan_defaults, **plan} for plan in plans])
+    db.session.execute(StayDiscount.__table__.insert(), discounts)
+    db.session.commit()
+
+
+def per_quote(rooms, stays, plans_by_hotel, discounts_by_hotel, pricing):
+    """Reference implementation: every night of every stay evaluated on its own"""
+    totals = {}
+    for room in rooms:
+        base = room.price_per_night_cents
+        plans = [plan for plan in plans_by_hotel.get(room.hotel_id, ())
+                 if plan.room_type is None or plan.room_type == room.room_type]
+        room_totals = []
+        for check_in, check_out in stays:
+            subtotal = 0
+            night = check_in
+            while night < check_out:
+                rate = base
+                for plan in plans:
+                    if plan.start_date and night < plan.start_date or plan.end_date and night >= plan.end_date:
+                        continue
+                    if plan.weekdays and str(night.weekday()) not in plan.weekdays.split(','):
+                        continue
+                    if plan.nightly_rate_cents is not None:
+                        rate = plan.nightly_rate_cents
+                    else:
+                        rate = base + pricing._percent_of(base, plan.adjustment_percent)
+                subtotal += rate
+                night += timedelta(days=1)
+            nights = (check_out - check_in).days
+            percent = max([discount.percent_off for discount in discounts_by_hotel.get(room.hotel_id, ())
+                           if discount.min_nights <= nights] or [0])
+            room_totals.append(subtotal - pricing._percent_of(subtotal, percent))
+        totals[room.id] = room_totals
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=200)
+    parser.add_argument('--rooms-per-hotel', type=int, default=50)
+    parser.add_argument('--stays', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench_pricing.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+
+    from app import app
+    from models import db, Hotel, Room, RatePlan, StayDiscount
+    from migrations import upgrade_schema
+    import pricing
+
+    rng = random.Random(args.seed)
+    start = date.today() + timedelta(days=14)
+    stays = []
+    for _ in range(args.stays):
+        check_in = start + timedelta(days=rng.randint(0, 90))
+        stays.append((check_in, check_in + timedelta(days=rng.randint(1, 14))))
+
+    with app.app_context():
+        upgrade_schema()
+        seed(db, (Hotel, Room, RatePlan, StayDiscount), args.hotels, args.rooms_per_hotel, start, rng)
+        rooms = Room.query.all()
+        quotes = len(rooms) * len(stays)
+
+        began = time.perf_counter()
+        plans_by_hotel = {}
+        for plan in sorted(RatePlan.query.all(), key=lambda plan: (plan.priority, plan.room_type is not None, plan.id)):
+            plans_by_hotel.setdefault(plan.hotel_id, []).append(plan)
+        discounts_by_hotel = {}
+        for discount in StayDiscount.query.all():
+            discounts_by_hotel.setdefault(discount.hotel_id, []).append(discount)
+        reference = per_quote(rooms, stays, plans_by_hotel, discounts_by_hotel, pricing)
+        per_quote_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        batch = pricing.quote_many(rooms, stays)
+        batch_seconds = time.perf_counter() - began
+
+        mismatches = sum(
+            1 for room in rooms for expected, quote in zip(reference[room.id], batch[room.id])
+            if expected != quote.total_cents
+        )
+
+        print(f'{len(rooms)} rooms x {len(stays)} stays = {quotes} quotes')
+        print(f'per quote:     {per_quote_seconds:8.3f}s  {quotes / per_quote_seconds:12,.0f} quotes/sec')
+        print(f'quote_many():  {batch_seconds:8.3f}s  {quotes / batch_seconds:12,.0f} quotes/sec')
+        print(f'mismatched totals: {mismatches}')
+
+
+if __name__ == '__main__':
+    main()
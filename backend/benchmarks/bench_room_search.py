@@ -0,0 +1,160 @@
+"""
+Benchmark: /api/rooms/search against a large catalogue
+
+Seeds a throwaway SQLite database with synthetic hotels, rooms and
+non-overlapping bookings (bulk multi-row inserts, in chunks), then times
+representative searches through the test client and compares them with the
+per-room approach the HTML pages use (load candidate rooms, then one overlap
+query per room).
+
+Usage:
+    python benchmarks/bench_room_search.py --rooms 100000 --bookings 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = ['New York', 'Miami', 'Denver', 'Chicago', 'Phoenix', 'Seattle', 'Boston', 'Austin',
+          'Portland', 'Atlanta', 'Dallas', 'San Diego']
+ROOM_TYPES = [('single', 1, 80), ('double', 2, 140), ('deluxe', 3, 220), ('suite', 4, 400)]
+CHUNK = 20000
+
+
+def insert_chunked(db, table, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            db.session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+    db.session.commit()
+
+
+def seed(db, models, rooms, bookings, rng):
+    User, Hotel, Room, Booking = models
+    today = date.today()
+    now = datetime.utcnow()
+    hotels = max(1, rooms // 50)
+
+    db.session.execute(User.__table__.insert(), [{
+        'username': 'bench', 'email': 'bench@example.com', 'password_hash': '-', 'created_at': now, 'is_active': True
+    }])
+    insert_chunked(db, Hotel.__table__, ({
+        'id': i, 'name': f'Hotel {i}', 'city': CITIES[i % len(CITIES)], 'country': 'USA',
+        'star_rating': rng.randint(1, 5), 'is_active': True, 'created_at': now,
+    } for i in range(1, hotels + 1)))
+
+    room_hotel = {}
+
+    def room_rows():
+        for i in range(1, rooms + 1):
+            room_type, capacity, base = rng.choice(ROOM_TYPES)
+            room_hotel[i] = (i - 1) % hotels + 1
+            price = (base + rng.randint(0, 60)) * 100
+            yield {
+                'id': i, 'hotel_id': room_hotel[i], 'room_number': str(i), 'room_type': room_type,
+                'price_per_night_cents': price, 'price_per_night': price / 100, 'capacity': capacity,
+                'is_available': True, 'created_at': now,
+            }
+    insert_chunked(db, Room.__table__, room_rows())
+
+    per_room = max(1, bookings // rooms)
+
+    def booking_rows():
+        # Consecutive stays per room with gaps, so bookings never overlap
+        for room_id in range(1, rooms + 1):
+            day = today - timedelta(days=rng.randint(0, 60))
+            for _ in range(per_room):
+                day += timedelta(days=rng.randint(0, 6))
+                nights = rng.randint(1, 7)
+                yield {
+                    'user_id': 1, 'hotel_id': room_hotel[room_id], 'room_id': room_id,
+                    'check_in_date': day, 'check_out_date': day + timedelta(days=nights),
+                    'number_of_guests': 1, 'total_price_cents': 10000 * nights, 'total_price': 100.0 * nights,
+                    'status': rng.choice(['confirmed', 'confirmed', 'pending', 'cancelled', 'completed']),
+                    'created_at': now, 'updated_at': now,
+                }
+                day += timedelta(days=nights)
+    insert_chunked(db, Booking.__table__, booking_rows())
+    return hotels, per_room * rooms
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rooms', type=int, default=100000)
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench_room_search.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+
+    from app import app
+    from models import db, User, Hotel, Room, Booking
+    from migrations import upgrade_schema
+    from availability import ACTIVE_STATUSES
+
+    client = app.test_client()
+    check_in = (date.today() + timedelta(days=20)).isoformat()
+    check_out = (date.today() + timedelta(days=23)).isoformat()
+    searches = [
+        ('city + dates', f'city=Denver&check_in={check_in}&check_out={check_out}&limit=20'),
+        ('city + guests + price', f'city=Miami&guests=3&max_price=250&check_in={check_in}&check_out={check_out}&limit=20'),
+        ('all cities by rating', f'check_in={check_in}&check_out={check_out}&sort=rating&limit=20'),
+        ('no dates', 'city=Boston&guests=2&limit=20'),
+    ]
+
+    with app.app_context():
+        upgrade_schema()
+        start = time.perf_counter()
+        hotels, booked = seed(db, (User, Hotel, Room, Booking), args.rooms, args.bookings, random.Random(args.seed))
+        print(f'seeded {hotels} hotels, {args.rooms} rooms, {booked} bookings in {time.perf_counter() - start:.1f}s')
+
+        print(f"{'search':<24}{'one query ms':>14}{'rows':>6}")
+        for label, query_string in searches:
+            ms, response = timed(lambda: client.get(f'/api/rooms/search?{query_string}'), args.repeat)
+            print(f'{label:<24}{ms:>14.2f}{len(response.get_json()):>6}')
+
+        in_date = date.fromisoformat(check_in)
+        out_date = date.fromisoformat(check_out)
+
+        def per_room_search():
+            candidates = Room.query.join(Hotel).filter(Hotel.city == 'Denver', Room.is_available == True).all()
+            free = []
+            for room in candidates:
+                overlap = db.session.query(Booking.id).filter(
+                    Booking.room_id == room.id,
+                    Booking.status.in_(ACTIVE_STATUSES),
+                    Booking.check_in_date < out_date,
+                    Booking.check_out_date > in_date
+                ).first()
+                if overlap is None:
+                    free.append(room)
+            return sorted(free, key=lambda room: room.price_per_night_cents)[:20]
+
+        ms, rows = timed(per_room_search, max(1, args.repeat // 2))
+        print(f"{'per-room (city + dates)':<24}{ms:>14.2f}{len(rows):>6}")
+
+
+if __name__ == '__main__':
+    main()
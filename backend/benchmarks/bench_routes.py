@@ -0,0 +1,396 @@
+"""
+Benchmark suite: every route against a synthetic dataset
+
+Seeds a throwaway SQLite database with hotels, rooms, users and
+non-overlapping bookings at the given scale (see seeding.py), then drives
+each route (catalogue pages, booking, dashboard, JSON APIs and admin) twice:
+through the Flask test client in process, and over HTTP through a threaded WSGI
+server started in a separate process (or any running server given with
+--url, e.g. gunicorn on the same database).
+
+For every route it reports requests/sec, p50/p95/p99 latency and SQL
+statements per request (read from the Server-Timing header added by
+instrumentation.py). --output stores the results as JSON; --baseline
+compares against an earlier file and exits with status 1 when a route's
+p95 latency got worse by more than --tolerance.
+
+The HTML templates are not part of this backend; a missing template
+renders as an empty page, so the route's own queries are still measured.
+
+Usage:
+    python benchmarks/bench_routes.py --hotels 200 --rooms-per-hotel 50 --bookings 100000 --output base.json
+    python benchmarks/bench_routes.py --hotels 200 --rooms-per-hotel 50 --bookings 100000 --baseline base.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import quote_plus, urlencode, urlsplit
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+PASSWORD = 'bench-password'
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed(args):
+    """Generate the synthetic dataset; returns the ids the routes are driven with"""
+    from models import db, Booking
+    from amenities import backfill_amenities
+    from search import rebuild_search_index
+    import seeding
+
+    counts = seeding.generate(hotels=args.hotels, rooms_per_hotel=(args.rooms_per_hotel, args.rooms_per_hotel),
+                              users=args.users, bookings=args.bookings, seed=args.seed, password=PASSWORD)
+    backfill_amenities()
+    rebuild_search_index()
+
+    own_bookings = [row[0] for row in db.session.query(Booking.id).filter_by(user_id=1).limit(100)]
+    return {'hotels': counts['hotels'], 'rooms': counts['rooms'], 'own_bookings': own_bookings or [1]}
+
+
+def routes(ids):
+    """(name, method, path or path factory, body factory or None, form or json) for every benchmarked route"""
+    from seeding import CITIES
+
+    today = date.today()
+    cities = [city for city, _ in CITIES]
+
+    def hotel(rng):
+        return rng.randint(1, ids['hotels'])
+
+    def room(rng):
+        return rng.randint(1, ids['rooms'])
+
+    def stay(rng, earliest=1, latest=180):
+        check_in = today + timedelta(days=rng.randint(earliest, latest))
+        return check_in.isoformat(), (check_in + timedelta(days=rng.randint(1, 7))).isoformat()
+
+    def search_rooms(rng):
+        check_in, check_out = stay(rng)
+        return '/api/rooms/search?' + urlencode({
+            'city': rng.choice(cities), 'guests': 2, 'check_in': check_in, 'check_out': check_out, 'limit': 20
+        })
+
+    def availability(rng):
+        check_in, check_out = stay(rng)
+        return {'room_id': room(rng), 'check_in': check_in, 'check_out': check_out}
+
+    def batch(rng):
+        return {'hotel_id': hotel(rng), 'date_ranges': [dict(zip(('check_in', 'check_out'), stay(rng)))
+                                                        for _ in range(3)]}
+
+    def book(rng):
+        # Far in the future so benchmark bookings rarely collide with each other
+        check_in, check_out = stay(rng, 400, 4000)
+        return {'room_id': room(rng), 'check_in': check_in, 'check_out': check_out,
+                'guest_name': 'Bench Guest', 'guest_email': 'guest@example.com', 'number_of_guests': 1}
+
+    return [
+        ('home', 'GET', '/', None, None),
+        ('hotels', 'GET', '/hotels', None, None),
+        ('hotels_filtered', 'GET', lambda rng: f'/hotels?city={quote_plus(rng.choice(cities))}&star_rating=3',
+         None, None),
+        ('hotels_search', 'GET', '/hotels?search=property', None, None),
+        ('hotel_detail', 'GET', lambda rng: f'/hotel/{hotel(rng)}', None, None),
+        ('rooms', 'GET', '/rooms', None, None),
+        ('rooms_filtered', 'GET', lambda rng: f'/rooms?hotel_id={hotel(rng)}&max_price=250', None, None),
+        ('room_detail', 'GET', lambda rng: f'/room/{room(rng)}', None, None),
+        ('book_form', 'GET', lambda rng: f'/book?room_id={room(rng)}', None, None),
+        ('book', 'POST', '/book', book, 'form'),
+        ('dashboard', 'GET', '/dashboard', None, None),
+        ('booking_detail', 'GET', lambda rng: f"/booking/{rng.choice(ids['own_bookings'])}", None, None),
+        ('api_hotels', 'GET', '/api/hotels?limit=50', None, None),
+        ('api_hotel', 'GET', lambda rng: f'/api/hotel/{hotel(rng)}', None, None),
+        ('api_search', 'GET', lambda rng: f'/api/search?q={quote_plus(rng.choice(cities))}', None, None),
+        ('api_rooms_search', 'GET', search_rooms, None, None),
+        ('api_bookings', 'GET', '/api/bookings?limit=50', None, None),
+        ('api_check_availability', 'POST', '/api/check-availability', availability, 'json'),
+        ('api_availability_batch', 'POST', '/api/check-availability/batch', batch, 'json'),
+        ('api_quotes', 'POST', '/api/quotes', batch, 'json'),
+        ('admin', 'GET', '/admin', None, None),
+        ('admin_stats', 'GET', '/admin/stats', None, None),
+        ('admin_occupancy', 'GET', '/admin/reports/occupancy', None, None),
+    ]
+
+
+def build_request(route, rng):
+    """(method, path, body bytes, content type) for one request of ``route``"""
+    _, method, path, body, kind = route
+    path = path(rng) if callable(path) else path
+    if body is None:
+        return method, path, None, None
+    if kind == 'json':
+        return method, path, json.dumps(body(rng)).encode(), 'application/json'
+    return method, path, urlencode(body(rng)).encode(), 'application/x-www-form-urlencoded'
+
+
+def summarize(samples, elapsed):
+    latencies = [ms for ms, _, _ in samples]
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'queries_per_request': sum(queries) / len(queries) if queries else None,
+        'errors': sum(1 for _, status, _ in samples if status >= 500),
+    }
+
+
+def query_count(server_timing):
+    match = QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def allow_missing_templates(app):
+    from jinja2 import ChoiceLoader, FunctionLoader
+
+    app.jinja_loader  # resolve Flask's own loader first
+    app.jinja_env.loader = ChoiceLoader([app.jinja_env.loader, FunctionLoader(lambda name: '')])
+
+
+# Test client
+
+def run_client(app, route_list, args):
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = 1
+        flask_session['username'] = 'user1'
+
+    results = {}
+    for route in route_list:
+        rng = random.Random(f'{args.seed}:{route[0]}')
+        samples = []
+        for n in range(args.warmup + args.requests):
+            method, path, body, content_type = build_request(route, rng)
+            started = time.perf_counter()
+            response = client.open(path, method=method, data=body, content_type=content_type)
+            ms = (time.perf_counter() - started) * 1000
+            if n >= args.warmup:
+                samples.append((ms, response.status_code, query_count(response.headers.get('Server-Timing'))))
+        results[route[0]] = summarize(samples, sum(ms for ms, _, _ in samples) / 1000)
+        print_row('client', route[0], results[route[0]])
+    return results
+
+
+# WSGI server
+
+def serve(port):
+    from werkzeug.serving import make_server
+    from app import app
+
+    allow_missing_templates(app)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def http_request(host, port, method, path, body=None, content_type=None, cookie=None):
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    headers = {}
+    if content_type:
+        headers['Content-Type'] = content_type
+    if cookie:
+        headers['Cookie'] = cookie
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response
+
+
+def start_server(port):
+    process = subprocess.Popen([sys.executable, __file__, '--serve', str(port)], env=os.environ.copy(),
+                               cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            http_request('127.0.0.1', port, 'GET', '/api/hotels?limit=1')
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('server did not start')
+
+
+def run_server(url, route_list, args):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+
+    response = http_request(host, port, 'POST', '/login', urlencode({'username': 'user1', 'password': PASSWORD}),
+                            'application/x-www-form-urlencoded')
+    cookie = response.getheader('Set-Cookie', '').split(';', 1)[0]
+    if response.status != 302 or not cookie:
+        raise RuntimeError(f'could not log in to {url} (status {response.status})')
+
+    results = {}
+    for route in route_list:
+        samples = []
+        lock = threading.Lock()
+
+        def worker(worker_id, count, record):
+            rng = random.Random(f'{args.seed}:{route[0]}:{worker_id}')
+            for _ in range(count):
+                method, path, body, content_type = build_request(route, rng)
+                started = time.perf_counter()
+                response = http_request(host, port, method, path, body, content_type, cookie)
+                ms = (time.perf_counter() - started) * 1000
+                if record:
+                    with lock:
+                        samples.append((ms, response.status, query_count(response.getheader('Server-Timing'))))
+
+        per_thread = max(1, args.requests // args.concurrency)
+        for record, count in ((False, max(1, args.warmup // args.concurrency)), (True, per_thread)):
+            threads = [threading.Thread(target=worker, args=(i, count, record)) for i in range(args.concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        results[route[0]] = summarize(samples, time.perf_counter() - started)
+        print_row('server', route[0], results[route[0]])
+    return results
+
+
+# Reporting
+
+def print_header():
+    print(f"{'mode':<8}{'route':<26}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'5xx':>5}")
+
+
+def print_row(mode, name, result):
+    queries = result['queries_per_request']
+    print(f"{mode:<8}{name:<26}{result['rps']:>9.1f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+          f"{result['p99_ms']:>9.2f}{'-' if queries is None else f'{queries:.1f}':>9}{result['errors']:>5}")
+
+
+def compare(results, baseline, tolerance):
+    """Print p95 and throughput changes against ``baseline``; returns the regressed (mode, route) pairs"""
+    regressions = []
+    print(f"\n{'mode':<8}{'route':<26}{'p95 ms':>9}{'base':>9}{'change':>9}{'req/s change':>14}")
+    for mode, routes_result in results.items():
+        for name, result in routes_result.items():
+            base = baseline.get('results', {}).get(mode, {}).get(name)
+            if base is None:
+                continue
+            change = result['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+            rps_change = result['rps'] / base['rps'] - 1 if base['rps'] else 0.0
+            # Ignore sub-millisecond differences, which are mostly timer noise
+            regressed = change > tolerance and result['p95_ms'] - base['p95_ms'] > 1.0
+            if regressed:
+                regressions.append((mode, name))
+            print(f"{mode:<8}{name:<26}{result['p95_ms']:>9.2f}{base['p95_ms']:>9.2f}{change:>+9.0%}"
+                  f"{rps_change:>+14.0%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=100)
+    parser.add_argument('--rooms-per-hotel', type=int, default=20)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route and mode')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads against the WSGI server')
+    parser.add_argument('--mode', choices=['client', 'server', 'both'], default='both')
+    parser.add_argument('--only', help='comma-separated route names to run')
+    parser.add_argument('--url', help='benchmark an already running server on the seeded database')
+    parser.add_argument('--port', type=int, default=5058)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 increase over the baseline')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_routes.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+
+    from app import app
+    from migrations import upgrade_schema
+
+    allow_missing_templates(app)
+    with app.app_context():
+        upgrade_schema()
+        started = time.perf_counter()
+        ids = seed(args)
+        print(f"seeded {ids['hotels']} hotels, {ids['rooms']} rooms, {args.users} users, {args.bookings} bookings "
+              f'in {time.perf_counter() - started:.1f}s')
+
+    route_list = routes(ids)
+    if args.only:
+        names = set(args.only.split(','))
+        route_list = [route for route in route_list if route[0] in names]
+
+    results = {}
+    print_header()
+    if args.mode in ('client', 'both'):
+        results['client'] = run_client(app, route_list, args)
+    if args.mode in ('server', 'both'):
+        if args.url:
+            results['server'] = run_server(args.url, route_list, args)
+        else:
+            server = start_server(args.port)
+            try:
+                results['server'] = run_server(f'http://127.0.0.1:{args.port}', route_list, args)
+            finally:
+                server.terminate()
+                server.wait()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': {'hotels': args.hotels, 'rooms': ids['rooms'], 'users': args.users, 'bookings': args.bookings},
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nwrote {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} route(s) regressed by more than {args.tolerance:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: full-text search index vs. the old ILIKE hotel search
+
+Seeds a throwaway SQLite database with synthetic hotels and times the same
+queries through ``Hotel.name.ilike('%x%')`` (the previous /hotels search),
+through ILIKE over every searchable column (the coverage the index gives)
+and through ``search.search_hotel_ids()``. All three fetch ids only, capped
+at the same limit.
+
+Usage:
+    python benchmarks/bench_search.py --hotels 50000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import or_
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ['Grand', 'Plaza', 'Seaside', 'Mountain', 'Lodge', 'Resort', 'Inn', 'Oasis', 'Lakeside',
+         'Royal', 'Harbor', 'Garden', 'Palace', 'Summit', 'Riverside', 'Central', 'Park', 'Bay']
+CITIES = ['New York', 'Miami', 'Denver', 'Chicago', 'Phoenix', 'Seattle', 'Boston', 'Austin']
+AMENITIES = ['WiFi', 'Pool', 'Spa', 'Gym', 'Restaurant', 'Bar', 'Parking', 'Beach', 'Sauna']
+# Broad terms match thousands of rows; the last two are selective, where ILIKE must scan
+QUERIES = ['plaza', 'seaside resort', 'spa', 'denver lodge', 'hotel 12345', 'zanzibar']
+
+
+def seed(db, Hotel, count, rng):
+    rows = []
+    for i in range(count):
+        rows.append({
+            'name': f'{rng.choice(WORDS)} {rng.choice(WORDS)} Hotel {i}',
+            'description': ' '.join(rng.choice(WORDS).lower() for _ in range(20)),
+            'city': rng.choice(CITIES),
+            'country': 'USA',
+            'star_rating': rng.randint(1, 5),
+            'amenities': ','.join(rng.sample(AMENITIES, 4)),
+            'is_active': True,
+        })
+    db.session.execute(Hotel.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench_search.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+
+    from app import app
+    from models import db, Hotel
+    from migrations import upgrade_schema
+    from search import HOTEL_COLUMNS, backend, rebuild_search_index, search_hotel_ids
+
+    with app.app_context():
+        upgrade_schema()
+        seed(db, Hotel, args.hotels, random.Random(args.seed))
+        rebuild_search_index()
+
+        print(f'{args.hotels} hotels, search backend: {backend()}')
+        print(f"{'query':<16}{'name ilike ms':>14}{'all ilike ms':>14}{'rows':>7}{'fts ms':>10}{'rows':>7}")
+        for query_text in QUERIES:
+            name_ms, _ = timed(lambda: db.session.query(Hotel.id).filter(
+                Hotel.name.ilike(f'%{query_text}%')).limit(args.limit).all(), args.repeat)
+            all_ms, all_rows = timed(lambda: db.session.query(Hotel.id).filter(*[
+                or_(*[getattr(Hotel, column).ilike(f'%{token}%') for column in HOTEL_COLUMNS])
+                for token in query_text.split()
+            ]).limit(args.limit).all(), args.repeat)
+            fts_ms, fts_rows = timed(lambda: search_hotel_ids(query_text, limit=args.limit), args.repeat)
+            print(f'{query_text:<16}{name_ms:>14.2f}{all_ms:>14.2f}{len(all_rows):>7}'
+                  f'{fts_ms:>10.2f}{len(fts_rows):>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: rows/sec serializing hotels, rooms and bookings to JSON
+
+Seeds a throwaway SQLite database with a synthetic dataset (see seeding.py)
+and, for each model, times the whole path from query to JSON text:
+
+    orm + stdlib          ORM objects, to_dict(), Flask's stdlib JSON provider
+    orm + orjson          ORM objects, to_dict(), the orjson provider
+    projection + stdlib   column rows rebuilt by serializers.Projection, stdlib
+    projection + orjson   column rows rebuilt by serializers.Projection, orjson
+
+Every variant is checked to produce the same documents.
+
+Usage:
+    python benchmarks/bench_serialization.py --bookings 100000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hotels', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench_serialization.db')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ.setdefault('BOOKING_SWEEP_INTERVAL', '0')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy.orm import joinedload
+
+    from app import app
+    from models import db, Hotel, Room, Booking
+    from migrations import upgrade_schema
+    from serializers import ROOM, OrjsonProvider, booking_query, hotel_query, orjson
+    import seeding
+
+    providers = [('stdlib', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    else:
+        print('orjson is not installed; timing the stdlib provider only')
+
+    with app.app_context():
+        upgrade_schema()
+        seeding.generate(hotels=args.hotels, users=1000, bookings=args.bookings, seed=args.seed)
+
+        def projected(query_and_serializer, order):
+            query, serialize = query_and_serializer
+            return lambda: [serialize(row) for row in query.order_by(order)]
+
+        booking_details = (joinedload(Booking.hotel), joinedload(Booking.room))
+        cases = [
+            ('hotels', lambda: [hotel.to_dict() for hotel in Hotel.query.order_by(Hotel.id)],
+             projected(hotel_query(), Hotel.id)),
+            ('rooms', lambda: [room.to_dict() for room in Room.query.order_by(Room.id)],
+             projected((db.session.query(*ROOM.columns), ROOM.serialize), Room.id)),
+            ('bookings depth 0', lambda: [booking.to_dict(depth=0) for booking in Booking.query.order_by(Booking.id)],
+             projected(booking_query(depth=0), Booking.id)),
+            ('bookings depth 1', lambda: [booking.to_dict() for booking in
+                                          Booking.query.options(*booking_details).order_by(Booking.id)],
+             projected(booking_query(depth=1), Booking.id)),
+        ]
+
+        print(f"{'model':<18}{'rows':>8}" + ''.join(f'{f"{source} + {name}":>22}' for source in ('orm', 'projection')
+                                                  for name, _ in providers) + '   (rows/sec)')
+        for label, orm_rows, projected_rows in cases:
+            rates = []
+            documents = []
+            rows = 0
+            for load in (orm_rows, projected_rows):
+                for _, provider in providers:
+                    def run():
+                        data = load()
+                        text = provider.dumps(data)
+                        # Don't let the identity map carry objects between runs
+                        db.session.expunge_all()
+                        return len(data), text
+                    seconds, (rows, text) = timed(run, args.repeat)
+                    rates.append(rows / seconds)
+                    documents.append(json.loads(text))
+            assert all(document == documents[0] for document in documents), f'{label}: outputs differ'
+            print(f'{label:<18}{rows:>8}' + ''.join(f'{rate:>22,.0f}' for rate in rates))
+
+
+if __name__ == '__main__':
+    main()
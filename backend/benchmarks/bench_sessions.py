@@ -0,0 +1,87 @@
+"""
+Benchmark: per-request session overhead for each SESSION_BACKEND
+
+Builds a minimal Flask app per backend, logs in once (storing the same
+``user_id``/``username``/``email`` payload the real app stores) and times
+requests that read the session, and requests that modify it.
+
+Usage:
+    python benchmarks/bench_sessions.py --requests 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session
+
+from session_store import init_sessions
+
+BACKENDS = ['cookie', 'local-shared', 'filesystem']
+
+
+def build_app(backend, workdir):
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='bench',
+        SESSION_BACKEND=backend,
+        SESSION_TYPE='filesystem',
+        SESSION_FILE_DIR=os.path.join(workdir, backend),
+        SESSION_PERMANENT=False,
+        # Flask-Session 0.5 signed ids are bytes, which Werkzeug 3 cookies reject
+        SESSION_USE_SIGNER=False,
+    )
+    init_sessions(app)
+
+    @app.route('/login')
+    def login():
+        session['user_id'] = 1
+        session['username'] = 'benchmark'
+        session['email'] = 'benchmark@example.com'
+        return 'ok'
+
+    @app.route('/read')
+    def read():
+        return str(session.get('user_id'))
+
+    @app.route('/write')
+    def write():
+        session['visits'] = session.get('visits', 0) + 1
+        return 'ok'
+
+    @app.route('/none')
+    def none():
+        return 'ok'
+
+    return app
+
+
+def time_requests(client, path, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(path)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    print(f"{'backend':<14}{'no session us':>15}{'read us':>10}{'write us':>10}")
+    for backend in BACKENDS:
+        app = build_app(backend, workdir)
+        client = app.test_client()
+        client.get('/login')
+        baseline = time_requests(app.test_client(), '/none', args.requests)
+        read = time_requests(client, '/read', args.requests)
+        write = time_requests(client, '/write', args.requests)
+        print(f'{backend:<14}{baseline:>15.1f}{read:>10.1f}{write:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+Read-through cache for hotel and room catalogue data
+
+Backends are chosen with ``CACHE_TYPE``:
+
+- ``lru`` (default): in-process LRU with per-entry TTL
+- ``redis``: shared Redis store at ``CACHE_REDIS_URL`` (requires ``redis``)
+- ``local-shared``: in-process stand-in for the shared store, for tests
+- ``null``: no caching
+
+Values must be JSON-serializable (e.g. ``to_dict()`` output) so every
+backend stores the same thing.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUBackend:
+    """In-process least-recently-used cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LocalSharedStore:
+    """Minimal in-process stand-in for the Redis commands SharedBackend uses"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def sweep(self):
+        """Drop expired entries; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [name for name, (_, expires) in self._data.items() if expires is not None and expires <= now]
+            for name in expired:
+                del self._data[name]
+        return len(expired)
+
+    def incr(self, name):
+        with self._lock:
+            value, expires = self._data.get(name, (b'0', None))
+            value = str(int(value) + 1).encode()
+            self._data[name] = (value, expires)
+            return int(value)
+
+
+class SharedBackend:
+    """Cache shared between app processes through a Redis-compatible client
+
+    ``clear()`` bumps a generation counter that is part of every key rather
+    than scanning the keyspace; stale generations simply expire.
+    """
+
+    def __init__(self, client, prefix='catalogue:'):
+        self.client = client
+        self.prefix = prefix
+        self.evictions = 0
+
+    def _generation(self):
+        return (self.client.get(self.prefix + 'generation') or b'0').decode()
+
+    def _key(self, key):
+        return f'{self.prefix}{self._generation()}:{key}'
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self._key(key), json.dumps(value).encode(), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self._key(key) for key in keys])
+
+    def clear(self):
+        self.client.incr(self.prefix + 'generation')
+
+
+class NullBackend:
+    """Backend that never stores anything"""
+
+    evictions = 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class CatalogueCache:
+    """Read-through cache with hit/miss counters"""
+
+    def __init__(self, app=None):
+        self.backend = LRUBackend()
+        self.default_ttl = 300
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the backend from the application config"""
+        cache_type = app.config.get('CACHE_TYPE', 'lru')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+
+        if cache_type == 'redis':
+            import redis
+            self.backend = SharedBackend(redis.Redis.from_url(app.config['CACHE_REDIS_URL']))
+        elif cache_type == 'local-shared':
+            self.backend = SharedBackend(LocalSharedStore())
+        elif cache_type == 'null':
+            self.backend = NullBackend()
+        else:
+            self.backend = LRUBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+        app.extensions['catalogue_cache'] = self
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss"""
+        value = self.backend.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+        self._count('misses')
+        value = loader()
+        self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+        return value
+
+    async def call(self, method, *args):
+        """Call a backend method from async code; shared (network) backends run in a worker thread"""
+        function = getattr(self.backend, method)
+        if isinstance(self.backend, SharedBackend):
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def get_or_set_async(self, key, loader, ttl=None):
+        """``get_or_set`` for async code: ``loader()`` is awaited"""
+        value = await self.call('get', key)
+        if value is not None:
+            self._count('hits')
+            return value
+        self._count('misses')
+        value = await loader()
+        await self.call('set', key, value, self.default_ttl if ttl is None else ttl)
+        return value
+
+    def delete(self, *keys):
+        """Invalidate specific keys after a write"""
+        self.backend.delete(*keys)
+        self._count('invalidations', len(keys))
+
+    def clear(self):
+        """Invalidate everything"""
+        self.backend.clear()
+        self._count('invalidations')
+
+    def stats(self):
+        """Hit/miss/invalidation counters for this process"""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+        counters['evictions'] = self.backend.evictions
+        counters['backend'] = type(self.backend).__name__
+        return counters
+
+
+cache = CatalogueCache()
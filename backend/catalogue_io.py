@@ -0,0 +1,230 @@
+"""
+Bulk import/export of hotels, rooms and bookings
+
+Files are streamed row by row (CSV with a header line, or NDJSON with one
+object per line) and written in chunks with one multi-row INSERT ... ON
+CONFLICT DO UPDATE per chunk, so memory stays flat regardless of file
+size. Hotels upsert on ``id`` and rooms on ``(hotel_id, room_number)``.
+Rows are numbered by their line in the file; a line that cannot be read or
+converted is reported by number and skipped.
+"""
+import csv
+import json
+import time
+from datetime import date, datetime
+
+from sqlalchemy import insert
+
+from models import db, cents_to_amount, sync_id_sequences, Hotel, Room, Booking
+from pricing import to_cents
+
+IMPORT_MODELS = {'hotels': Hotel, 'rooms': Room}
+EXPORT_MODELS = {'hotels': Hotel, 'rooms': Room, 'bookings': Booking}
+
+# Columns identifying an existing row for upserts
+CONFLICT_COLUMNS = {'hotels': ['id'], 'rooms': ['hotel_id', 'room_number']}
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+
+# Integer cents columns and the legacy amount columns mirroring them; files
+# may carry either, the cents value wins when both are given
+MONEY_COLUMNS = {'price_per_night_cents': 'price_per_night'}
+
+
+def detect_format(path, file_format=None):
+    """'csv' or 'ndjson', from the explicit format or the file extension"""
+    if file_format:
+        return file_format
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_rows(handle, file_format):
+    """Yield ``(line_number, record)`` for each record of an open CSV or NDJSON file
+
+    An NDJSON line that is not valid JSON is yielded as its text, which
+    ``validate_row`` rejects like any other record that is not an object.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(handle)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(handle, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError:
+            yield number, line
+
+
+def _convert(column, value):
+    if value is None or value == '':
+        return None
+    python_type = column.type.python_type
+    if python_type is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() in TRUE_VALUES
+    if python_type is datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if python_type is date:
+        return value if isinstance(value, date) else date.fromisoformat(value)
+    return python_type(value)
+
+
+def validate_row(model, raw):
+    """Convert a raw record to column values; raises ValueError describing the problem"""
+    if not isinstance(raw, dict):
+        raise ValueError(f'not a JSON object: {str(raw)[:80]!r}')
+    row = {}
+    for column in model.__table__.columns:
+        if column.key not in raw:
+            continue
+        try:
+            row[column.key] = _convert(column, raw[column.key])
+        except (TypeError, ValueError):
+            raise ValueError(f'invalid {column.key}: {raw[column.key]!r}')
+
+    for cents, amount in MONEY_COLUMNS.items():
+        if cents not in model.__table__.columns:
+            continue
+        if row.get(cents) is None and row.get(amount) is not None:
+            try:
+                row[cents] = to_cents(raw[amount])
+            except ValueError:
+                raise ValueError(f'invalid {amount}: {raw[amount]!r}')
+        if row.get(cents) is not None:
+            row[amount] = cents_to_amount(row[cents])
+
+    for column in model.__table__.columns:
+        if not column.nullable and not column.primary_key and row.get(column.key) is None:
+            if column.default is not None:
+                row.pop(column.key, None)
+            else:
+                raise ValueError(f'missing {column.key}')
+
+    # Fill client-side defaults so every row in a chunk has the same keys
+    for column in model.__table__.columns:
+        if column.key not in row and column.default is not None and not column.primary_key:
+            default = column.default.arg
+            row[column.key] = default(None) if callable(default) else default
+
+    return row
+
+
+def _upsert(entity, model, rows):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.session.execute(insert(model.__table__), rows)
+        return
+
+    conflict = CONFLICT_COLUMNS[entity]
+    # One row per conflict key: a statement may not update the same row twice,
+    # so the last row for a key wins, as it does across chunks
+    unique = {}
+    for position, row in enumerate(rows):
+        key = tuple(row.get(column) for column in conflict)
+        unique[position if None in key else key] = row
+
+    # Group by key set: rows without an id (new hotels) cannot conflict on id
+    groups = {}
+    for row in unique.values():
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    for keys, group in groups.items():
+        statement = dialect_insert(model.__table__)
+        if all(column in keys for column in conflict):
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict,
+                set_={key: statement.excluded[key] for key in keys if key not in conflict and key != 'created_at'}
+            )
+        db.session.execute(statement, group)
+
+
+def import_rows(entity, rows, chunk_size=1000, progress=None):
+    """Validate and upsert ``(row_number, raw record)`` pairs in chunks
+
+    Returns ``(imported, errors)`` where ``errors`` is a list of
+    ``(row_number, message)``. ``progress(imported, elapsed_seconds)`` is
+    called after each chunk.
+    """
+    model = IMPORT_MODELS[entity]
+    started = time.perf_counter()
+    imported = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal imported
+        valid = chunk
+        if entity == 'rooms':
+            # One lookup per chunk instead of trusting the foreign key (SQLite does not enforce it)
+            hotel_ids = {row['hotel_id'] for _, row in chunk}
+            known = {hotel_id for (hotel_id,) in db.session.query(Hotel.id).filter(Hotel.id.in_(hotel_ids))}
+            valid = []
+            for number, row in chunk:
+                if row['hotel_id'] in known:
+                    valid.append((number, row))
+                else:
+                    errors.append((number, f"unknown hotel_id: {row['hotel_id']}"))
+        if valid:
+            _upsert(entity, model, [row for _, row in valid])
+            db.session.commit()
+        imported += len(valid)
+        chunk.clear()
+        if progress:
+            progress(imported, time.perf_counter() - started)
+
+    for number, raw in rows:
+        try:
+            chunk.append((number, validate_row(model, raw)))
+        except ValueError as error:
+            errors.append((number, str(error)))
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    # Rows may carry explicit ids, which Postgres sequences do not see
+    sync_id_sequences(model)
+    db.session.commit()
+    return imported, errors
+
+
+def export_rows(entity, handle, file_format, since=None, chunk_size=1000, progress=None):
+    """Stream every row of ``entity`` to an open file; returns the row count
+
+    ``since`` limits bookings to those created on or after that datetime.
+    """
+    model = EXPORT_MODELS[entity]
+    columns = [column.key for column in model.__table__.columns]
+    query = db.session.query(*[getattr(model, column) for column in columns]).order_by(model.id)
+    if since is not None and entity == 'bookings':
+        query = query.filter(Booking.created_at >= since)
+
+    writer = None
+    if file_format == 'csv':
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+
+    started = time.perf_counter()
+    exported = 0
+    for row in query.yield_per(chunk_size).execution_options(stream_results=True):
+        values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in row]
+        if writer:
+            writer.writerow(values)
+        else:
+            handle.write(json.dumps(dict(zip(columns, values))) + '\n')
+        exported += 1
+        if progress and exported % chunk_size == 0:
+            progress(exported, time.perf_counter() - started)
+
+    if progress:
+        progress(exported, time.perf_counter() - started)
+    return exported
@@ -0,0 +1,120 @@
+"""
+SQLAlchemy engine configuration for the Hotel Booking System
+
+Everything is driven by environment variables so deployments can tune the
+database layer without code changes.
+
+SQLite (connection pragmas applied on every new connection):
+    SQLITE_JOURNAL_MODE   journal mode (default: WAL; readers no longer block on writers)
+    SQLITE_SYNCHRONOUS    synchronous level (default: NORMAL; safe with WAL)
+    SQLITE_MMAP_SIZE      bytes of the database file to memory-map (default: 256 MiB)
+    SQLITE_BUSY_TIMEOUT   milliseconds to wait for a lock before failing (default: 5000)
+    SQLITE_CACHE_SIZE     page cache size, negative means KiB (default: -65536, 64 MiB)
+
+Server databases (Postgres, MySQL):
+    DB_POOL_SIZE          persistent connections per process (default: 10)
+    DB_MAX_OVERFLOW       extra connections allowed under burst (default: 20)
+    DB_POOL_TIMEOUT       seconds to wait for a free connection (default: 30)
+    DB_POOL_RECYCLE       seconds before a connection is replaced (default: 1800)
+    DB_POOL_PRE_PING      test connections before use (default: 1)
+
+DB_TUNING=0 disables all of the above and uses SQLAlchemy defaults.
+
+``async_database_url()`` maps DATABASE_URL to the asyncio driver used by
+the ASGI entry point (aiosqlite, asyncpg or aiomysql), and
+``async_engine_options()`` gives its engine the same pool settings; for
+SQLite files DB_POOL_SIZE/DB_MAX_OVERFLOW size that engine's pool too.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# asyncio DBAPI driver per backend, for the ASGI entry point
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg', 'mysql': 'aiomysql'}
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() not in ('0', 'false', 'no', 'off')
+
+
+def tuning_enabled():
+    """Whether engine tuning is turned on (DB_TUNING, default on)"""
+    return _env_flag('DB_TUNING', '1')
+
+
+def engine_options(database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``database_url``"""
+    if not tuning_enabled() or make_url(database_url).get_backend_name() == 'sqlite':
+        return {}
+
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', '1'),
+    }
+
+
+def sqlite_pragmas():
+    """PRAGMA name -> value applied to each new SQLite connection"""
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -65536)),
+    }
+
+
+def async_database_url(database_url):
+    """``database_url`` with its backend's asyncio driver; raises ValueError for unknown backends"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver known for {backend} databases')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def async_engine_options(database_url):
+    """create_async_engine() options for ``database_url``"""
+    options = engine_options(database_url)
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+        # aiosqlite otherwise opens (and sets pragmas on) a new connection per session
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        )
+    return options
+
+
+def init_engine(app, db):
+    """Install connect hooks on the app's engine; call after ``db.init_app(app)``"""
+    if not tuning_enabled():
+        return
+
+    with app.app_context():
+        install_pragmas(db.engine)
+
+
+def install_pragmas(engine):
+    """Apply ``sqlite_pragmas()`` to each new connection of a SQLite ``engine`` (or an AsyncEngine's ``sync_engine``)"""
+    if not tuning_enabled() or engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas()
+    # journal_mode is a property of the database file and in-memory databases cannot use WAL
+    in_memory = engine.url.database in (None, '', ':memory:')
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if name == 'journal_mode' and in_memory:
+                continue
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,269 @@
+"""
+Conditional GET and response caching for the catalogue APIs
+
+Each cacheable resource (``hotels``, ``hotel:<id>``) has a version stamp:
+the time it last changed, stored in the ``catalogue_versions`` table and
+cached in the catalogue cache. Admin writes and catalogue imports bump the
+stamps of what they change; nothing else writes them, reads included. A
+response's strong ETag is derived from its URL, the stamps of the
+resources it shows and its content coding, and ``Last-Modified`` is the
+newest of those stamps. As a result:
+
+- ``If-None-Match`` and ``If-Modified-Since`` revalidations are answered
+  with a 304 from the stamps alone, before the view runs
+- otherwise the pre-serialized body for the same ETag is served from an
+  in-process LRU, already gzip- or brotli-compressed; only a miss runs the
+  view
+
+Cached stamps expire after ``CACHE_DEFAULT_TTL``, like the cached payloads,
+and are then read again from the table, so an unchanged resource keeps its
+ETag while a change made by another process (e.g. a CLI import with the
+per-process ``lru`` backend) shows up within that time at worst.
+``Cache-Control`` lets browsers reuse a response for ``HTTP_CACHE_MAX_AGE``
+seconds and shared caches (CDNs) for ``HTTP_CACHE_SHARED_MAX_AGE``.
+Brotli needs the optional ``brotli`` package. ``CACHE_TYPE=null`` turns
+the layer off.
+"""
+import asyncio
+import gzip
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import func
+
+from cache import LRUBackend
+from models import db, CatalogueVersion
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings in order of preference
+CODINGS = ('br', 'gzip')
+
+# Pseudo-resource whose stamp applies to every resource (bumped by bump_all)
+ALL_RESOURCES = '*'
+
+# Stamp of a resource no write has bumped yet
+DEFAULT_STAMP = 0.0
+
+# Headers of a view's response that are not stored with its body
+UNSTORED_HEADERS = {'content-length', 'content-encoding', 'set-cookie', 'server-timing', 'etag',
+                    'last-modified', 'cache-control', 'vary', 'date'}
+
+
+def compress(body, coding):
+    """``body`` encoded with ``coding`` ('br' or 'gzip'); gzip output is byte-for-byte reproducible"""
+    if coding == 'br':
+        return brotli.compress(body)
+    return gzip.compress(body, mtime=0)
+
+
+class ResponseCache:
+    """Version stamps, strong ETags, 304s and compressed body caching for GET views"""
+
+    def __init__(self, app=None, cache=None):
+        self.enabled = True
+        self.max_age = 60
+        self.shared_max_age = 300
+        self.min_compress_size = 1024
+        self._app = None
+        self._cache = None
+        self._bodies = LRUBackend(256)
+        self._counters = {'not_modified': 0, 'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, cache)
+
+    def init_app(self, app, cache):
+        """Read the HTTP cache settings; stamps are kept in the catalogue ``cache``"""
+        self.enabled = app.config.get('CACHE_TYPE', 'lru') != 'null'
+        self.max_age = app.config.get('HTTP_CACHE_MAX_AGE', 60)
+        self.shared_max_age = app.config.get('HTTP_CACHE_SHARED_MAX_AGE', 300)
+        self.min_compress_size = app.config.get('HTTP_COMPRESS_MIN_SIZE', 1024)
+        self._bodies = LRUBackend(app.config.get('HTTP_CACHE_MAX_BODIES', 256))
+        self._app = app
+        self._cache = cache
+        app.extensions['response_cache'] = self
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    # -------------------------------------------------------------------------
+    # Version stamps
+    # -------------------------------------------------------------------------
+
+    def _stored_version(self, resource):
+        """Stamp of ``resource`` from the table: its own or the catalogue-wide one, whichever is newer
+
+        Reads never write; a resource no write has bumped gets ``DEFAULT_STAMP``.
+        """
+        stamp = db.session.query(func.max(CatalogueVersion.changed_at)).filter(
+            CatalogueVersion.resource.in_((resource, ALL_RESOURCES))).scalar()
+        return DEFAULT_STAMP if stamp is None else stamp
+
+    def _stored_version_in_app(self, resource):
+        with self._app.app_context():
+            return self._stored_version(resource)
+
+    def version(self, resource):
+        """Time ``resource`` last changed"""
+        key = f'version:{resource}'
+        stamp = self._cache.backend.get(key)
+        if stamp is None:
+            # Not cached here, or expired: the stored stamp only moves on bump()
+            stamp = self._stored_version(resource)
+            self._cache.backend.set(key, stamp, self._cache.default_ttl)
+        return stamp
+
+    async def version_async(self, resource):
+        """``version`` for async code; the table is read in a worker thread"""
+        key = f'version:{resource}'
+        stamp = await self._cache.call('get', key)
+        if stamp is None:
+            stamp = await asyncio.to_thread(self._stored_version_in_app, resource)
+            await self._cache.call('set', key, stamp, self._cache.default_ttl)
+        return stamp
+
+    def bump(self, *resources):
+        """Mark ``resources`` changed; call after committing and invalidating their cached payloads"""
+        now = time.time()
+        for resource in resources:
+            db.session.merge(CatalogueVersion(resource=resource, changed_at=now))
+        db.session.commit()
+        for resource in resources:
+            self._cache.backend.set(f'version:{resource}', now, self._cache.default_ttl)
+
+    def bump_all(self):
+        """Mark every resource changed, e.g. after a bulk import; call before clearing the catalogue cache"""
+        self.bump(ALL_RESOURCES)
+
+    # -------------------------------------------------------------------------
+    # Responses
+    # -------------------------------------------------------------------------
+
+    def _coding(self, request):
+        """Preferred content coding the client accepts, or None for identity"""
+        for coding in CODINGS:
+            if (coding != 'br' or brotli) and request.accept_encodings[coding]:
+                return coding
+        return None
+
+    def _validators(self, request, stamps):
+        """(etag, last_modified, coding) of ``request`` for content at ``stamps``"""
+        coding = self._coding(request)
+        digest = hashlib.sha1(repr((request.full_path, stamps)).encode()).hexdigest()[:24]
+        etag = f'{digest}-{coding}' if coding else digest
+        return etag, int(max(stamps)), coding
+
+    def _finish(self, response, etag, last_modified):
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, s-maxage={self.shared_max_age}'
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def _not_modified(self, request, etag, last_modified):
+        if request.if_none_match:
+            modified = not request.if_none_match.contains_weak(etag)
+        elif request.if_modified_since:
+            modified = request.if_modified_since.timestamp() < last_modified
+        else:
+            return None
+        if modified:
+            return None
+        self._count('not_modified')
+        return self._finish(Response(status=304), etag, last_modified)
+
+    def _lookup(self, etag):
+        entry = self._bodies.get(etag)
+        self._count('misses' if entry is None else 'hits')
+        return entry
+
+    def _store(self, etag, response, coding):
+        """Cache the body of a fresh view ``response`` under ``etag``; None if it cannot be cached"""
+        if response.status_code != 200 or response.is_streamed:
+            return None
+        body = response.get_data()
+        encoding = coding if coding and len(body) >= self.min_compress_size else None
+        entry = (
+            compress(body, encoding) if encoding else body,
+            encoding,
+            [(name, value) for name, value in response.headers
+             if name.lower() not in UNSTORED_HEADERS],
+        )
+        self._bodies.set(etag, entry, None)
+        return entry
+
+    def _respond(self, entry, etag, last_modified):
+        body, encoding, headers = entry
+        response = Response(body, headers=headers)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return self._finish(response, etag, last_modified)
+
+    def cached(self, resources):
+        """Decorator for a GET view showing ``resources(**view_args)``: conditional GET and body caching"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+
+                # Stamps are read before the view runs, so a body is never
+                # stored under a stamp newer than the data it was built from
+                stamps = [self.version(resource) for resource in resources(**kwargs)]
+                etag, last_modified, coding = self._validators(request, stamps)
+                not_modified = self._not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+
+                entry = self._lookup(etag)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    entry = self._store(etag, response, coding)
+                    if entry is None:
+                        return response
+                return self._respond(entry, etag, last_modified)
+            return wrapper
+        return decorator
+
+    async def serve(self, request, resources, view):
+        """``cached`` for async handlers: answer ``request`` showing ``resources``, awaiting ``view()`` on a miss
+
+        ``request`` is a Werkzeug request and ``view()`` returns a response
+        object, or None when the request is left to Flask, which is passed
+        through. The ASGI routes thus share stamps, ETags and bodies with
+        the Flask views.
+        """
+        if not self.enabled or request.method not in ('GET', 'HEAD'):
+            return await view()
+
+        stamps = [await self.version_async(resource) for resource in resources]
+        etag, last_modified, coding = self._validators(request, stamps)
+        not_modified = self._not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        entry = self._lookup(etag)
+        if entry is None:
+            response = await view()
+            entry = None if response is None else self._store(etag, response, coding)
+            if entry is None:
+                return response
+        return self._respond(entry, etag, last_modified)
+
+    def stats(self):
+        """304/hit/miss counters for this process"""
+        with self._lock:
+            counters = dict(self._counters)
+        counters['brotli'] = brotli is not None
+        return counters
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,298 @@
+"""
+Request-level performance instrumentation
+
+For every request this records wall time, the number of SQL statements and
+the time spent in them (SQLAlchemy cursor events), and template render time
+(Flask template signals). The numbers are returned to the client in a
+``Server-Timing`` header and aggregated into per-endpoint histograms served
+in Prometheus text format at ``/metrics``. The async API routes of the
+ASGI entry point (asgi.py) report through ``start()``/``finish()`` under
+the same endpoint names.
+
+Settings (application config):
+    INSTRUMENTATION       turn the whole layer on or off (default: on)
+    SLOW_QUERY_MS         statements slower than this are logged (default: 100, 0 disables)
+    SLOW_QUERY_LOG        file the slow-query log is written to (default: stderr)
+    PROFILE_BUDGET_MS     sampled requests slower than this get a cProfile dump (default: 0, off)
+    PROFILE_SAMPLE_RATE   fraction of requests profiled when a budget is set (default: 0.01)
+    PROFILE_DIR           directory the ``.prof`` dumps are written to (default: profiles)
+
+Dumps can be read with ``python -m pstats <file>`` or snakeviz.
+"""
+import cProfile
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+
+from flask import Response, g, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+# Prometheus' default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger('hotel_booking.slow_queries')
+
+# Timings of a request served outside Flask (the async routes in asgi.py)
+_async_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Timings of the current request, kept on ``flask.g``"""
+
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', 'template_started', 'profile')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_started = None
+        self.profile = None
+
+
+class Histogram:
+    """Cumulative Prometheus histogram, one series per label set"""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, count, total) in sorted(self._series.items()):
+            base = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_count{{{base}}} {count}')
+            lines.append(f'{self.name}_sum{{{base}}} {total:.6f}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _current():
+    return g.get('_timings') if g else _async_timings.get()
+
+
+class Instrumentation:
+    """Per-request timings, Prometheus metrics, slow-query log and sampled profiles"""
+
+    LABELS = ('endpoint', 'method')
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.slow_query_seconds = 0.1
+        self.profile_budget = 0.0
+        self.profile_sample_rate = 0.01
+        self.profile_dir = 'profiles'
+        self._lock = threading.Lock()
+        # Only one cProfile profiler can be active per process
+        self._profiler_lock = threading.Lock()
+        self._collectors = []
+        self._reset_metrics()
+        if app is not None:
+            self.init_app(app)
+
+    def _reset_metrics(self):
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Wall time of requests by endpoint')
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds', 'Time spent in SQL statements per request')
+        self.template_duration = Histogram(
+            'http_request_template_duration_seconds', 'Time spent rendering templates per request')
+        self.query_count = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request', QUERY_COUNT_BUCKETS)
+        self.responses = {}
+        self.slow_queries = 0
+
+    def init_app(self, app, db=None):
+        """Install request hooks and, given ``db``, SQL statement hooks on the app's engine"""
+        self.enabled = app.config.get('INSTRUMENTATION', True)
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_MS', 100) / 1000
+        self.profile_budget = app.config.get('PROFILE_BUDGET_MS', 0) / 1000
+        self.profile_sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.01)
+        self.profile_dir = app.config.get('PROFILE_DIR', 'profiles')
+        app.extensions['instrumentation'] = self
+        if not self.enabled:
+            return
+
+        log_file = app.config.get('SLOW_QUERY_LOG')
+        if log_file:
+            handler = logging.FileHandler(log_file)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_query_log.addHandler(handler)
+            slow_query_log.setLevel(logging.WARNING)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+        if db is not None:
+            with app.app_context():
+                self.watch_engine(db.engine)
+
+    def watch_engine(self, engine):
+        """Count and time the SQL statements run on ``engine``
+
+        The start time is kept on the statement's execution context, so a
+        statement that fails (and never reaches after_cursor_execute) leaves
+        nothing behind on the connection.
+        """
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._query_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._query_started
+            timings = _current()
+            if timings is not None:
+                timings.queries += 1
+                timings.db_time += elapsed
+            if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+                self._log_slow_query(statement, parameters, elapsed)
+
+    def _log_slow_query(self, statement, parameters, elapsed):
+        with self._lock:
+            self.slow_queries += 1
+        where = f' [{request.method} {request.path}]' if request else ''
+        slow_query_log.warning('slow query %.1f ms%s: %s; params=%.200r',
+                               elapsed * 1000, where, ' '.join(statement.split()), parameters)
+
+    def add_collector(self, collect):
+        """Include the Prometheus text lines returned by ``collect()`` in ``/metrics``"""
+        self._collectors.append(collect)
+
+    # Request hooks
+
+    def _before_request(self):
+        timings = g._timings = RequestTimings()
+        if self.profile_budget and random.random() < self.profile_sample_rate \
+                and self._profiler_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger) is already running
+                self._profiler_lock.release()
+                return
+            timings.profile = profile
+
+    def _before_render(self, sender, template, context, **extra):
+        timings = _current()
+        if timings is not None:
+            timings.template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        timings = _current()
+        if timings is not None and timings.template_started is not None:
+            timings.template_time += time.perf_counter() - timings.template_started
+            timings.template_started = None
+
+    def _after_request(self, response):
+        timings = _current()
+        if timings is None:
+            return response
+        self._record(timings, request.endpoint or 'unmatched', request.method, response)
+        return response
+
+    def _record(self, timings, endpoint, method, response):
+        elapsed = time.perf_counter() - timings.started
+        response.headers.add('Server-Timing', ', '.join([
+            f'app;dur={elapsed * 1000:.1f}',
+            f'db;dur={timings.db_time * 1000:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template_time * 1000:.1f}',
+        ]))
+
+        labels = (endpoint, method)
+        with self._lock:
+            self.request_duration.observe(labels, elapsed)
+            self.db_duration.observe(labels, timings.db_time)
+            self.template_duration.observe(labels, timings.template_time)
+            self.query_count.observe(labels, timings.queries)
+            key = labels + (str(response.status_code),)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    # Requests served outside Flask
+
+    def start(self):
+        """Start timing a request handled outside Flask in the current task; None when disabled"""
+        if not self.enabled:
+            return None
+        timings = RequestTimings()
+        _async_timings.set(timings)
+        return timings
+
+    def finish(self, timings, endpoint, method, response):
+        """Add Server-Timing to ``response`` and record it under ``endpoint``, as for Flask requests"""
+        if timings is not None:
+            self._record(timings, endpoint, method, response)
+        return response
+
+    def _teardown_request(self, exc):
+        timings = _current()
+        if timings is None or timings.profile is None:
+            return
+        profile, timings.profile = timings.profile, None
+        profile.disable()
+        self._profiler_lock.release()
+        elapsed = time.perf_counter() - timings.started
+        if elapsed >= self.profile_budget:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = f'{request.endpoint or "unmatched"}-{int(time.time() * 1000)}-{elapsed * 1000:.0f}ms.prof'
+            profile.dump_stats(os.path.join(self.profile_dir, name))
+
+    # Export
+
+    def render_metrics(self):
+        """All metrics in Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            for histogram in (self.request_duration, self.db_duration, self.template_duration, self.query_count):
+                lines += histogram.render(self.LABELS)
+            lines += ['# HELP http_responses_total Responses by endpoint, method and status',
+                      '# TYPE http_responses_total counter']
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                lines.append(f'http_responses_total{{endpoint="{_escape(endpoint)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+            lines += ['# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS',
+                      '# TYPE db_slow_queries_total counter',
+                      f'db_slow_queries_total {self.slow_queries}']
+        for collect in self._collectors:
+            lines += collect()
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    def reset(self):
+        """Drop all collected metrics"""
+        with self._lock:
+            self._reset_metrics()
+
+
+instrumentation = Instrumentation()
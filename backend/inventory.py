@@ -0,0 +1,145 @@
+"""
+Nightly room inventory for the Hotel Booking System
+
+Every night of a pending, confirmed or completed booking is materialized as
+one ``room_nights`` row keyed by (room_id, night). This gives:
+
+- availability as a primary-key range lookup instead of an interval scan
+- oversell protection from the database itself: a second booking of the
+  same room-night violates the primary key
+- occupancy and ADR reports as plain GROUP BYs (see ``stats.py``)
+
+Rows are written in the same transaction as the booking change that causes
+them (``hold``/``sync``); ``rebuild()`` regenerates the table from the
+bookings, e.g. after loading bookings directly into the database.
+"""
+from datetime import timedelta
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, cents_to_amount, Booking, RoomNight
+from availability import ACTIVE_STATUSES, conflict_query
+
+# Bookings whose nights are taken; completed stays stay in the table for reporting
+HELD_STATUSES = ACTIVE_STATUSES + ('completed',)
+
+
+class NightsTaken(Exception):
+    """Raised by ``sync`` when a booking's released nights now belong to another booking"""
+
+
+def _nights(check_in_date, check_out_date):
+    night = check_in_date
+    while night < check_out_date:
+        yield night
+        night += timedelta(days=1)
+
+
+def night_rates(total_cents, nights):
+    """Per-night shares of ``total_cents`` that add up to it exactly (the first nights take the odd cents)"""
+    share, extra = divmod(total_cents, nights)
+    return [share + (index < extra) for index in range(nights)]
+
+
+def night_rows(booking):
+    """room_nights rows for ``booking`` (one per night, check-out night excluded)"""
+    nights = (booking.check_out_date - booking.check_in_date).days
+    if nights <= 0:
+        return []
+    return [
+        {
+            'room_id': booking.room_id,
+            'night': night,
+            'hotel_id': booking.hotel_id,
+            'booking_id': booking.id,
+            'status': booking.status,
+            'rate_cents': rate,
+            'rate': cents_to_amount(rate),
+        }
+        for night, rate in zip(_nights(booking.check_in_date, booking.check_out_date),
+                               night_rates(booking.total_price_cents, nights))
+    ]
+
+
+def hold(booking):
+    """Insert the nights of a flushed ``booking``; raises IntegrityError if any is taken"""
+    rows = night_rows(booking)
+    if rows:
+        db.session.execute(insert(RoomNight.__table__), rows)
+
+
+def release(booking):
+    """Free the nights held by ``booking``"""
+    db.session.query(RoomNight).filter(RoomNight.booking_id == booking.id).delete(synchronize_session=False)
+
+
+def sync(booking):
+    """Bring the nights of ``booking`` in line with its current status (caller commits)
+
+    A booking whose nights were released (e.g. an expired hold) takes them
+    back only if they are still free; otherwise ``NightsTaken`` is raised
+    and the caller must roll back.
+    """
+    if booking.status not in HELD_STATUSES:
+        release(booking)
+        return
+    updated = db.session.query(RoomNight).filter(RoomNight.booking_id == booking.id).update(
+        {RoomNight.status: booking.status}, synchronize_session=False
+    )
+    if updated:
+        return
+    if not is_free(booking.room_id, booking.check_in_date, booking.check_out_date):
+        raise NightsTaken(booking.id)
+    try:
+        hold(booking)
+    except IntegrityError:
+        # Taken by a booking committed since the check above
+        raise NightsTaken(booking.id)
+
+
+def is_free(room_id, check_in_date, check_out_date):
+    """True if no night of ``room_id`` in [check_in_date, check_out_date) is held"""
+    return db.session.execute(conflict_query(room_id, check_in_date, check_out_date)).first() is None
+
+
+def insert_ignoring_conflicts(table, rows):
+    """Insert nightly rows into ``table``, skipping nights already present where the dialect allows"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.session.execute(insert(table), rows)
+        return
+    db.session.execute(dialect_insert(table).on_conflict_do_nothing(), rows)
+
+
+def rebuild(chunk_size=5000):
+    """Regenerate room_nights from the bookings table
+
+    Returns ``(nights, conflicts)``: rows written and nights skipped because
+    an earlier booking (lower id) already holds them.
+    """
+    db.session.query(RoomNight).delete(synchronize_session=False)
+
+    columns = (Booking.id, Booking.room_id, Booking.hotel_id, Booking.check_in_date,
+               Booking.check_out_date, Booking.status, Booking.total_price_cents)
+    query = db.session.query(*columns).filter(Booking.status.in_(HELD_STATUSES)).order_by(Booking.id)
+
+    expected = 0
+    chunk = []
+    for booking in query.yield_per(chunk_size):
+        chunk.extend(night_rows(booking))
+        if len(chunk) >= chunk_size:
+            insert_ignoring_conflicts(RoomNight.__table__, chunk)
+            expected += len(chunk)
+            chunk = []
+    if chunk:
+        insert_ignoring_conflicts(RoomNight.__table__, chunk)
+        expected += len(chunk)
+
+    db.session.commit()
+    nights = db.session.query(func.count()).select_from(RoomNight).scalar()
+    return nights, expected - nights
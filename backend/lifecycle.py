@@ -0,0 +1,233 @@
+"""
+Background booking lifecycle for the Hotel Booking System
+
+``create_booking`` leaves bookings ``pending`` until the guest confirms or
+cancels them, and a pending booking blocks its room. A sweep:
+
+- expires pending holds older than ``BOOKING_HOLD_TTL`` seconds (status
+  ``expired``; their nights are released). ``reserve()`` also expires
+  lapsed holds on the nights it needs, so sweeping only keeps statuses
+  tidy and never decides whether a room can be booked
+- completes confirmed stays whose check-out date has passed (status
+  ``completed``; their nights stay in the inventory for reporting)
+- with ``BOOKING_ARCHIVE_AFTER_DAYS`` set, moves finished bookings that
+  checked out longer ago than that to ``bookings_archive`` (see ``archive.py``)
+
+Updates run in batches of ``BOOKING_SWEEP_BATCH`` ids, one transaction per
+batch, so a sweep never holds long write locks. Each app process sweeps in a
+daemon thread every ``BOOKING_SWEEP_INTERVAL`` seconds once it has served its
+first request (0 disables the thread); ``flask sweep-bookings`` runs a sweep
+from cron or as a standalone worker with ``--loop``. Concurrent sweeps are
+harmless: every UPDATE re-checks the status it expects, and so do guest
+actions (``transition``), so a sweep and a guest never overwrite each other.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from models import db, Booking, RoomNight
+from archive import archive_bookings
+import inventory
+
+SWEEP_COUNTERS = ('expired', 'completed', 'archived')
+
+
+def transition(booking, from_statuses, status):
+    """Move ``booking`` to ``status`` if it is still in one of ``from_statuses``
+
+    A conditional UPDATE: returns False, after rolling back, when a sweep or
+    another request has changed the booking since it was loaded. Otherwise
+    the booking's nights follow (``inventory.sync``) and the caller commits,
+    or rolls back on ``inventory.NightsTaken``.
+    """
+    updated = db.session.query(Booking).filter(Booking.id == booking.id, Booking.status.in_(from_statuses)).update(
+        {Booking.status: status, Booking.updated_at: datetime.utcnow()}, synchronize_session='evaluate')
+    if not updated:
+        db.session.rollback()
+        return False
+    inventory.sync(booking)
+    return True
+
+
+class BookingSweeper:
+    """Expire stale holds, complete past stays and archive finished bookings"""
+
+    def __init__(self, app=None):
+        self.hold_ttl = 3600
+        self.interval = 60
+        self.batch_size = 500
+        self.archive_after = 0
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.totals = dict.fromkeys(SWEEP_COUNTERS, 0)
+        self.sweeps = 0
+        self.last = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the lifecycle settings and start sweeping after the first request"""
+        self.hold_ttl = app.config.get('BOOKING_HOLD_TTL', 3600)
+        self.interval = app.config.get('BOOKING_SWEEP_INTERVAL', 60)
+        self.batch_size = app.config.get('BOOKING_SWEEP_BATCH', 500)
+        self.archive_after = app.config.get('BOOKING_ARCHIVE_AFTER_DAYS', 0)
+        self._app = app
+        app.extensions['booking_sweeper'] = self
+        if self.interval > 0:
+            # Not at import time: CLI commands and tests should not start threads
+            app.before_request(self._start)
+
+    # -------------------------------------------------------------------------
+    # Sweeping
+    # -------------------------------------------------------------------------
+
+    def _batched(self, query, apply):
+        """Call ``apply(ids)`` and commit for successive batches of ``query``'s ids"""
+        touched = []
+        while True:
+            ids = [row[0] for row in query.limit(self.batch_size).all()]
+            if not ids:
+                break
+            apply(ids)
+            db.session.commit()
+            touched.extend(ids)
+            if len(ids) < self.batch_size:
+                break
+        return touched
+
+    def expire_holds(self, now=None):
+        """Expire pending bookings created more than ``hold_ttl`` seconds ago; returns their ids"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.hold_ttl)
+        query = db.session.query(Booking.id).filter(Booking.status == 'pending', Booking.created_at < cutoff)
+        return self._batched(query, lambda ids: self._expire(ids, now))
+
+    def expire_lapsed(self, room_id, check_in_date, check_out_date, now=None):
+        """Expire lapsed pending holds on ``room_id``'s nights in [check_in_date, check_out_date)
+
+        Runs in the caller's transaction (``reserve()``, under its room lock),
+        so a hold older than ``hold_ttl`` never blocks a new booking, however
+        long ago the last sweep ran. Returns the expired ids.
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.hold_ttl)
+        ids = [row[0] for row in db.session.query(RoomNight.booking_id).join(
+            Booking, Booking.id == RoomNight.booking_id
+        ).filter(
+            RoomNight.room_id == room_id,
+            RoomNight.night >= check_in_date,
+            RoomNight.night < check_out_date,
+            RoomNight.status == 'pending',
+            Booking.created_at < cutoff
+        ).distinct()]
+        if ids:
+            self._expire(ids, now)
+        return ids
+
+    def _expire(self, ids, now):
+        # Both statements re-check the status: a guest may confirm in between
+        db.session.query(Booking).filter(Booking.id.in_(ids), Booking.status == 'pending').update(
+            {Booking.status: 'expired', Booking.updated_at: now}, synchronize_session=False)
+        db.session.query(RoomNight).filter(RoomNight.booking_id.in_(ids), RoomNight.status == 'pending').delete(
+            synchronize_session=False)
+
+    def complete_stays(self, today=None, now=None):
+        """Mark confirmed bookings that checked out on or before ``today`` completed; returns their ids"""
+        today = today or date.today()
+        now = now or datetime.utcnow()
+        query = db.session.query(Booking.id).filter(Booking.status == 'confirmed', Booking.check_out_date <= today)
+
+        def apply(ids):
+            db.session.query(Booking).filter(Booking.id.in_(ids), Booking.status == 'confirmed').update(
+                {Booking.status: 'completed', Booking.updated_at: now}, synchronize_session=False)
+            db.session.query(RoomNight).filter(RoomNight.booking_id.in_(ids), RoomNight.status == 'confirmed').update(
+                {RoomNight.status: 'completed'}, synchronize_session=False)
+
+        return self._batched(query, apply)
+
+    def sweep(self):
+        """Run one sweep; requires an app context. Returns rows touched per step and the duration"""
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        today = date.today()
+
+        expired = self.expire_holds(now)
+        completed = self.complete_stays(today, now)
+        archived = 0
+        if self.archive_after:
+            archived = archive_bookings(today - timedelta(days=self.archive_after), self.batch_size, now)
+
+        result = {
+            'expired': len(expired),
+            'completed': len(completed),
+            'archived': archived,
+            'seconds': round(time.perf_counter() - started, 4),
+        }
+        with self._lock:
+            self.sweeps += 1
+            for key in SWEEP_COUNTERS:
+                self.totals[key] += result[key]
+            self.last = dict(result, at=now.isoformat(timespec='seconds') + 'Z')
+        return result
+
+    # -------------------------------------------------------------------------
+    # Background thread
+    # -------------------------------------------------------------------------
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run_forever, name='booking-sweeper', daemon=True)
+                self._thread.start()
+
+    def run_forever(self, interval=None):
+        """Sweep every ``interval`` seconds until ``stop()`` is called"""
+        interval = interval or self.interval
+        while not self._stop.wait(interval):
+            with self._app.app_context():
+                try:
+                    self.sweep()
+                except Exception:
+                    db.session.rollback()
+                    self._app.logger.exception('Booking sweep failed')
+
+    def stop(self):
+        self._stop.set()
+
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """Sweep counters for /admin/lifecycle"""
+        with self._lock:
+            return {
+                'sweeps': self.sweeps,
+                'totals': dict(self.totals),
+                'last': self.last,
+                'hold_ttl': self.hold_ttl,
+                'interval': self.interval,
+                'archive_after': self.archive_after,
+            }
+
+    def metrics(self):
+        """Prometheus text lines for /metrics"""
+        with self._lock:
+            lines = ['# HELP booking_sweeps_total Booking lifecycle sweeps run by this process',
+                     '# TYPE booking_sweeps_total counter',
+                     f'booking_sweeps_total {self.sweeps}',
+                     '# HELP booking_sweep_rows_total Bookings touched by lifecycle sweeps',
+                     '# TYPE booking_sweep_rows_total counter']
+            lines += [f'booking_sweep_rows_total{{action="{key}"}} {self.totals[key]}' for key in SWEEP_COUNTERS]
+            if self.last:
+                lines += ['# HELP booking_sweep_last_seconds Duration of the last sweep',
+                          '# TYPE booking_sweep_last_seconds gauge',
+                          f"booking_sweep_last_seconds {self.last['seconds']}"]
+        return lines
+
+
+sweeper = BookingSweeper()
@@ -0,0 +1,90 @@
+"""
+Schema migrations for the Hotel Booking System
+
+``db.create_all()`` only creates missing tables, so indexes added to the
+models later never reach an existing SQLite/Postgres database. ``upgrade_schema()``
+brings an existing database up to date with the models without changing
+existing values: new columns and tables are filled from the data already
+there. It is safe to run repeatedly.
+"""
+import time
+
+from sqlalchemy import inspect, text
+
+from models import db, CatalogueVersion
+from http_cache import ALL_RESOURCES
+from amenities import backfill_amenities
+from search import create_search_index
+from archive import rebuild_archived_nights
+import inventory
+
+# Integer cents columns that replaced float amounts: (table, cents column, float column)
+MONEY_COLUMNS = (
+    ('rooms', 'price_per_night_cents', 'price_per_night'),
+    ('bookings', 'total_price_cents', 'total_price'),
+    ('bookings_archive', 'total_price_cents', 'total_price'),
+    ('room_nights', 'rate_cents', 'rate'),
+)
+
+# Indexes superseded by ones on the cents columns
+DROPPED_INDEXES = ('ix_rooms_available_price_capacity',)
+
+
+def add_cents_columns():
+    """Add the integer cents columns to existing tables and fill them from the float amounts"""
+    inspector = inspect(db.engine)
+    added = []
+    for table, column, amount in MONEY_COLUMNS:
+        if column in {existing['name'] for existing in inspector.get_columns(table)}:
+            continue
+        with db.engine.begin() as connection:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER'))
+            connection.execute(text(f'UPDATE {table} SET {column} = CAST(ROUND({amount} * 100) AS INTEGER)'))
+        added.append(f'{table}.{column}')
+    return added
+
+
+def upgrade_schema():
+    """Create any tables and indexes declared on the models but missing from the database"""
+    tables_before = set(inspect(db.engine).get_table_names())
+    db.create_all()
+
+    # Before anything reads the money columns
+    created = add_cents_columns()
+    inspector = inspect(db.engine)
+
+    # Existing databases gain the amenity catalogue: populate it from the text columns
+    if 'hotel_amenities' not in tables_before and 'hotels' in tables_before:
+        backfill_amenities()
+        created.append('amenity catalogue')
+
+    # Existing bookings are expanded into the nightly inventory once
+    if 'room_nights' not in tables_before and 'bookings' in tables_before:
+        inventory.rebuild()
+        created.append('room nights inventory')
+
+    # HTTP cache stamps start at the time the table was created, not at the epoch
+    if 'catalogue_versions' not in tables_before:
+        db.session.add(CatalogueVersion(resource=ALL_RESOURCES, changed_at=time.time()))
+        db.session.commit()
+
+    # Bookings archived before their nights were kept get them back, for reports
+    if 'room_nights_archive' not in tables_before and 'bookings_archive' in tables_before:
+        rebuild_archived_nights()
+        created.append('archived room nights')
+
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+
+    with db.engine.begin() as connection:
+        for name in DROPPED_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+    if create_search_index():
+        created.append('search index')
+
+    return created
@@ -2,10 +2,49 @@
 SQLAlchemy Models for Hotel Booking System
 """
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+from sqlalchemy.orm import validates
 from datetime import datetime
 
 db = SQLAlchemy()
 
+
+def cents_to_amount(cents):
+    """Float amount for integer cents, as stored in the legacy float money columns"""
+    return None if cents is None else cents / 100
+
+
+def sync_id_sequences(*models):
+    """Move Postgres id sequences past the highest id after rows were written with explicit ids
+
+    SQLite and MySQL continue after the highest id by themselves.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}"
+        ))
+
+
+# Association tables linking hotels and rooms to the amenity catalogue.
+# The second index serves "which hotels/rooms have amenity X" lookups.
+hotel_amenities = db.Table(
+    'hotel_amenities',
+    db.Column('hotel_id', db.Integer, db.ForeignKey('hotels.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_hotel_amenities_amenity', 'amenity_id', 'hotel_id'),
+)
+
+room_amenities = db.Table(
+    'room_amenities',
+    db.Column('room_id', db.Integer, db.ForeignKey('rooms.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_room_amenities_amenity', 'amenity_id', 'room_id'),
+)
+
+
 class User(db.Model):
     """User model for authentication and profile management"""
     __tablename__ = 'users'
@@ -59,6 +98,12 @@ class Hotel(db.Model):
     # Relationships
     rooms = db.relationship('Room', backref='hotel', lazy=True, cascade='all, delete-orphan')
     bookings = db.relationship('Booking', backref='hotel', lazy=True)
+    amenity_tags = db.relationship('Amenity', secondary=hotel_amenities, lazy=True)
+    
+    __table_args__ = (
+        # /hotels and the featured list filter on is_active, then city / star_rating
+        db.Index('ix_hotels_active_city_rating', 'is_active', 'city', 'star_rating'),
+    )
     
     def __repr__(self):
         return f'<Hotel {self.name}>'
@@ -88,7 +133,8 @@ class Room(db.Model):
     room_number = db.Column(db.String(20), nullable=False)
     room_type = db.Column(db.String(50), nullable=False)  # single, double, suite, etc.
     description = db.Column(db.Text)
-    price_per_night = db.Column(db.Float, nullable=False)
+    price_per_night = db.Column(db.Float, nullable=False)  # legacy mirror of price_per_night_cents
+    price_per_night_cents = db.Column(db.Integer, nullable=False)
     capacity = db.Column(db.Integer, default=2)
     image_url = db.Column(db.String(500))
     amenities = db.Column(db.Text)  # JSON string of room amenities
@@ -97,14 +143,26 @@ class Room(db.Model):
     
     # Relationships
     bookings = db.relationship('Booking', backref='room', lazy=True, cascade='all, delete-orphan')
+    amenity_tags = db.relationship('Amenity', secondary=room_amenities, lazy=True)
     
     __table_args__ = (
         db.UniqueConstraint('hotel_id', 'room_number', name='unique_room_number'),
+        # Hotel details and /rooms?hotel_id=
+        db.Index('ix_rooms_hotel_available', 'hotel_id', 'is_available'),
+        # /rooms price and capacity filters
+        db.Index('ix_rooms_available_price_cents_capacity', 'is_available', 'price_per_night_cents', 'capacity'),
+        # Distinct room types for the /rooms filter
+        db.Index('ix_rooms_room_type', 'room_type'),
     )
     
     def __repr__(self):
         return f'<Room {self.room_number} - {self.room_type}>'
     
+    @validates('price_per_night_cents')
+    def _mirror_price(self, key, cents):
+        self.price_per_night = cents_to_amount(cents)
+        return cents
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -112,7 +170,7 @@ class Room(db.Model):
             'room_number': self.room_number,
             'room_type': self.room_type,
             'description': self.description,
-            'price_per_night': self.price_per_night,
+            'price_per_night': cents_to_amount(self.price_per_night_cents),
             'capacity': self.capacity,
             'image_url': self.image_url,
             'amenities': self.amenities,
@@ -120,6 +178,98 @@ class Room(db.Model):
         }
 
 
+class Amenity(db.Model):
+    """Amenity catalogue entry shared by hotels and rooms (e.g. Pool, Spa)"""
+    __tablename__ = 'amenities'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)  # lower-cased name for lookups
+    
+    def __repr__(self):
+        return f'<Amenity {self.name}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'slug': self.slug
+        }
+
+
+class RatePlan(db.Model):
+    """Date-ranged nightly rate override for a hotel, optionally one room type
+    
+    Either replaces the room's base rate (``nightly_rate_cents``) or adjusts
+    it by ``adjustment_percent``. ``weekdays`` limits it to some days of the
+    week (comma-separated, Monday=0, e.g. '4,5' for Friday and Saturday).
+    Where plans overlap, the highest ``priority`` wins, then the one
+    specific to the room type.
+    """
+    __tablename__ = 'rate_plans'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id', ondelete='CASCADE'), nullable=False)
+    room_type = db.Column(db.String(50))  # None applies to every room type
+    name = db.Column(db.String(100), nullable=False)
+    start_date = db.Column(db.Date)  # None means open-ended
+    end_date = db.Column(db.Date)  # exclusive; None means open-ended
+    weekdays = db.Column(db.String(20))  # None means every day
+    nightly_rate_cents = db.Column(db.Integer)
+    adjustment_percent = db.Column(db.Integer)
+    priority = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_rate_plans_hotel_dates', 'hotel_id', 'start_date', 'end_date'),
+    )
+    
+    def __repr__(self):
+        return f'<RatePlan {self.name}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'hotel_id': self.hotel_id,
+            'room_type': self.room_type,
+            'name': self.name,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'weekdays': self.weekdays,
+            'nightly_rate_cents': self.nightly_rate_cents,
+            'adjustment_percent': self.adjustment_percent,
+            'priority': self.priority
+        }
+
+
+class StayDiscount(db.Model):
+    """Length-of-stay discount: ``percent_off`` for stays of at least ``min_nights``"""
+    __tablename__ = 'stay_discounts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id', ondelete='CASCADE'), nullable=False)
+    room_type = db.Column(db.String(50))  # None applies to every room type
+    min_nights = db.Column(db.Integer, nullable=False)
+    percent_off = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_stay_discounts_hotel', 'hotel_id', 'min_nights'),
+    )
+    
+    def __repr__(self):
+        return f'<StayDiscount {self.min_nights}+ nights {self.percent_off}%>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'hotel_id': self.hotel_id,
+            'room_type': self.room_type,
+            'min_nights': self.min_nights,
+            'percent_off': self.percent_off
+        }
+
+
 class Booking(db.Model):
     """Booking model for storing reservation information"""
     __tablename__ = 'bookings'
@@ -134,17 +284,35 @@ class Booking(db.Model):
     guest_email = db.Column(db.String(120))
     guest_phone = db.Column(db.String(20))
     number_of_guests = db.Column(db.Integer, default=1)
-    total_price = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, confirmed, cancelled, completed
+    total_price = db.Column(db.Float, nullable=False)  # legacy mirror of total_price_cents
+    total_price_cents = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, confirmed, cancelled, completed, expired
     special_requests = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Overlap checks: room, active status, date range
+        db.Index('ix_bookings_room_status_dates', 'room_id', 'status', 'check_in_date', 'check_out_date'),
+        # Dashboard and /api/bookings: a user's bookings newest first
+        db.Index('ix_bookings_user_created', 'user_id', 'created_at'),
+        # Admin recent bookings
+        db.Index('ix_bookings_created', 'created_at'),
+        # Lifecycle sweeps: stale pending holds, finished confirmed stays
+        db.Index('ix_bookings_status_checkout', 'status', 'check_out_date'),
+    )
+    
     def __repr__(self):
         return f'<Booking {self.id} - {self.status}>'
     
-    def to_dict(self):
-        return {
+    @validates('total_price_cents')
+    def _mirror_total(self, key, cents):
+        self.total_price = cents_to_amount(cents)
+        return cents
+    
+    def to_dict(self, depth=1):
+        """Serialize the booking; depth 0 omits the nested hotel and room"""
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'hotel_id': self.hotel_id,
@@ -155,10 +323,120 @@ class Booking(db.Model):
             'guest_email': self.guest_email,
             'guest_phone': self.guest_phone,
             'number_of_guests': self.number_of_guests,
-            'total_price': self.total_price,
+            'total_price': cents_to_amount(self.total_price_cents),
             'status': self.status,
             'special_requests': self.special_requests,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'hotel': self.hotel.to_dict() if self.hotel else None,
-            'room': self.room.to_dict() if self.room else None
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if depth > 0:
+            data['hotel'] = self.hotel.to_dict() if self.hotel else None
+            data['room'] = self.room.to_dict() if self.room else None
+        return data
+
+
+class ArchivedBooking(db.Model):
+    """Finished booking moved out of ``bookings`` by ``archive.archive_bookings()``
+    
+    Same columns as Booking plus ``archived_at``. On Postgres the table is
+    range-partitioned by check-out date (one partition per year, created on
+    demand), so the primary key includes ``check_out_date``.
+    """
+    __tablename__ = 'bookings_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=False)
+    check_in_date = db.Column(db.Date, nullable=False)
+    check_out_date = db.Column(db.Date, primary_key=True)
+    guest_name = db.Column(db.String(100))
+    guest_email = db.Column(db.String(120))
+    guest_phone = db.Column(db.String(20))
+    number_of_guests = db.Column(db.Integer, default=1)
+    total_price = db.Column(db.Float, nullable=False)
+    total_price_cents = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # completed, cancelled, expired
+    special_requests = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    hotel = db.relationship('Hotel', lazy=True)
+    room = db.relationship('Room', lazy=True)
+    
+    __table_args__ = (
+        # A user's booking history newest first
+        db.Index('ix_bookings_archive_user_created', 'user_id', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (check_out_date)'},
+    )
+    
+    def __repr__(self):
+        return f'<ArchivedBooking {self.id} - {self.status}>'
+    
+    to_dict = Booking.to_dict
+
+
+class RoomNight(db.Model):
+    """One night of a room held by a booking (materialized from booking date ranges)
+    
+    The primary key makes a second booking of the same room-night impossible.
+    """
+    __tablename__ = 'room_nights'
+    
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # status of the holding booking
+    rate = db.Column(db.Float, nullable=False)  # legacy mirror of rate_cents
+    rate_cents = db.Column(db.Integer, nullable=False)  # share of the booking total for this night, for ADR
+    
+    __table_args__ = (
+        # Occupancy and ADR reports per hotel and date range
+        db.Index('ix_room_nights_hotel_night', 'hotel_id', 'night'),
+        # Releasing or updating a booking's nights
+        db.Index('ix_room_nights_booking', 'booking_id'),
+    )
+    
+    def __repr__(self):
+        return f'<RoomNight {self.room_id} {self.night}>'
+
+
+class ArchivedRoomNight(db.Model):
+    """Night of an archived booking, kept for occupancy and ADR reports
+    
+    Same columns as ``room_nights``; ``booking_id`` refers to
+    ``bookings_archive``. Nothing checks availability against this table.
+    """
+    __tablename__ = 'room_nights_archive'
+    
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.id'), nullable=False)
+    booking_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    rate = db.Column(db.Float, nullable=False)  # legacy mirror of rate_cents
+    rate_cents = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        # Occupancy and ADR reports per hotel and date range
+        db.Index('ix_room_nights_archive_hotel_night', 'hotel_id', 'night'),
+    )
+    
+    def __repr__(self):
+        return f'<ArchivedRoomNight {self.room_id} {self.night}>'
+
+
+class CatalogueVersion(db.Model):
+    """When a cacheable catalogue resource (``hotels``, ``hotel:<id>``) last changed
+    
+    The HTTP cache derives ETags and Last-Modified from these stamps; they
+    only move when a write bumps them.
+    """
+    __tablename__ = 'catalogue_versions'
+    
+    resource = db.Column(db.String(64), primary_key=True)
+    changed_at = db.Column(db.Float, nullable=False)  # Unix time
+    
+    def __repr__(self):
+        return f'<CatalogueVersion {self.resource} {self.changed_at}>'
@@ -0,0 +1,157 @@
+"""
+Keyset pagination and NDJSON streaming for the JSON API
+
+List endpoints accept ``?limit=`` and ``?cursor=`` to page through results
+in the order of a unique sort key (e.g. ``id`` or ``created_at, id``)
+without OFFSET scans, and ``?format=ndjson`` to stream one JSON object per
+line from a server-side cursor instead of building the whole list in memory.
+Without any of these parameters the full list is returned as before.
+
+A page (``?limit=`` or ``?cursor=`` given) is at most ``API_MAX_PAGE_SIZE``
+rows and is built in memory in either format, so NDJSON pages carry the
+same ``X-Next-Cursor`` and ``Link`` headers as JSON ones; only unpaginated
+NDJSON is streamed.
+"""
+import base64
+import json
+from datetime import date, datetime
+from itertools import islice
+from urllib.parse import urlencode
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import and_, or_
+
+# Rows fetched per round trip when streaming
+STREAM_BATCH_SIZE = 100
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last row into an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into typed sort-key values; raises ValueError if invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    values = []
+    for column, value in zip(columns, payload):
+        python_type = column.type.python_type
+        # A value of the wrong JSON type would otherwise fail in the driver, not as a 400
+        if python_type in (datetime, date):
+            valid = isinstance(value, str)
+        elif python_type is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, python_type) and (python_type is bool or not isinstance(value, bool))
+        if not valid:
+            raise ValueError('Invalid cursor')
+        if python_type in (datetime, date):
+            value = python_type.fromisoformat(value)
+        values.append(value)
+    return values
+
+
+def keyset_filter(columns, values, descending=False):
+    """Filter for rows strictly after ``values`` in (columns) order
+
+    Written as an expanded OR chain rather than a row-value comparison so it
+    works on every backend SQLAlchemy supports.
+    """
+    clauses = []
+    for position, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(position)]
+        after = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+def page_size(limit, config):
+    """Rows per page for ``?limit=``: API_PAGE_SIZE when missing or invalid, at most API_MAX_PAGE_SIZE"""
+    if not limit or limit < 1:
+        limit = config['API_PAGE_SIZE']
+    return min(limit, config['API_MAX_PAGE_SIZE'])
+
+
+def add_next_page(response, request, values, limit):
+    """Point ``response`` at the page after the row whose sort-key values are ``values``"""
+    next_cursor = encode_cursor(values)
+    response.headers['X-Next-Cursor'] = next_cursor
+    args = request.args.to_dict()
+    args.update(cursor=next_cursor, limit=limit)
+    next_url = f'{request.base_url}?{urlencode(args)}'
+    response.headers['Link'] = f'<{next_url}>; rel="next"'
+
+
+def keyset_response(query, columns, serialize, descending=False, sort_key=None, prepare=None):
+    """Build the response for a list endpoint honouring limit/cursor/format
+
+    ``columns`` must form a unique sort key; ``serialize`` turns one row
+    into a JSON-compatible dict. ``sort_key(row)`` returns the row's values
+    for ``columns`` when they are not plain attributes of the row (e.g.
+    columns of a joined table). ``prepare(rows)``, if given, is called with
+    the rows of the page (or of each streamed batch) before they are
+    serialized, to load what ``serialize`` needs for all of them at once.
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    paginated = limit is not None or cursor is not None
+
+    if cursor:
+        try:
+            query = query.filter(keyset_filter(columns, decode_cursor(cursor, columns), descending))
+        except (ValueError, TypeError):
+            return jsonify({'message': 'Invalid cursor'}), 400
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+    if paginated:
+        limit = page_size(limit, current_app.config)
+
+    ndjson = request.args.get('format') == 'ndjson'
+
+    if ndjson and not paginated:
+        rows = query.yield_per(STREAM_BATCH_SIZE).execution_options(stream_results=True)
+
+        def generate():
+            iterator = iter(rows)
+            while True:
+                batch = list(islice(iterator, STREAM_BATCH_SIZE))
+                if not batch:
+                    break
+                if prepare:
+                    prepare(batch)
+                for row in batch:
+                    yield current_app.json.dumps(serialize(row)) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    if not paginated:
+        rows = query.all()
+        if prepare:
+            prepare(rows)
+        return jsonify([serialize(row) for row in rows])
+
+    rows = query.limit(limit + 1).all()
+    if prepare:
+        prepare(rows[:limit])
+    if ndjson:
+        response = Response(''.join(current_app.json.dumps(serialize(row)) + '\n' for row in rows[:limit]),
+                            mimetype='application/x-ndjson')
+    else:
+        response = jsonify([serialize(row) for row in rows[:limit]])
+
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        values = sort_key(last) if sort_key else [getattr(last, column.key) for column in columns]
+        add_next_page(response, request, values, limit)
+
+    return response
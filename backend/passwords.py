@@ -0,0 +1,111 @@
+"""
+Password hashing off the request thread
+
+Key derivation (scrypt, PBKDF2) is deliberately slow. Hashing inline lets a
+burst of logins occupy every CPU and stall unrelated requests, so hashes
+are computed in a small, bounded thread pool instead (hashlib releases the
+GIL while deriving keys):
+
+- at most ``PASSWORD_HASH_WORKERS`` hashes run at once (0 hashes inline)
+- at most ``PASSWORD_HASH_MAX_PENDING`` may wait; beyond that ``HasherBusy``
+  is raised and the request is turned away instead of queueing
+- a hash not finished within ``PASSWORD_HASH_TIMEOUT`` seconds also raises
+  ``HasherBusy``; its slot stays taken until the worker is done with it
+- on Linux the workers run at a lower scheduling priority
+  (``PASSWORD_HASH_NICE``), so catalogue requests win the CPU
+
+``PASSWORD_HASH_METHOD`` is a werkzeug method string such as
+``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``. Hashes made with other
+parameters still verify and are upgraded on the user's next login
+(``needs_rehash``).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashes are already queued, or a hash timed out"""
+
+
+def _lower_priority(nice):
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError):
+        pass  # Not Linux, or not permitted: run at normal priority
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a bounded worker pool"""
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.timeout = 30
+        self._executor = None
+        self._slots = None
+        self._prefix = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure cost parameters and the worker pool from the application config"""
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 30)
+        self._prefix = None
+
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if workers > 0:
+            nice = app.config.get('PASSWORD_HASH_NICE', 10)
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='password-hash',
+                initializer=_lower_priority, initargs=(nice,)
+            )
+            self._slots = threading.BoundedSemaphore(workers + app.config.get('PASSWORD_HASH_MAX_PENDING', 32))
+        else:
+            self._executor = None
+            self._slots = None
+
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except RuntimeError:
+            slots.release()
+            raise
+        # Free the slot when the job ends, not when the caller stops waiting
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # Only succeeds while still queued
+            raise HasherBusy()
+
+    def hash(self, password):
+        """Hash ``password`` with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check ``password`` against a stored hash of any supported method"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if ``password_hash`` was made with other parameters than configured"""
+        if self._prefix is None:
+            # Expand short forms like 'pbkdf2' to the full parameter string werkzeug writes
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+
+hasher = PasswordHasher()
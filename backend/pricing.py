@@ -0,0 +1,167 @@
+"""
+Room pricing for the Hotel Booking System
+
+Prices are computed in integer cents. For a batch of rooms and stays the
+engine builds one nightly rate calendar per (hotel, room type, base rate)
+over the span covering every stay, applying the hotel's rate plans, and
+takes its prefix sums; the price of any stay is then the difference of two
+prefix sums, so quoting N rooms x M stays costs one calendar per distinct
+rate group plus O(1) per quote. Length-of-stay discounts are applied to the
+stay subtotal.
+
+Rate plans and stay discounts for the whole batch are loaded in one query
+each.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import accumulate
+
+from sqlalchemy import or_
+
+from models import RatePlan, StayDiscount
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amount):
+    """Exact integer cents for a price given as float, Decimal, int or string
+
+    Raises ValueError for anything that is not a finite amount (NaN,
+    infinities, unparseable strings, values beyond Decimal precision).
+    """
+    try:
+        value = Decimal(str(amount))
+        if not value.is_finite():
+            raise ValueError(f'not a finite amount: {amount!r}')
+        return int(value.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+    except InvalidOperation:
+        raise ValueError(f'not an amount: {amount!r}')
+
+
+def from_cents(cents):
+    """Decimal amount for integer cents"""
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def _percent_of(cents, percent):
+    """``cents * percent / 100`` rounded half up, in integer arithmetic"""
+    value = cents * percent
+    return (value + 50) // 100 if value >= 0 else -((-value + 50) // 100)
+
+
+class Quote(namedtuple('Quote', 'nights subtotal_cents discount_cents total_cents')):
+    """Price of one room for one stay"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'nights': self.nights,
+            'subtotal': str(from_cents(self.subtotal_cents)),
+            'discount': str(from_cents(self.discount_cents)),
+            'total': str(from_cents(self.total_cents)),
+        }
+
+
+class Pricer:
+    """Quotes rooms for a fixed set of stays, caching one calendar per rate group"""
+
+    def __init__(self, stays, hotel_ids=None):
+        self.stays = list(stays)
+        self.start = min(check_in for check_in, _ in self.stays)
+        self.end = max(check_out for _, check_out in self.stays)
+        self._calendars = {}
+
+        plans = RatePlan.query.filter(
+            or_(RatePlan.start_date == None, RatePlan.start_date < self.end),
+            or_(RatePlan.end_date == None, RatePlan.end_date > self.start)
+        )
+        discounts = StayDiscount.query
+        if hotel_ids is not None:
+            plans = plans.filter(RatePlan.hotel_id.in_(hotel_ids))
+            discounts = discounts.filter(StayDiscount.hotel_id.in_(hotel_ids))
+
+        self._plans = {}
+        # Lowest precedence first so later plans overwrite earlier ones
+        for plan in sorted(plans.all(), key=lambda plan: (plan.priority or 0, plan.room_type is not None, plan.id)):
+            self._plans.setdefault(plan.hotel_id, []).append(plan)
+
+        self._discounts = {}
+        for discount in discounts.all():
+            self._discounts.setdefault(discount.hotel_id, []).append(discount)
+
+    def _calendar(self, hotel_id, room_type, base_cents):
+        """Prefix sums of nightly rates from ``self.start``: index i is the cost of the first i nights"""
+        key = (hotel_id, room_type, base_cents)
+        prefix = self._calendars.get(key)
+        if prefix is not None:
+            return prefix
+
+        days = (self.end - self.start).days
+        nightly = [base_cents] * days
+        for plan in self._plans.get(hotel_id, ()):
+            if plan.room_type is not None and plan.room_type != room_type:
+                continue
+            first = max(0, (plan.start_date - self.start).days) if plan.start_date else 0
+            last = min(days, (plan.end_date - self.start).days) if plan.end_date else days
+            if plan.nightly_rate_cents is not None:
+                rate = plan.nightly_rate_cents
+            else:
+                rate = base_cents + _percent_of(base_cents, plan.adjustment_percent or 0)
+            if plan.weekdays:
+                weekdays = {int(day) for day in plan.weekdays.split(',')}
+                start_weekday = self.start.weekday()
+                for index in range(first, last):
+                    if (start_weekday + index) % 7 in weekdays:
+                        nightly[index] = rate
+            else:
+                nightly[first:last] = [rate] * (last - first)
+
+        prefix = self._calendars[key] = [0, *accumulate(nightly)]
+        return prefix
+
+    def _percent_off(self, hotel_id, room_type, nights):
+        best = 0
+        for discount in self._discounts.get(hotel_id, ()):
+            if discount.min_nights <= nights and (discount.room_type is None or discount.room_type == room_type):
+                best = max(best, discount.percent_off)
+        return best
+
+    def quote(self, room, check_in, check_out):
+        """Quote one room for a stay inside the pricer's date span"""
+        prefix = self._calendar(room.hotel_id, room.room_type, room.price_per_night_cents)
+        first = (check_in - self.start).days
+        nights = (check_out - check_in).days
+        subtotal = prefix[first + nights] - prefix[first]
+        discount = _percent_of(subtotal, self._percent_off(room.hotel_id, room.room_type, nights))
+        return Quote(nights, subtotal, discount, subtotal - discount)
+
+    def quote_all(self, room):
+        """Quotes for ``room`` for every stay, in order"""
+        prefix = self._calendar(room.hotel_id, room.room_type, room.price_per_night_cents)
+        percent_off = {}
+        quotes = []
+        for check_in, check_out in self.stays:
+            first = (check_in - self.start).days
+            nights = (check_out - check_in).days
+            subtotal = prefix[first + nights] - prefix[first]
+            percent = percent_off.get(nights)
+            if percent is None:
+                percent = percent_off[nights] = self._percent_off(room.hotel_id, room.room_type, nights)
+            discount = _percent_of(subtotal, percent) if percent else 0
+            quotes.append(Quote(nights, subtotal, discount, subtotal - discount))
+        return quotes
+
+
+def quote_many(rooms, stays):
+    """``{room.id: [Quote per stay]}`` for every room and stay"""
+    rooms = list(rooms)
+    if not rooms or not stays:
+        return {room.id: [] for room in rooms}
+    pricer = Pricer(stays, hotel_ids={room.hotel_id for room in rooms})
+    return {room.id: pricer.quote_all(room) for room in rooms}
+
+
+def quote_stay(room, check_in, check_out):
+    """Quote a single room for a single stay"""
+    return Pricer([(check_in, check_out)], hotel_ids=[room.hotel_id]).quote(room, check_in, check_out)
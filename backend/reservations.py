@@ -0,0 +1,79 @@
+"""
+Atomic booking reservation for the Hotel Booking System
+
+The overlap check and the insert of a new booking run under a per-room
+lock so two concurrent requests for the same room and dates cannot both
+succeed:
+
+- Postgres: ``SELECT ... FOR UPDATE`` on the room row serializes bookings
+  for that room only; other rooms are unaffected.
+- SQLite: ``BEGIN IMMEDIATE`` takes the database write lock before the
+  check (SQLite has no row locks), so the check and insert are atomic
+  across processes.
+
+Within one process a per-room ``threading.Lock`` additionally queues
+competing requests before they reach the database. The booking's nights
+are written to the ``room_nights`` inventory in the same transaction, whose
+primary key rejects an oversell even if the locks are bypassed.
+"""
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Room
+from lifecycle import sweeper
+import inventory
+
+_room_locks = {}
+_room_locks_guard = threading.Lock()
+
+
+def _process_lock(room_id):
+    with _room_locks_guard:
+        lock = _room_locks.get(room_id)
+        if lock is None:
+            lock = _room_locks[room_id] = threading.Lock()
+        return lock
+
+
+def _lock_room(room_id):
+    """Take the database-level lock guarding bookings for ``room_id``"""
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        # Already inside a write transaction means the lock is already held
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+    else:
+        db.session.execute(select(Room.id).where(Room.id == room_id).with_for_update())
+
+
+def reserve(booking):
+    """Insert ``booking`` if its room is free for its dates; returns True on success
+
+    The session must not hold uncommitted changes when this is called,
+    since it commits (or rolls back) the current transaction.
+    """
+    with _process_lock(booking.room_id):
+        try:
+            _lock_room(booking.room_id)
+            if not inventory.is_free(booking.room_id, booking.check_in_date, booking.check_out_date):
+                # Nights behind a lapsed hold are free even before a sweep expires it
+                if not (sweeper.expire_lapsed(booking.room_id, booking.check_in_date, booking.check_out_date)
+                        and inventory.is_free(booking.room_id, booking.check_in_date, booking.check_out_date)):
+                    db.session.rollback()
+                    return False
+            db.session.add(booking)
+            db.session.flush()
+            inventory.hold(booking)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return True
@@ -0,0 +1,212 @@
+"""
+Full-text search over hotels and rooms
+
+SQLite databases use FTS5 tables (``hotels_fts``, ``rooms_fts``) keyed by
+the hotel/room id and kept in sync by the admin routes. Postgres databases
+use GIN indexes on ``to_tsvector`` expressions, which stay in sync on their
+own. Any other backend (or a SQLite build without FTS5) falls back to
+ILIKE matching.
+"""
+import re
+
+from sqlalchemy import column, false, func, literal, literal_column, or_, select, table as sql_table, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, Hotel, Room
+
+# Relative weight of each column when ranking matches (name/type first)
+HOTEL_COLUMNS = ('name', 'city', 'country', 'description', 'amenities')
+HOTEL_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 1.0)
+ROOM_COLUMNS = ('room_type', 'description', 'amenities')
+ROOM_WEIGHTS = (10.0, 1.0, 1.0)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(query_text):
+    return _TOKEN.findall(query_text or '')[:16]
+
+
+def _tsvector(columns):
+    """Postgres tsvector expression; must match the expression index exactly"""
+    parts = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+    return f"to_tsvector('english', {parts})"
+
+
+# Database URLs already known to have FTS5 tables, to skip the catalogue lookup
+_fts5_ready = set()
+
+
+def backend():
+    """Name of the search backend in use for the current database"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return 'fts5' if _fts5_tables_exist() else 'like'
+    if dialect == 'postgresql':
+        return 'tsvector'
+    return 'like'
+
+
+def _fts5_tables_exist():
+    url = str(db.engine.url)
+    if url in _fts5_ready:
+        return True
+    row = db.session.execute(text(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ('hotels_fts', 'rooms_fts')"
+    )).scalar()
+    if row == 2:
+        _fts5_ready.add(url)
+        return True
+    return False
+
+
+# =============================================================================
+# INDEX MANAGEMENT
+# =============================================================================
+
+def create_search_index():
+    """Create the full-text index for the current database if it is missing
+
+    Returns True when a new SQLite FTS5 index was created and populated.
+    """
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        if _fts5_tables_exist():
+            return False
+        try:
+            db.session.execute(text(
+                f"CREATE VIRTUAL TABLE hotels_fts USING fts5({', '.join(HOTEL_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+            ))
+            db.session.execute(text(
+                f"CREATE VIRTUAL TABLE rooms_fts USING fts5({', '.join(ROOM_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+            ))
+        except OperationalError:
+            # SQLite compiled without FTS5: searches fall back to ILIKE
+            db.session.rollback()
+            return False
+        db.session.commit()
+        rebuild_search_index()
+        return True
+
+    if dialect == 'postgresql':
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_hotels_search ON hotels USING GIN ({_tsvector(HOTEL_COLUMNS)})"
+        ))
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_rooms_search ON rooms USING GIN ({_tsvector(ROOM_COLUMNS)})"
+        ))
+        db.session.commit()
+
+    return False
+
+
+def rebuild_search_index():
+    """Repopulate the SQLite FTS5 tables from the hotels and rooms tables"""
+    if backend() != 'fts5':
+        return
+    db.session.execute(text("DELETE FROM hotels_fts"))
+    db.session.execute(text("DELETE FROM rooms_fts"))
+    db.session.execute(text(
+        f"INSERT INTO hotels_fts(rowid, {', '.join(HOTEL_COLUMNS)}) "
+        f"SELECT id, {', '.join(HOTEL_COLUMNS)} FROM hotels"
+    ))
+    db.session.execute(text(
+        f"INSERT INTO rooms_fts(rowid, {', '.join(ROOM_COLUMNS)}) "
+        f"SELECT id, {', '.join(ROOM_COLUMNS)} FROM rooms"
+    ))
+    db.session.commit()
+
+
+def _index_row(table, columns, row):
+    db.session.execute(text(f"DELETE FROM {table} WHERE rowid = :id"), {'id': row.id})
+    db.session.execute(
+        text(f"INSERT INTO {table}(rowid, {', '.join(columns)}) VALUES (:id, {', '.join(':' + c for c in columns)})"),
+        {'id': row.id, **{column: getattr(row, column) for column in columns}}
+    )
+    db.session.commit()
+
+
+def index_hotel(hotel):
+    """Add or refresh a hotel in the search index after it is committed"""
+    if backend() == 'fts5':
+        _index_row('hotels_fts', HOTEL_COLUMNS, hotel)
+
+
+def index_room(room):
+    """Add or refresh a room in the search index after it is committed"""
+    if backend() == 'fts5':
+        _index_row('rooms_fts', ROOM_COLUMNS, room)
+
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def _ranked_select(model, table, columns, weights, query_text, filters=()):
+    """Select of (id, score) best match first for the active backend, or None without terms
+
+    ``filters`` are conditions on ``model`` applied in the same statement, so a
+    limit counts only rows that pass them.
+    """
+    tokens = _tokens(query_text)
+    if not tokens:
+        return None
+
+    engine = backend()
+
+    if engine == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        fts = sql_table(f'{table}_fts', column('rowid'))
+        # bm25() is lower-is-better; flip it so higher scores rank first everywhere
+        score = literal_column(f"-bm25({table}_fts, {', '.join(str(w) for w in weights)})")
+        statement = select(fts.c.rowid.label('id'), score.label('score')).select_from(fts)
+        if filters:
+            statement = statement.join(model, model.id == fts.c.rowid)
+        return (
+            statement
+            .where(text(f'{table}_fts MATCH :match').bindparams(match=match), *filters)
+            .order_by(score.desc())
+        )
+
+    if engine == 'tsvector':
+        tsvector = literal_column(_tsvector(columns))
+        tsquery = func.to_tsquery('english', ' & '.join(f'{token}:*' for token in tokens))
+        score = func.ts_rank(tsvector, tsquery)
+        return (
+            select(model.id, score.label('score'))
+            .where(tsvector.op('@@')(tsquery), *filters)
+            .order_by(score.desc())
+        )
+
+    matches = [or_(*[getattr(model, column).ilike(f'%{token}%') for column in columns]) for token in tokens]
+    return select(model.id, literal(0.0).label('score')).where(*matches, *filters)
+
+
+def _ranked_ids(model, table, columns, weights, query_text, limit, filters):
+    """Return [(id, score)] best match first, at most ``limit`` (None: all)"""
+    statement = _ranked_select(model, table, columns, weights, query_text, filters)
+    if statement is None:
+        return []
+    if limit is not None:
+        statement = statement.limit(limit)
+    return [(row_id, float(score)) for row_id, score in db.session.execute(statement).all()]
+
+
+def search_hotel_ids(query_text, limit=100, filters=()):
+    """Ranked [(hotel_id, score)] matching name, city, country, description or amenities"""
+    return _ranked_ids(Hotel, 'hotels', HOTEL_COLUMNS, HOTEL_WEIGHTS, query_text, limit, filters)
+
+
+def search_room_ids(query_text, limit=100, filters=()):
+    """Ranked [(room_id, score)] matching room type, description or amenities"""
+    return _ranked_ids(Room, 'rooms', ROOM_COLUMNS, ROOM_WEIGHTS, query_text, limit, filters)
+
+
+def rank_hotels(query, query_text):
+    """Narrow a Hotel query to search matches, best match first, in one statement"""
+    ranked = _ranked_select(Hotel, 'hotels', HOTEL_COLUMNS, HOTEL_WEIGHTS, query_text)
+    if ranked is None:
+        return query.filter(false())
+    ranked = ranked.subquery()
+    return query.join(ranked, Hotel.id == ranked.c.id).order_by(ranked.c.score.desc(), Hotel.id)
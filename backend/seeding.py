@@ -0,0 +1,267 @@
+"""
+Synthetic data generator for capacity planning and benchmarks
+
+Generates hotels, rooms, users and bookings from a seeded ``random.Random``,
+so the same arguments always produce the same database. Rows are plain
+dicts written with one multi-row INSERT per chunk; nothing goes through the
+ORM unit of work. Ids are assigned here (continuing after the highest
+existing id), which lets the nightly inventory (``room_nights``) be written
+in the same pass instead of being rebuilt from the bookings afterwards; on
+Postgres the id sequences are moved past them at the end.
+
+Bookings never overlap: each room gets a consecutive timeline of stays
+separated by random gaps, starting ``history_days`` before today (by default
+half a room's expected timeline, so about half the stays lie in the past).
+Stays that ended before today are ``completed`` and later ones ``confirmed``
+or ``pending``; any booking may be ``cancelled``.
+
+Distributions:
+    rooms_per_hotel   (min, max) rooms per hotel, uniform
+    star_weights      relative weights of 1..5 star hotels
+    stay_nights       mean stay length in nights (geometric, at least one)
+    gap_nights        mean free nights between two stays of a room (geometric)
+    user_skew         1 spreads bookings evenly over users; higher values
+                      concentrate them on the lower user ids (repeat guests)
+    cancel_rate       fraction of bookings cancelled
+    pending_rate      fraction of future bookings still pending
+"""
+import math
+import random
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from inventory import night_rates
+from models import db, cents_to_amount, sync_id_sequences, User, Hotel, Room, Booking, RoomNight
+from passwords import hasher
+
+CITIES = [('New York', 'USA'), ('Miami', 'USA'), ('Denver', 'USA'), ('Chicago', 'USA'), ('Seattle', 'USA'),
+          ('Boston', 'USA'), ('Austin', 'USA'), ('San Diego', 'USA'), ('London', 'UK'), ('Paris', 'France'),
+          ('Berlin', 'Germany'), ('Rome', 'Italy'), ('Madrid', 'Spain'), ('Tokyo', 'Japan'),
+          ('Sydney', 'Australia'), ('Toronto', 'Canada')]
+HOTEL_NAMES = ['Grand', 'Plaza', 'Seaside', 'Mountain', 'Park', 'Harbor', 'Royal', 'City', 'Garden', 'Lakeside']
+HOTEL_KINDS = ['Hotel', 'Resort', 'Inn', 'Suites', 'Lodge']
+HOTEL_AMENITIES = ['WiFi', 'Pool', 'Spa', 'Gym', 'Restaurant', 'Bar', 'Room Service', 'Parking', 'Beach',
+                   'Business Center', 'Golf', 'Hiking']
+# (room type, base price, capacity, weight)
+ROOM_TYPES = [
+    ('Standard Room', 99, 2, 40),
+    ('Deluxe Room', 149, 2, 30),
+    ('Suite', 249, 4, 15),
+    ('Executive Suite', 399, 4, 10),
+    ('Presidential Suite', 599, 6, 5),
+]
+ROOM_AMENITIES = 'WiFi,TV,Air Conditioning,Private Bathroom'
+DEFAULT_PASSWORD = 'password123'
+
+
+def _geometric(rng, mean):
+    """Geometric variate >= 1 with the given mean"""
+    if mean <= 1:
+        return 1
+    return 1 + int(math.log(1.0 - rng.random()) / math.log(1.0 - 1.0 / mean))
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _sqlite_converter(column):
+    """Value -> stored form for one column, matching what SQLAlchemy's SQLite types write"""
+    python_type = column.type.python_type
+    # Dates repeat heavily across bookings, so formatting is memoized
+    if python_type is datetime:
+        return lru_cache(maxsize=65536)(lambda value: value and value.strftime('%Y-%m-%d %H:%M:%S.%f'))
+    if python_type is date:
+        return lru_cache(maxsize=65536)(lambda value: value and value.isoformat())
+    if python_type is bool:
+        return lambda value: None if value is None else int(value)
+    return None
+
+
+class _Writer:
+    """Multi-row inserts of row dicts into one table
+
+    On SQLite the rows go straight to the driver's ``executemany`` as tuples;
+    SQLAlchemy's per-row parameter processing would otherwise cost more than
+    the inserts themselves. Other databases use a Core insert.
+    """
+
+    def __init__(self, table):
+        self.connection = db.session.connection()
+        self.table = table
+        self.keys = [column.key for column in table.columns]
+        self.raw = self.connection.dialect.name == 'sqlite'
+        if self.raw:
+            self.sql = (f'INSERT INTO {table.name} ({", ".join(self.keys)}) '
+                        f'VALUES ({", ".join("?" * len(self.keys))})')
+            self.converters = [(index, converter) for index, converter in
+                               enumerate(map(_sqlite_converter, table.columns)) if converter]
+
+    def write(self, rows):
+        if not rows:
+            return 0
+        if not self.raw:
+            self.connection.execute(insert(self.table), rows)
+            return len(rows)
+        keys, converters = self.keys, self.converters
+        values = []
+        for row in rows:
+            row_values = [row[key] for key in keys]
+            for index, converter in converters:
+                row_values[index] = converter(row_values[index])
+            values.append(tuple(row_values))
+        self.connection.exec_driver_sql(self.sql, values)
+        return len(rows)
+
+
+def _write(table, rows, chunk_size):
+    """Insert an iterable of row dicts in chunks; returns the number written"""
+    writer = _Writer(table)
+    written = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            written += writer.write(chunk)
+            chunk = []
+    return written + writer.write(chunk)
+
+
+@contextmanager
+def _without_indexes(*tables):
+    """Drop the secondary indexes of ``tables`` for a bulk load and recreate them afterwards
+
+    Building an index once over the loaded rows is much cheaper than updating
+    it for every inserted row.
+    """
+    connection = db.session.connection()
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        index.drop(bind=connection, checkfirst=True)
+    yield
+    for index in indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def generate(hotels=100, rooms_per_hotel=(10, 40), users=1000, bookings=10000, seed=42,
+             star_weights=(5, 15, 35, 30, 15), stay_nights=3.0, gap_nights=2.0, user_skew=1.0,
+             cancel_rate=0.1, pending_rate=0.15, history_days=None, password=DEFAULT_PASSWORD,
+             chunk_size=20000, progress=None):
+    """Insert a synthetic dataset and commit; returns rows written per table
+
+    ``progress(bookings, elapsed)`` is called after each chunk of bookings.
+    Derived catalogue data (amenity links, search index, caches) is left to
+    the caller.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    counts = {}
+
+    first_user = _next_id(User)
+    first_hotel = _next_id(Hotel)
+    first_room = _next_id(Room)
+    first_booking = _next_id(Booking)
+
+    # Every user gets the same password, so it is hashed once
+    password_hash = hasher.hash(password)
+    counts['users'] = _write(User.__table__, ({
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+        'password_hash': password_hash, 'first_name': 'Guest', 'last_name': str(user_id),
+        'phone': None, 'created_at': now, 'is_active': True,
+    } for user_id in range(first_user, first_user + users)), chunk_size)
+
+    hotel_rows = []
+    room_rows = []
+    type_weights = [weight for *_, weight in ROOM_TYPES]
+    for hotel_id in range(first_hotel, first_hotel + hotels):
+        city, country = rng.choice(CITIES)
+        stars = rng.choices(range(1, 6), weights=star_weights)[0]
+        hotel_rows.append({
+            'id': hotel_id, 'name': f'{rng.choice(HOTEL_NAMES)} {city} {rng.choice(HOTEL_KINDS)} {hotel_id}',
+            'description': f'A {stars}-star property in {city}.', 'address': f'{rng.randint(1, 999)} Main Street',
+            'city': city, 'country': country, 'star_rating': stars, 'image_url': None,
+            'amenities': ','.join(rng.sample(HOTEL_AMENITIES, rng.randint(3, 7))),
+            'check_in_time': '14:00', 'check_out_time': '11:00', 'created_at': now, 'is_active': True,
+        })
+        for number in range(1, rng.randint(*rooms_per_hotel) + 1):
+            room_type, base, capacity, _ = rng.choices(ROOM_TYPES, weights=type_weights)[0]
+            # Better hotels charge more, with +/-20% spread between rooms
+            price = round(base * (0.6 + 0.2 * stars) * rng.uniform(0.8, 1.2) * 100)
+            room_rows.append({
+                'id': first_room + len(room_rows), 'hotel_id': hotel_id,
+                'room_number': f'{(number - 1) // 20 + 1}{(number - 1) % 20 + 1:02d}', 'room_type': room_type,
+                'description': f'{room_type} for up to {capacity} guests.', 'price_per_night_cents': price,
+                'price_per_night': cents_to_amount(price),
+                'capacity': capacity, 'image_url': None, 'amenities': ROOM_AMENITIES, 'is_available': True,
+                'created_at': now,
+            })
+    counts['hotels'] = _write(Hotel.__table__, hotel_rows, chunk_size)
+    counts['rooms'] = _write(Room.__table__, room_rows, chunk_size)
+    counts['bookings'] = counts['room_nights'] = 0
+    if not room_rows or not users:
+        sync_id_sequences(User, Hotel, Room)
+        db.session.commit()
+        return counts
+
+    booking_writer = _Writer(Booking.__table__)
+    night_writer = _Writer(RoomNight.__table__)
+    booking_chunk = []
+    night_chunk = []
+
+    def flush():
+        # Bookings first: room_nights references them
+        counts['bookings'] += booking_writer.write(booking_chunk)
+        counts['room_nights'] += night_writer.write(night_chunk)
+        booking_chunk.clear()
+        night_chunk.clear()
+        if progress:
+            progress(counts['bookings'], time.perf_counter() - started)
+
+    # Spread bookings evenly over rooms; each room's stays follow one another
+    per_room, extra = divmod(bookings, len(room_rows))
+    if history_days is None:
+        history_days = int((per_room + 1) * (stay_nights + gap_nights) / 2)
+    booking_id = first_booking
+    with _without_indexes(Booking.__table__, RoomNight.__table__):
+        for index, room in enumerate(room_rows):
+            day = today - timedelta(days=history_days + rng.randint(0, 7))
+            for _ in range(per_room + (index < extra)):
+                day += timedelta(days=_geometric(rng, gap_nights + 1) - 1)
+                nights = _geometric(rng, stay_nights)
+                check_out = day + timedelta(days=nights)
+                if rng.random() < cancel_rate:
+                    status = 'cancelled'
+                elif check_out <= today:
+                    status = 'completed'
+                else:
+                    status = 'pending' if rng.random() < pending_rate else 'confirmed'
+                user_id = first_user + min(users - 1, int(users * rng.random() ** user_skew))
+                total = room['price_per_night_cents'] * nights
+                created = datetime.combine(day, datetime.min.time()) - timedelta(days=rng.randint(1, 90))
+                booking_chunk.append({
+                    'id': booking_id, 'user_id': user_id, 'hotel_id': room['hotel_id'], 'room_id': room['id'],
+                    'check_in_date': day, 'check_out_date': check_out, 'guest_name': f'Guest {user_id}',
+                    'guest_email': f'user{user_id}@example.com', 'guest_phone': None,
+                    'number_of_guests': rng.randint(1, room['capacity']), 'total_price_cents': total,
+                    'total_price': cents_to_amount(total), 'status': status,
+                    'special_requests': None, 'created_at': created, 'updated_at': created,
+                })
+                if status != 'cancelled':
+                    night_chunk.extend({
+                        'room_id': room['id'], 'night': day + timedelta(days=offset), 'hotel_id': room['hotel_id'],
+                        'booking_id': booking_id, 'status': status, 'rate_cents': rate, 'rate': cents_to_amount(rate),
+                    } for offset, rate in enumerate(night_rates(total, nights)))
+                booking_id += 1
+                day = check_out
+                if len(booking_chunk) >= chunk_size or len(night_chunk) >= chunk_size * 4:
+                    flush()
+        flush()
+    sync_id_sequences(User, Hotel, Room, Booking)
+    db.session.commit()
+    return counts
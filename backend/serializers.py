@@ -0,0 +1,165 @@
+"""
+Fast JSON output for the API: a pluggable JSON provider and column projections
+
+``init_json(app)`` installs a Flask JSON provider backed by orjson when it
+is installed (``JSON_PROVIDER=orjson``, the default) and keeps Flask's
+stdlib provider otherwise (or with ``JSON_PROVIDER=stdlib``). Both produce
+the same documents: keys sorted, dates and datetimes passed in raw are
+formatted by Flask's default handler, and ``jsonify`` pretty-prints in
+debug mode.
+
+A ``Projection`` selects a fixed set of a model's columns and turns each
+result row into the same dict as the model's ``to_dict()``. It reads the
+row tuple directly, so list endpoints skip ORM hydration, the identity
+map and one attribute lookup per field. ``booking_query()`` adds the
+booking's hotel and room in the same SELECT for depth 1.
+"""
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+from models import db, cents_to_amount, Hotel, Room, Booking
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider serializing with orjson, with stdlib behaviour for anything else"""
+
+    @property
+    def _option(self):
+        # Raw dates go through Flask's default handler, as with the stdlib provider
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # json.dumps options (indent, separators, ...) have no orjson equivalent
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._option
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        # Trailing newline as with the stdlib provider
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option) + b'\n', mimetype=self.mimetype
+        )
+
+
+def init_json(app):
+    """Use orjson for ``jsonify``/``app.json`` unless unavailable or ``JSON_PROVIDER=stdlib``"""
+    if app.config.get('JSON_PROVIDER', 'orjson') == 'orjson' and orjson is not None:
+        app.json = OrjsonProvider(app)
+    return type(app.json).__name__
+
+
+# to_dict() amounts, read from their integer cents columns
+MONEY_FIELDS = {'price_per_night': 'price_per_night_cents', 'total_price': 'total_price_cents'}
+
+
+class Projection:
+    """A model's ``to_dict()`` fields selected as labelled columns and rebuilt from result rows"""
+
+    def __init__(self, entity, keys, prefix=''):
+        self.keys = keys
+        attributes = [getattr(entity, MONEY_FIELDS.get(key, key)) for key in keys]
+        self.columns = [attribute.label(prefix + key) for key, attribute in zip(keys, attributes)]
+        self.temporal = [
+            index for index, attribute in enumerate(attributes)
+            if attribute.type.python_type in (date, datetime)
+        ]
+        self.money = [index for index, key in enumerate(keys) if key in MONEY_FIELDS]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def serialize(self, row, offset=0):
+        """The dict for this projection's columns, which start at ``offset`` in ``row``"""
+        values = list(row[offset:offset + len(self.keys)])
+        for index in self.temporal:
+            value = values[index]
+            if value is not None:
+                values[index] = value.isoformat()
+        for index in self.money:
+            values[index] = cents_to_amount(values[index])
+        return dict(zip(self.keys, values))
+
+
+# Keys of each model's to_dict(), in the same order
+HOTEL_FIELDS = ('id', 'name', 'description', 'address', 'city', 'country', 'star_rating', 'image_url',
+                'amenities', 'check_in_time', 'check_out_time')
+ROOM_FIELDS = ('id', 'hotel_id', 'room_number', 'room_type', 'description', 'price_per_night', 'capacity',
+               'image_url', 'amenities', 'is_available')
+BOOKING_FIELDS = ('id', 'user_id', 'hotel_id', 'room_id', 'check_in_date', 'check_out_date', 'guest_name',
+                  'guest_email', 'guest_phone', 'number_of_guests', 'total_price', 'status', 'special_requests',
+                  'created_at')
+
+HOTEL = Projection(Hotel, HOTEL_FIELDS)
+ROOM = Projection(Room, ROOM_FIELDS)
+
+
+def hotel_query():
+    """Query of Hotel.to_dict() columns and the row serializer"""
+    return db.session.query(*HOTEL.columns), HOTEL.serialize
+
+
+def hotel_select():
+    """``hotel_query()`` as a Core SELECT, for async sessions"""
+    return select(*HOTEL.columns), HOTEL.serialize
+
+
+def _booking_projection(entity, depth):
+    """Columns, outer joins and row serializer of Booking.to_dict(depth) for ``entity``"""
+    booking = Projection(entity, BOOKING_FIELDS)
+    if depth <= 0:
+        return booking.columns, [], booking.serialize
+
+    hotel = Projection(Hotel, HOTEL_FIELDS, prefix='hotel_')
+    room = Projection(Room, ROOM_FIELDS, prefix='room_')
+    joins = [(Hotel, Hotel.id == entity.hotel_id), (Room, Room.id == entity.room_id)]
+    hotel_offset = len(booking)
+    room_offset = hotel_offset + len(hotel)
+
+    def serialize(row):
+        data = booking.serialize(row)
+        data['hotel'] = hotel.serialize(row, hotel_offset) if row[hotel_offset] is not None else None
+        data['room'] = room.serialize(row, room_offset) if row[room_offset] is not None else None
+        return data
+
+    return booking.columns + hotel.columns + room.columns, joins, serialize
+
+
+def booking_query(entity=Booking, depth=1):
+    """Query of ``entity``'s Booking.to_dict(depth) columns and the row serializer
+
+    ``entity`` is Booking or an alias of it (e.g. ``archive.booking_history()``).
+    Depth 1 outer-joins the hotel and room, as to_dict() nests them.
+    """
+    columns, joins, serialize = _booking_projection(entity, depth)
+    query = db.session.query(*columns)
+    for target, onclause in joins:
+        query = query.outerjoin(target, onclause)
+    return query, serialize
+
+
+def booking_select(entity=Booking, depth=1):
+    """``booking_query()`` as a Core SELECT, for async sessions"""
+    columns, joins, serialize = _booking_projection(entity, depth)
+    statement = select(*columns)
+    for target, onclause in joins:
+        statement = statement.outerjoin(target, onclause)
+    return statement, serialize
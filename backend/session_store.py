@@ -0,0 +1,141 @@
+"""
+Session backends for the Hotel Booking System
+
+``SESSION_BACKEND`` selects how the small login payload (``user_id``,
+``username``, ``email``) and flash messages are kept between requests:
+
+- ``cookie`` (default): Flask's signed cookie; no server-side I/O at all
+- ``redis``: shared store at ``SESSION_REDIS_URL`` (requires ``redis``),
+  usable from every app node
+- ``local-shared``: in-process stand-in for the shared store, for tests
+- ``filesystem``: the previous Flask-Session file store in ``flask_session/``
+
+Shared-store sessions expire through the store's TTL; filesystem sessions
+(and the local stand-in) are swept by ``sweep_sessions()``, also available
+as ``flask sweep-sessions``.
+"""
+import os
+import secrets
+import time
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from cache import LocalSharedStore
+
+
+class StoreSession(CallbackDict, SessionMixin):
+    """Session data kept in a key/value store under a random id"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class StoreSessionInterface(SessionInterface):
+    """Server-side sessions in a Redis-compatible store (get/set with ex/delete)
+
+    The cookie only carries the signed session id. The store is written
+    only when the session changes, so read-only requests cost one GET.
+    """
+
+    def __init__(self, client, prefix='session:'):
+        self.client = client
+        self.prefix = prefix
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='flask-session-id')
+
+    def open_session(self, app, request):
+        signed_sid = request.cookies.get(self.get_cookie_name(app))
+        if signed_sid:
+            try:
+                sid = self._signer(app).unsign(signed_sid).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                raw = self.client.get(self.prefix + sid)
+                if raw is not None:
+                    return StoreSession(session_json_serializer.loads(raw), sid=sid)
+        return StoreSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.client.delete(self.prefix + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            return
+
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        self.client.set(self.prefix + session.sid, session_json_serializer.dumps(dict(session)).encode(), ex=lifetime)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid.encode()).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def init_sessions(app):
+    """Install the session interface selected by SESSION_BACKEND"""
+    backend = app.config.get('SESSION_BACKEND', 'cookie')
+    if not app.secret_key:
+        # The cookie backend trusts whatever the key signs, and the stores sign their ids with it
+        raise RuntimeError('SECRET_KEY must be set')
+
+    if backend == 'redis':
+        import redis
+        app.session_interface = StoreSessionInterface(redis.Redis.from_url(app.config['SESSION_REDIS_URL']))
+    elif backend == 'local-shared':
+        app.session_interface = StoreSessionInterface(LocalSharedStore())
+    elif backend == 'filesystem':
+        from flask_session import Session
+        Session(app)
+    elif backend != 'cookie':
+        raise ValueError(f'Unknown SESSION_BACKEND: {backend}')
+    # 'cookie' keeps Flask's default SecureCookieSessionInterface
+
+
+def sweep_sessions(app):
+    """Remove expired sessions the backend does not expire by itself; returns count"""
+    interface = app.session_interface
+    if isinstance(interface, StoreSessionInterface):
+        sweep = getattr(interface.client, 'sweep', None)
+        return sweep() if sweep else 0  # Redis expires keys itself
+    if app.config.get('SESSION_BACKEND') == 'filesystem':
+        return _sweep_filesystem(app)
+    return 0
+
+
+def _sweep_filesystem(app):
+    """Delete filesystem session files older than the session lifetime"""
+    directory = app.config.get('SESSION_FILE_DIR', os.path.join(os.getcwd(), 'flask_session'))
+    if not os.path.isdir(directory):
+        return 0
+
+    cutoff = time.time() - app.permanent_session_lifetime.total_seconds()
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
@@ -0,0 +1,174 @@
+"""
+Booking statistics computed in SQL for the user and admin dashboards
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import distinct, func, select
+
+from archive import night_history
+from models import db, cents_to_amount, User, Hotel, Room, Booking, ArchivedBooking
+
+# Bookings that count towards revenue and occupancy
+OCCUPIED_STATUSES = ('confirmed', 'completed')
+
+# How long cached admin totals are served before being recomputed (seconds)
+DEFAULT_TOTALS_TTL = 60
+
+_totals_lock = threading.Lock()
+_totals_cache = {'value': None, 'expires': 0.0}
+
+
+def booking_status_counts(user_id=None, include_archived=False):
+    """Count bookings per status with a single GROUP BY, optionally for one user
+
+    With ``include_archived`` the archive is counted too, with one more GROUP BY.
+    """
+    counts = {'pending': 0, 'confirmed': 0, 'cancelled': 0, 'completed': 0, 'expired': 0}
+    for model in (Booking, ArchivedBooking) if include_archived else (Booking,):
+        query = db.session.query(model.status, func.count(model.id)).group_by(model.status)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        for status, count in query.all():
+            counts[status] = counts.get(status, 0) + count
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def admin_totals(ttl=DEFAULT_TOTALS_TTL):
+    """Row counts for users, hotels, rooms and bookings, cached for ``ttl`` seconds"""
+    now = time.monotonic()
+    with _totals_lock:
+        if _totals_cache['value'] is not None and now < _totals_cache['expires']:
+            return _totals_cache['value']
+
+    # One round trip: each total is a scalar subquery
+    row = db.session.execute(select(
+        select(func.count(User.id)).scalar_subquery(),
+        select(func.count(Hotel.id)).scalar_subquery(),
+        select(func.count(Room.id)).scalar_subquery(),
+        select(func.count(Booking.id)).scalar_subquery(),
+    )).one()
+
+    totals = {
+        'total_users': row[0],
+        'total_hotels': row[1],
+        'total_rooms': row[2],
+        'total_bookings': row[3],
+    }
+
+    with _totals_lock:
+        _totals_cache['value'] = totals
+        _totals_cache['expires'] = now + ttl
+    return totals
+
+
+def invalidate_totals():
+    """Drop cached admin totals so the next dashboard view recomputes them"""
+    with _totals_lock:
+        _totals_cache['value'] = None
+        _totals_cache['expires'] = 0.0
+
+
+def _sold_by_hotel(start=None, end=None, hotel_id=None):
+    """Nights sold, revenue in cents and bookings per hotel over [start, end), live and archived
+
+    Every report below reads these figures, so they agree with each other
+    and do not change when bookings are archived.
+    """
+    nights = night_history()
+    query = db.session.query(
+        nights.hotel_id, func.count(), func.sum(nights.rate_cents), func.count(distinct(nights.booking_id))
+    ).filter(nights.status.in_(OCCUPIED_STATUSES)).group_by(nights.hotel_id)
+    if start is not None:
+        query = query.filter(nights.night >= start)
+    if end is not None:
+        query = query.filter(nights.night < end)
+    if hotel_id is not None:
+        query = query.filter(nights.hotel_id == hotel_id)
+    return {row[0]: (row[1], int(row[2] or 0), row[3]) for row in query.all()}
+
+
+def revenue_by_hotel(start=None, end=None):
+    """Revenue of confirmed/completed nights in [start, end) per hotel, and the bookings they belong to"""
+    return {
+        hotel_id: {'revenue': cents_to_amount(revenue), 'bookings': bookings}
+        for hotel_id, (nights, revenue, bookings) in _sold_by_hotel(start, end).items()
+    }
+
+
+def nights_booked_by_hotel(start=None, end=None):
+    """Room-nights sold per hotel in [start, end)"""
+    return {hotel_id: sold[0] for hotel_id, sold in _sold_by_hotel(start, end).items()}
+
+
+def occupancy_by_hotel(start=None, end=None):
+    """Occupancy rate per hotel over [start, end); defaults to the last 30 days"""
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    return {
+        hotel_id: {'rooms': row['rooms'], 'nights_booked': row['nights_sold'], 'occupancy': row['occupancy']}
+        for hotel_id, row in inventory_report(start, end).items()
+    }
+
+
+def inventory_report(start, end, hotel_id=None):
+    """Occupancy, ADR and RevPAR per hotel over [start, end) from the nightly inventory
+
+    ADR (average daily rate) is revenue per sold room-night; RevPAR is
+    revenue per available room-night. Only confirmed and completed nights
+    count as sold; archived nights are included.
+    """
+    days = (end - start).days
+    if days <= 0:
+        return {}
+
+    rooms_query = db.session.query(Room.hotel_id, func.count(Room.id)).group_by(Room.hotel_id)
+    if hotel_id is not None:
+        rooms_query = rooms_query.filter(Room.hotel_id == hotel_id)
+    sold = _sold_by_hotel(start, end, hotel_id)
+
+    report = {}
+    for room_hotel_id, room_count in rooms_query.all():
+        nights_sold, revenue_cents, _ = sold.get(room_hotel_id, (0, 0, 0))
+        revenue = cents_to_amount(revenue_cents)
+        available = room_count * days
+        report[room_hotel_id] = {
+            'rooms': room_count,
+            'nights_sold': nights_sold,
+            'occupancy': nights_sold / available,
+            'revenue': revenue,
+            'adr': revenue / nights_sold if nights_sold else 0.0,
+            'revpar': revenue / available,
+        }
+    return report
+
+
+def nightly_report(hotel_id, start, end):
+    """Rooms sold, occupancy and ADR for each night of [start, end) at one hotel"""
+    room_count = db.session.query(func.count(Room.id)).filter(Room.hotel_id == hotel_id).scalar()
+    nights = night_history()
+    rows = db.session.query(
+        nights.night, func.count(), func.sum(nights.rate_cents)
+    ).filter(
+        nights.hotel_id == hotel_id,
+        nights.night >= start,
+        nights.night < end,
+        nights.status.in_(OCCUPIED_STATUSES)
+    ).group_by(nights.night)
+    sold = {night: (count, cents_to_amount(int(revenue or 0))) for night, count, revenue in rows.all()}
+
+    report = []
+    night = start
+    while night < end:
+        nights_sold, revenue = sold.get(night, (0, 0.0))
+        report.append({
+            'night': night.isoformat(),
+            'rooms_sold': nights_sold,
+            'occupancy': nights_sold / room_count if room_count else 0.0,
+            'revenue': revenue,
+            'adr': revenue / nights_sold if nights_sold else 0.0,
+        })
+        night += timedelta(days=1)
+    return report
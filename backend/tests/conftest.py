@@ -0,0 +1,85 @@
+"""
+Shared fixtures: the app on a throwaway SQLite file seeded with seeding.py
+
+Run from backend/:
+
+    python -m pytest -q
+
+The catalogue and HTTP caches are disabled (CACHE_TYPE=null) so every
+request reaches the database. The repository ships no Jinja templates;
+pages render stubs that read the same attributes the templates would,
+so lazy loads still show up in query counts.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+WORKDIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORKDIR, 'tests.db')
+os.environ['BOOKING_SWEEP_INTERVAL'] = '0'
+os.environ['SLOW_QUERY_MS'] = '0'
+os.environ['CACHE_TYPE'] = 'null'
+os.environ['SESSION_BACKEND'] = 'cookie'
+os.environ['SECRET_KEY'] = 'tests'
+
+from jinja2 import ChoiceLoader, DictLoader, FunctionLoader
+from sqlalchemy import event
+
+# Attribute reads of the real templates that reach relationships
+TEMPLATES = {
+    'dashboard.html': '{% for b in bookings %}{{ b.hotel.name }}{{ b.room.room_number }}{% endfor %}',
+    'booking_details.html': '{{ booking.id }}{{ hotel.name }}{{ room.room_number }}',
+    'booking_confirmation.html': '{{ booking.id }}{{ hotel.name }}{{ room.room_number }}',
+    'hotel_details.html': '{{ hotel.name }}{% for r in rooms %}{{ r.room_number }}{% endfor %}',
+    'admin/dashboard.html': '{% for b in recent_bookings %}{{ b.hotel.name }}{{ b.room.room_number }}{% endfor %}',
+}
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    from migrations import upgrade_schema
+    import seeding
+
+    app.config['TESTING'] = True
+    app.jinja_env.loader = ChoiceLoader([DictLoader(TEMPLATES), FunctionLoader(lambda name: '')])
+    with app.app_context():
+        upgrade_schema()
+        seeding.generate(hotels=20, rooms_per_hotel=(5, 10), users=50, bookings=2000, seed=7)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(app, client, user_id):
+    """Sign ``client`` in as ``user_id`` with a session cookie"""
+    client.set_cookie('session', app.session_interface.get_signing_serializer(app).dumps({'user_id': user_id}))
+    return client
+
+
+@contextmanager
+def captured_statements(app):
+    """Collect ``(statement, parameters)`` for every statement run on the app's engine"""
+    from models import db
+
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
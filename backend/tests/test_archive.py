@@ -0,0 +1,57 @@
+"""
+Archiving bookings leaves the occupancy, ADR and admin stats reports unchanged
+"""
+from datetime import date, timedelta
+
+# Long before the seeded history, so only this test's stay is archived
+CHECK_IN = date.today() - timedelta(days=5000)
+CHECK_OUT = CHECK_IN + timedelta(days=3)
+
+
+def admin_stats(stats):
+    """The per-hotel figures of /admin/stats over the test's stay"""
+    return {
+        'revenue': stats.revenue_by_hotel(CHECK_IN, CHECK_OUT),
+        'nights_booked': stats.nights_booked_by_hotel(CHECK_IN, CHECK_OUT),
+        'occupancy': stats.occupancy_by_hotel(CHECK_IN, CHECK_OUT),
+    }
+
+
+def test_archiving_keeps_past_reports(app):
+    from archive import archive_bookings
+    from models import db, Booking, ArchivedBooking, ArchivedRoomNight, Room
+    import inventory
+    import stats
+
+    with app.app_context():
+        hotel_id = db.session.get(Room, 1).hotel_id
+        stay = Booking(user_id=1, hotel_id=hotel_id, room_id=1, check_in_date=CHECK_IN, check_out_date=CHECK_OUT,
+                       total_price_cents=30001, status='completed')
+        db.session.add(stay)
+        db.session.flush()
+        inventory.hold(stay)
+        # The newest booking always stays live
+        newest = Booking(user_id=1, hotel_id=hotel_id, room_id=1, check_in_date=CHECK_IN - timedelta(days=10),
+                         check_out_date=CHECK_IN - timedelta(days=9), total_price_cents=0, status='cancelled')
+        db.session.add(newest)
+        db.session.commit()
+        stay_id, newest_id = stay.id, newest.id
+
+        before = stats.inventory_report(CHECK_IN, CHECK_OUT, hotel_id)
+        nightly = stats.nightly_report(hotel_id, CHECK_IN, CHECK_OUT)
+        admin = admin_stats(stats)
+        assert before[hotel_id]['nights_sold'] == 3
+        assert before[hotel_id]['revenue'] == 300.01
+        assert admin['revenue'][hotel_id] == {'revenue': 300.01, 'bookings': 1}
+        assert admin['occupancy'][hotel_id]['nights_booked'] == admin['nights_booked'][hotel_id] == 3
+
+        try:
+            assert archive_bookings(CHECK_IN + timedelta(days=4)) == 1
+            assert stats.inventory_report(CHECK_IN, CHECK_OUT, hotel_id) == before
+            assert stats.nightly_report(hotel_id, CHECK_IN, CHECK_OUT) == nightly
+            assert admin_stats(stats) == admin
+        finally:
+            db.session.query(ArchivedRoomNight).filter(ArchivedRoomNight.booking_id == stay_id).delete()
+            db.session.query(ArchivedBooking).filter(ArchivedBooking.id == stay_id).delete()
+            db.session.query(Booking).filter(Booking.id.in_([stay_id, newest_id])).delete()
+            db.session.commit()
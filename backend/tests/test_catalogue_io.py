@@ -0,0 +1,56 @@
+"""
+Catalogue imports: unreadable lines and repeated keys are handled per row
+"""
+import io
+import json
+
+from catalogue_io import import_rows, read_rows
+
+ROOM_NUMBER = 'IMPORT-1'
+
+
+def ndjson(*lines):
+    return io.StringIO(''.join(line + '\n' for line in lines))
+
+
+def room(**fields):
+    return json.dumps(dict({'hotel_id': 1, 'room_number': ROOM_NUMBER, 'room_type': 'Suite',
+                            'price_per_night': 120, 'capacity': 2}, **fields))
+
+
+def test_invalid_lines_are_reported_by_line_number(app):
+    from models import db, Room
+
+    rows = read_rows(ndjson(room(), '', '{"hotel_id": 1,', '[1, 2]', room(capacity=3)), 'ndjson')
+    with app.app_context():
+        try:
+            imported, errors = import_rows('rooms', rows)
+            assert imported == 2
+            assert [number for number, _ in errors] == [3, 4]
+            assert db.session.query(Room.capacity).filter(Room.room_number == ROOM_NUMBER).scalar() == 3
+        finally:
+            db.session.query(Room).filter(Room.room_number == ROOM_NUMBER).delete()
+            db.session.commit()
+
+
+def test_repeated_key_in_one_chunk_keeps_the_last_row(app):
+    from models import db, Room
+
+    rows = read_rows(ndjson(room(price_per_night=100), room(price_per_night=150)), 'ndjson')
+    with app.app_context():
+        try:
+            assert import_rows('rooms', rows) == (2, [])
+            stored = db.session.query(Room.price_per_night_cents).filter(Room.room_number == ROOM_NUMBER).all()
+            assert stored == [(15000,)]
+        finally:
+            db.session.query(Room).filter(Room.room_number == ROOM_NUMBER).delete()
+            db.session.commit()
+
+
+def test_non_finite_price_is_a_row_error(app):
+    from models import db, Room
+
+    rows = read_rows(ndjson(room(price_per_night='inf')), 'ndjson')
+    with app.app_context():
+        assert import_rows('rooms', rows) == (0, [(1, "invalid price_per_night: 'inf'")])
+        assert db.session.query(Room).filter(Room.room_number == ROOM_NUMBER).count() == 0
@@ -0,0 +1,60 @@
+"""
+Conditional GET on the catalogue APIs: 304 revalidation and new ETags after admin writes
+"""
+import pytest
+
+from conftest import login
+
+ROOM_NUMBER = 'ETAG-1'
+
+
+@pytest.fixture
+def caching(app):
+    """The catalogue and HTTP caches switched on (the suite runs with CACHE_TYPE=null)"""
+    from cache import cache
+    from http_cache import response_cache
+
+    def configure(cache_type):
+        app.config['CACHE_TYPE'] = cache_type
+        cache.init_app(app)
+        response_cache.init_app(app, cache)
+
+    configure('lru')
+    yield
+    configure('null')
+
+
+def test_matching_etag_is_not_modified(app, client, caching):
+    first = client.get('/api/hotels')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    again = client.get('/api/hotels', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+
+
+def test_admin_edit_changes_the_etag(app, client, caching):
+    from models import db, Room
+    from search import backend
+    from sqlalchemy import text
+
+    before = client.get('/api/hotel/1')
+    login(app, client, 1)
+    response = client.post('/admin/room/create', data={'hotel_id': 1, 'room_number': ROOM_NUMBER,
+                                                       'room_type': 'Suite', 'price_per_night': '150'})
+    try:
+        assert response.status_code == 302
+        after = client.get('/api/hotel/1', headers={'If-None-Match': before.headers['ETag']})
+        assert after.status_code == 200
+        assert after.headers['ETag'] != before.headers['ETag']
+        assert ROOM_NUMBER in after.get_data(as_text=True)
+    finally:
+        with app.app_context():
+            room = Room.query.filter_by(hotel_id=1, room_number=ROOM_NUMBER).first()
+            if room is not None:
+                if backend() == 'fts5':
+                    db.session.execute(text('DELETE FROM rooms_fts WHERE rowid = :id'), {'id': room.id})
+                db.session.delete(room)
+                db.session.commit()
@@ -0,0 +1,56 @@
+"""
+Lapsed pending holds release their room nights to the next booking
+"""
+from datetime import date, datetime, timedelta
+
+# Far past the seeded bookings, so only this test holds these nights
+CHECK_IN = date.today() + timedelta(days=4000)
+CHECK_OUT = CHECK_IN + timedelta(days=3)
+ROOM_ID = 4
+
+
+def held_nights(booking_id):
+    from models import db, RoomNight
+
+    return db.session.query(RoomNight).filter(RoomNight.booking_id == booking_id).count()
+
+
+def test_lapsed_hold_is_expired_for_a_new_booking(app):
+    from lifecycle import sweeper
+    from models import db, Booking, Room, RoomNight
+    from reservations import reserve
+    import inventory
+
+    with app.app_context():
+        hotel_id = db.session.get(Room, ROOM_ID).hotel_id
+
+        def booking(**fields):
+            return Booking(user_id=1, hotel_id=hotel_id, room_id=ROOM_ID, check_in_date=CHECK_IN,
+                           check_out_date=CHECK_OUT, guest_name='Test Guest', guest_email='guest@example.com',
+                           total_price_cents=0, status='pending', **fields)
+
+        lapsed = booking(created_at=datetime.utcnow() - timedelta(seconds=sweeper.hold_ttl + 60))
+        db.session.add(lapsed)
+        db.session.flush()
+        inventory.hold(lapsed)
+        db.session.commit()
+        lapsed_id = lapsed.id
+        ids = [lapsed_id]
+
+        try:
+            assert held_nights(lapsed_id) == 3
+            fresh = booking()
+            assert reserve(fresh)
+            ids.append(fresh.id)
+
+            assert db.session.get(Booking, lapsed_id).status == 'expired'
+            assert held_nights(lapsed_id) == 0
+            assert held_nights(fresh.id) == 3
+            # A hold within its TTL is left alone
+            assert sweeper.expire_lapsed(ROOM_ID, CHECK_IN, CHECK_OUT) == []
+            assert held_nights(fresh.id) == 3
+        finally:
+            db.session.rollback()
+            db.session.query(RoomNight).filter(RoomNight.booking_id.in_(ids)).delete(synchronize_session=False)
+            db.session.query(Booking).filter(Booking.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
@@ -0,0 +1,68 @@
+"""
+Keyset pagination: malformed cursors, NDJSON pages and nullable sort keys
+"""
+import base64
+import json
+
+import pytest
+
+from conftest import login
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('url, values', [
+    ('/api/hotels', [{'id': 1}]),
+    ('/api/hotels', ['1']),
+    ('/api/hotels', [True]),
+    ('/api/hotels', [1, 2]),
+    ('/api/bookings', [1, 1]),
+    ('/api/bookings', ['yesterday', 1]),
+    ('/api/bookings', ['2025-01-01T00:00:00', None]),
+])
+def test_malformed_cursor_is_rejected(app, client, url, values):
+    login(app, client, 1)
+    response = client.get(f'{url}?cursor={cursor(values)}')
+    assert response.status_code == 400
+    assert response.json == {'message': 'Invalid cursor'}
+
+
+@pytest.mark.parametrize('url', ['/api/hotels', '/api/bookings'])
+def test_ndjson_pages_link_the_next_page(app, client, url):
+    login(app, client, 1)
+    json_page = client.get(f'{url}?limit=3')
+    ndjson_page = client.get(f'{url}?limit=3&format=ndjson')
+
+    assert ndjson_page.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in ndjson_page.data.splitlines()] == json_page.json
+    assert ndjson_page.headers['X-Next-Cursor'] == json_page.headers['X-Next-Cursor']
+
+    following = client.get(f"{url}?limit=3&format=ndjson&cursor={ndjson_page.headers['X-Next-Cursor']}")
+    assert [json.loads(line) for line in following.data.splitlines()] == client.get(
+        f"{url}?limit=3&cursor={json_page.headers['X-Next-Cursor']}").json
+
+
+def test_rating_pages_cover_unrated_hotels(app, client):
+    from models import db, Hotel, Room
+
+    with app.app_context():
+        rating = db.session.get(Hotel, 1).star_rating
+        db.session.query(Hotel).filter(Hotel.id == 1).update({'star_rating': None})
+        db.session.commit()
+        expected = db.session.query(Room.id).join(Hotel).filter(Room.is_available == True,
+                                                                Hotel.is_active == True).count()
+    try:
+        seen = []
+        next_cursor = ''
+        while next_cursor is not None:
+            response = client.get(f'/api/rooms/search?sort=rating&limit=25&cursor={next_cursor}')
+            assert response.status_code == 200
+            seen.extend(room['id'] for room in response.json)
+            next_cursor = response.headers.get('X-Next-Cursor')
+        assert len(seen) == len(set(seen)) == expected
+    finally:
+        with app.app_context():
+            db.session.query(Hotel).filter(Hotel.id == 1).update({'star_rating': rating})
+            db.session.commit()
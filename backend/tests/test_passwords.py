@@ -0,0 +1,50 @@
+"""
+The bounded hashing pool: timeouts, slot accounting, opportunistic rehash
+"""
+import threading
+
+import pytest
+from flask import Flask
+
+from passwords import HasherBusy, PasswordHasher
+
+
+@pytest.fixture
+def pool():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=0, PASSWORD_HASH_TIMEOUT=0.1)
+    hasher = PasswordHasher(app)
+    yield hasher
+    hasher._executor.shutdown(wait=True)
+
+
+def test_timeout_is_busy_and_keeps_the_slot(pool):
+    release = threading.Event()
+    with pytest.raises(HasherBusy):
+        pool._run(release.wait)
+    # The job still runs and holds the only slot
+    with pytest.raises(HasherBusy):
+        pool._run(lambda: None)
+    release.set()
+    pool._executor.submit(lambda: None).result()
+    assert pool._run(lambda: 42) == 42
+
+
+def test_login_succeeds_when_rehash_is_busy(app, client, monkeypatch):
+    from models import db, User
+    from passwords import hasher
+
+    with app.app_context():
+        user = db.session.get(User, 1)
+        username, old_hash = user.username, user.password_hash
+
+    def busy(password):
+        raise HasherBusy()
+
+    monkeypatch.setattr(hasher, 'verify', lambda password_hash, password: True)
+    monkeypatch.setattr(hasher, 'needs_rehash', lambda password_hash: True)
+    monkeypatch.setattr(hasher, 'hash', busy)
+    response = client.post('/login', data={'username': username, 'password': 'secret'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(User, 1).password_hash == old_hash
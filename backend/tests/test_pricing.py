@@ -0,0 +1,39 @@
+"""
+Amounts to integer cents: half-up rounding, and non-finite amounts rejected
+"""
+from decimal import Decimal
+
+import pytest
+
+from pricing import to_cents
+
+
+@pytest.mark.parametrize('amount, cents', [
+    (120, 12000),
+    ('99.99', 9999),
+    # half a cent rounds away from zero, from the decimal the amount was written as
+    ('0.005', 1),
+    ('-0.005', -1),
+    (1.005, 101),
+    (2.675, 268),
+    (0.1 + 0.2, 30),
+    (Decimal('19.994999'), 1999),
+    ('1e3', 100000),
+])
+def test_to_cents_rounds_half_up(amount, cents):
+    assert to_cents(amount) == cents
+
+
+@pytest.mark.parametrize('amount', [
+    float('nan'), float('inf'), float('-inf'), 1e400, 'nan', 'Infinity', '-inf', 'sNaN', 'abc', '', None,
+])
+def test_to_cents_rejects_non_finite_amounts(amount):
+    with pytest.raises(ValueError):
+        to_cents(amount)
+
+
+@pytest.mark.parametrize('price', ['nan', 'inf', '1e400', 'abc'])
+def test_room_search_rejects_non_finite_prices(app, client, price):
+    response = client.get(f'/api/rooms/search?min_price={price}')
+    assert response.status_code == 400
+    assert response.json == {'message': 'min_price and max_price must be valid amounts'}
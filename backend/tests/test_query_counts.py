@@ -0,0 +1,71 @@
+"""
+Statements per request for the booking, hotel and batch availability endpoints
+
+Counts ``before_cursor_execute`` events per request. They must be the same
+for a guest with few bookings and one with many: hotels and rooms are
+eager-loaded with the bookings, not fetched per row.
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from conftest import captured_statements, login
+
+# (url, statements); {booking} is one of the guest's bookings
+EXPECTED = [
+    # user, bookings with hotel and room, status counts
+    ('/dashboard', 3),
+    # the same, with the bookings read across live and archived tables
+    ('/dashboard?archived=1', 4),
+    ('/api/bookings', 1),
+    ('/api/bookings?depth=2', 1),
+    ('/api/bookings?format=ndjson', 1),
+    ('/booking/{booking}', 1),
+    ('/booking/confirmation/{booking}', 1),
+    # hotel, its rooms
+    ('/hotel/1', 2),
+    ('/api/hotel/1', 2),
+]
+
+
+@pytest.fixture(scope='module', params=['fewest', 'most'])
+def guest(app, request):
+    """The guest with the fewest or the most bookings, and one of their bookings"""
+    from models import db, Booking
+
+    with app.app_context():
+        order = func.count() if request.param == 'fewest' else func.count().desc()
+        user_id, _ = db.session.query(Booking.user_id, func.count()).group_by(
+            Booking.user_id).order_by(order).first()
+        booking_id = db.session.query(Booking.id).filter(Booking.user_id == user_id).limit(1).scalar()
+    return {'user_id': user_id, 'booking_id': booking_id}
+
+
+@pytest.mark.parametrize('url, expected', EXPECTED)
+def test_statements_per_request(app, client, guest, url, expected):
+    login(app, client, guest['user_id'])
+    with captured_statements(app) as statements:
+        response = client.get(url.format(booking=guest['booking_id']))
+    assert response.status_code == 200
+    assert len(statements) == expected, [statement for statement, _ in statements]
+
+
+def test_batch_availability_is_one_statement(app, client):
+    import availability
+
+    stays = [(date.today() + timedelta(days=start), date.today() + timedelta(days=start + 7))
+             for start in range(0, 60, 10)]
+    date_ranges = [{'check_in': check_in.isoformat(), 'check_out': check_out.isoformat()}
+                   for check_in, check_out in stays]
+    with captured_statements(app) as statements:
+        response = client.post('/api/check-availability/batch', json={'hotel_id': 1, 'date_ranges': date_ranges})
+    assert response.status_code == 200
+    # the hotel's rooms, then every room x range at once
+    assert len(statements) == 2, [statement for statement, _ in statements]
+
+    with app.app_context():
+        for room_id in response.json['rooms']:
+            assert response.json['availability'][str(room_id)] == [
+                availability.is_available(room_id, check_in, check_out) for check_in, check_out in stays
+            ]
@@ -0,0 +1,115 @@
+"""
+EXPLAIN QUERY PLAN checks for the indexed hot paths (SQLite)
+
+Every SELECT a route runs is re-planned with its parameters; the plan must
+not scan a table row by row and must search the index the route depends on
+with the expected constraint. Not covered, on purpose:
+
+- ``/hotels?city=`` with free text (not one of the listed cities): a
+  substring match has a leading wildcard, which no B-tree index can serve
+- ``/hotels?star_rating=`` and ``/rooms?capacity=``: ranges on a trailing
+  index column, narrowed by the is_active/is_available prefix only
+- ``/admin``: its reports aggregate over every booking by design
+"""
+import re
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import captured_statements, login
+
+# A plan step reading a whole table rather than an index
+FULL_SCAN = re.compile(r'^SCAN (?!.*\bUSING\b.*\bINDEX\b)(\w+)')
+
+
+@pytest.fixture(scope='module')
+def sample(app):
+    from models import db, Hotel, Booking
+
+    with app.app_context():
+        city = db.session.query(Hotel.city).filter(Hotel.is_active == True).first()[0]
+        user_id = db.session.query(Booking.user_id).first()[0]
+    return {'city': city, 'user_id': user_id}
+
+
+def plans(app, statements):
+    """Plan detail lines of every SELECT in ``statements``"""
+    from models import db
+
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            return [
+                [row[3] for row in connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()]
+                for statement, parameters in statements
+                if statement.lstrip().upper().startswith('SELECT')
+            ]
+        finally:
+            connection.close()
+
+
+def assert_indexed(app, client, method, url, expected, **kwargs):
+    with captured_statements(app) as statements:
+        response = client.open(url, method=method, **kwargs)
+    assert response.status_code == 200, url
+
+    steps = [step for plan in plans(app, statements) for step in plan]
+    assert steps, f'{url} ran no SELECT'
+    scans = [step for step in steps if FULL_SCAN.match(step)]
+    assert not scans, f'{url} scans a table: {scans}'
+    for search in expected:
+        assert any(search in step for step in steps), f'{url} does not search {search!r}: {steps}'
+
+
+STAY = {'check_in': str(date.today() + timedelta(days=300)), 'check_out': str(date.today() + timedelta(days=303))}
+NIGHTS = 'sqlite_autoindex_room_nights_1 (room_id=? AND night>? AND night<?)'
+
+
+def test_hotels_by_city(app, client, sample):
+    assert_indexed(app, client, 'GET', f"/hotels?city={sample['city'].lower()}",
+                   ['ix_hotels_active_city_rating (is_active=? AND city=?)'])
+
+
+def test_api_hotels_by_city(app, client, sample):
+    assert_indexed(app, client, 'GET', f"/api/hotels?city={sample['city']}",
+                   ['ix_hotels_active_city_rating (is_active=? AND city=?)'])
+
+
+def test_rooms_by_hotel(app, client):
+    assert_indexed(app, client, 'GET', '/rooms?hotel_id=1',
+                   ['ix_rooms_hotel_available (hotel_id=? AND is_available=?)'])
+
+
+def test_rooms_by_price(app, client):
+    assert_indexed(app, client, 'GET', '/rooms?min_price=100&max_price=200',
+                   ['ix_rooms_available_price_cents_capacity '
+                    '(is_available=? AND price_per_night_cents>? AND price_per_night_cents<?)'])
+
+
+def test_hotel_details(app, client):
+    assert_indexed(app, client, 'GET', '/hotel/1',
+                   ['ix_rooms_hotel_available (hotel_id=? AND is_available=?)'])
+
+
+def test_dashboard(app, client, sample):
+    login(app, client, sample['user_id'])
+    assert_indexed(app, client, 'GET', '/dashboard', ['ix_bookings_user_created (user_id=?)'])
+
+
+def test_api_bookings(app, client, sample):
+    login(app, client, sample['user_id'])
+    assert_indexed(app, client, 'GET', '/api/bookings', ['ix_bookings_user_created (user_id=?)'])
+
+
+def test_room_availability(app, client):
+    assert_indexed(app, client, 'GET', f"/room/1?check_in={STAY['check_in']}&check_out={STAY['check_out']}",
+                   [NIGHTS])
+
+
+def test_api_check_availability(app, client):
+    assert_indexed(app, client, 'POST', '/api/check-availability', [NIGHTS], json=dict(STAY, room_id=1))
+
+
+def test_api_room_search_availability(app, client):
+    assert_indexed(app, client, 'GET', f"/api/rooms/search?hotel_id=1&check_in={STAY['check_in']}"
+                                       f"&check_out={STAY['check_out']}", [NIGHTS])
@@ -0,0 +1,93 @@
+"""
+Concurrent reserve() calls on the file-backed test database
+
+Several forked processes, each with several threads, book a few rooms for
+random overlapping stays at the same time, so both the per-process room
+locks and the database lock (BEGIN IMMEDIATE) are exercised. No two active
+bookings may overlap, and every booking reserve() accepted must hold
+exactly its own nights in room_nights.
+"""
+import multiprocessing
+import random
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import func, text
+
+PROCESSES = 3
+THREADS = 4
+ATTEMPTS = 15
+ROOMS = (1, 2, 3)
+# Far past the seeded bookings, so only this test books these nights
+START = date.today() + timedelta(days=3000)
+DAYS = 20
+
+
+def attempt_bookings(app, seed, booked):
+    from models import db, Room, Booking
+    from reservations import reserve
+
+    rng = random.Random(seed)
+    with app.app_context():
+        for _ in range(ATTEMPTS):
+            room_id = rng.choice(ROOMS)
+            check_in = START + timedelta(days=rng.randrange(DAYS))
+            booking = Booking(
+                user_id=1, hotel_id=db.session.get(Room, room_id).hotel_id, room_id=room_id,
+                check_in_date=check_in, check_out_date=check_in + timedelta(days=rng.randint(1, 4)),
+                guest_name='Test Guest', guest_email='guest@example.com', total_price_cents=0, status='pending'
+            )
+            if reserve(booking):
+                booked.append(booking.id)
+
+
+def process_main(app, process_id, queue):
+    from models import db
+
+    # Connections inherited from the parent must not be shared
+    with app.app_context():
+        db.engine.dispose(close=False)
+    booked = []
+    threads = [
+        threading.Thread(target=attempt_bookings, args=(app, process_id * THREADS + i, booked))
+        for i in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(booked)
+
+
+def test_concurrent_reserve_never_overlaps(app):
+    from models import db, Booking, RoomNight
+
+    with app.app_context():
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [context.Process(target=process_main, args=(app, i, queue)) for i in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    booked = [booking_id for _ in processes for booking_id in queue.get(timeout=120)]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert booked, 'no booking succeeded'
+    with app.app_context():
+        overlaps = db.session.execute(text(
+            "SELECT count(*) FROM bookings a JOIN bookings b ON a.room_id = b.room_id AND a.id < b.id "
+            "WHERE a.status IN ('pending', 'confirmed') AND b.status IN ('pending', 'confirmed') "
+            "AND a.check_in_date < b.check_out_date AND a.check_out_date > b.check_in_date"
+        )).scalar()
+        assert overlaps == 0
+
+        bookings = db.session.query(Booking).filter(Booking.check_in_date >= START).all()
+        assert sorted(booking.id for booking in bookings) == sorted(booked)
+        nights = dict(db.session.query(RoomNight.booking_id, func.count()).filter(
+            RoomNight.night >= START).group_by(RoomNight.booking_id).all())
+        assert nights == {
+            booking.id: (booking.check_out_date - booking.check_in_date).days for booking in bookings
+        }
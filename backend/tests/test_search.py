@@ -0,0 +1,46 @@
+"""
+Hotel search applies the listing filters before it limits
+"""
+import pytest
+
+from search import rank_hotels, rebuild_search_index
+
+
+@pytest.fixture
+def city_with_inactive(app):
+    """A city with several hotels, the first of which is deactivated for the test"""
+    from sqlalchemy import func
+    from models import db, Hotel
+
+    with app.app_context():
+        rebuild_search_index()
+        city = db.session.query(Hotel.city).group_by(Hotel.city).order_by(func.count().desc()).first()[0]
+        hidden = db.session.query(Hotel.id).filter(Hotel.city == city).order_by(Hotel.id).first()[0]
+        db.session.query(Hotel).filter(Hotel.id == hidden).update({'is_active': False})
+        db.session.commit()
+    yield city, hidden
+    with app.app_context():
+        db.session.query(Hotel).filter(Hotel.id == hidden).update({'is_active': True})
+        db.session.commit()
+
+
+def test_api_search_limits_active_hotels(app, client, city_with_inactive):
+    from models import db, Hotel
+
+    city, hidden = city_with_inactive
+    with app.app_context():
+        active = db.session.query(Hotel).filter(Hotel.city == city, Hotel.is_active == True).count()
+    results = client.get(f'/api/search?q={city}&limit={active}').json
+    assert hidden not in [result['id'] for result in results]
+    assert len(results) == active
+
+
+def test_rank_hotels_keeps_every_filtered_match(app, city_with_inactive):
+    from models import Hotel
+
+    city, hidden = city_with_inactive
+    with app.app_context():
+        ranked = rank_hotels(Hotel.query.filter(Hotel.is_active == True, Hotel.city == city), city).all()
+        expected = Hotel.query.filter(Hotel.is_active == True, Hotel.city == city).count()
+    assert len(ranked) == expected
+    assert hidden not in [hotel.id for hotel in ranked]